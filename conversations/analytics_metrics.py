@@ -1,13 +1,23 @@
+import hashlib
 from django.conf import settings
+from django.core.cache import cache
 from django.db import connections
+from django.utils import timezone
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from collections import defaultdict
+from .db_pool import get_connection
 from .events_db import (
-    get_sales_stage_metrics,
-    get_followups_detection
+    get_event_counts_by_agent,
+    get_windowed_conversation_counts_by_agent,
+    get_windowed_event_counts_by_agent,
+    window_filter,
+    window_periods
 )
 
+# Analysis types read by build_agent_scores
+SCORED_ANALYSIS_TYPES = ('SENTIMENT_ANALYSIS', 'BEST_PRACTICES', 'SALES_PERFORMANCE')
+
 def get_metrics_for_agent(agent_uuid, start_date=None):
     """Get an agent performance metrics on database."""
     if not agent_uuid:
@@ -21,14 +31,6 @@ def get_metrics_for_agent(agent_uuid, start_date=None):
             print(f"Error: Database {db_name} not configured.")
             return []
         
-        conn = psycopg2.connect(
-            host=db_config.get('HOST', 'localhost'),
-            port=db_config.get('PORT', '5432'),
-            database=db_config.get('NAME'),
-            user=db_config.get('USER'),
-            password=db_config.get('PASSWORD')
-        )
-        
         table_name = getattr(settings, 'ANALYTICS_TABLE_NAME', 'analytics')
         agent_id_col = getattr(settings, 'ANALYTICS_AGENT_ID_COLUMN', 'agent_uuid')
         timestamp_col = getattr(settings, 'ANALYTICS_TIMESTAMP_COLUMN', 'created_at')
@@ -52,24 +54,21 @@ def get_metrics_for_agent(agent_uuid, start_date=None):
             """
             params.append(start_date)
         
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute(query, tuple(params))
-        
-        metrics = cursor.fetchall()
+        with get_connection(db_name) as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, tuple(params))
+                metrics = cursor.fetchall()
         
         metrics_list = [dict(row) for row in metrics]
         
-        cursor.close()
-        conn.close()
-        
         return metrics_list
         
     except Exception as e:
         print(f"Unexpected error fetching metrics: {e}")
         return []
 
-def get_metrics_for_team_members(team_members_uuids, start_date=None):
-    """ Get all team members performance metrics on database."""
+def get_metrics_for_team_members(team_members_uuids, start_date=None, analysis_types=None):
+    """ Get all team members performance metrics on database, optionally only some analysis types."""
     if not team_members_uuids:
         return []
 
@@ -81,47 +80,36 @@ def get_metrics_for_team_members(team_members_uuids, start_date=None):
             print(f"Error: Database {db_name} not configured.")
             return []
         
-        conn = psycopg2.connect(
-            host=db_config.get('HOST', 'localhost'),
-            port=db_config.get('PORT', '5432'),
-            database=db_config.get('NAME'),
-            user=db_config.get('USER'),
-            password=db_config.get('PASSWORD')
-        )
-        
         table_name = getattr(settings, 'ANALYTICS_TABLE_NAME', 'analytics')
         agent_id_col = getattr(settings, 'ANALYTICS_AGENT_ID_COLUMN', 'agent_uuid')
         timestamp_col = getattr(settings, 'ANALYTICS_TIMESTAMP_COLUMN', 'created_at')
         
         params = [tuple(str(uid) for uid in team_members_uuids)]
+        filters = ""
+
+        if analysis_types:
+            filters += "AND analysis_type IN %s"
+            params.append(tuple(analysis_types))
+
+        if start_date:
+            filters += f" AND {timestamp_col} >= %s"
+            params.append(start_date)
 
         query = f"""
             SELECT uuid, conversation_uuid, analysis_type, result, alma_internal_organization, {timestamp_col}, agent_uuid
             FROM {table_name}
             WHERE {agent_id_col} IN %s
+            {filters}
             ORDER BY {timestamp_col} ASC
         """
-
-        if start_date:
-            query = f"""
-                SELECT uuid, conversation_uuid, analysis_type, result, alma_internal_organization, {timestamp_col}, agent_uuid
-                FROM {table_name}
-                WHERE {agent_id_col} IN %s
-                AND {timestamp_col} >= %s
-                ORDER BY {timestamp_col} ASC
-            """
-            params.append(start_date)
-        
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute(query, tuple(params))
         
-        metrics = cursor.fetchall()
+        with get_connection(db_name) as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, tuple(params))
+                metrics = cursor.fetchall()
         
         metrics_list = [dict(row) for row in metrics]
         
-        cursor.close()
-        conn.close()
-        
         return metrics_list
         
     except Exception as e:
@@ -164,13 +152,7 @@ def get_objections_from_database(team_members_uuids, start_date=None):
             """
             params.append(start_date)
 
-        with psycopg2.connect(
-            host=analytics_db.get('HOST', 'localhost'),
-            port=analytics_db.get('PORT', '5432'),
-            database=analytics_db.get('NAME', 'events_db'),
-            user=analytics_db.get('USER', 'postgres'),
-            password=analytics_db.get('PASSWORD', '')
-        ) as conn:
+        with get_connection(db_name) as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 cursor.execute(query, tuple(params))
                 results = cursor.fetchall()
@@ -191,63 +173,119 @@ def get_objections_from_database(team_members_uuids, start_date=None):
             print(f"Unexpected error fetching objections: {e}")
         return objections_detected
     
-def format_objection_data(objections_list, team_members_dict):
-    if not objections_list:
+OBJECTION_TYPE_LABELS = {
+    'price': 'Preço', 
+    'trust': 'Confiança', 
+    'timing': 'Tempo', 
+    'competitor': 'Concorrente', 
+    'product_fit': 'Adequação', 
+    'other': 'Outro',
+    'hesitation': 'Hesitação',
+    'payment_method': 'Método de Pagamento',
+    'implicit_price': 'Preço Implícito',
+    'implicit_timing': 'Tempo Implícito'
+}
+
+
+def explode_objections(objections_list):
+    """One dict per detected objection of SALES_PERFORMANCE rows, shaped like ObjectionFact."""
+    for obj in objections_list or []:
+        result = obj.get('result', {}) or {}
+        objections_results = result.get('objection_details', {}).get('objections_detected', [])
+        seller_id = obj.get('agent_uuid') or obj.get('seller_uuid') or 'Desconhecido'
+
+        for item in objections_results:
+            yield {
+                'agent_uuid': seller_id,
+                'conversation_uuid': obj.get('conversation_uuid'),
+                'created_at': obj.get('created_at'),
+                'objection_type': item.get('objection_type', 'other'),
+                'resolution_quality': item.get('resolution_quality', 0),
+                'resolved': item.get('resolved') in (True, 'true'),
+                'objection_text': item.get('objection_text', ''),
+                'seller_response': item.get('seller_response', ''),
+            }
+
+
+def objection_stats_from_facts(facts):
+    """Per objection type and agent counters (see get_objection_stats) from exploded objections."""
+    stats = {}
+    for fact in facts:
+        key = (fact['objection_type'], fact['agent_uuid'])
+        score = fact['resolution_quality']
+        row = stats.get(key)
+        if row is None:
+            stats[key] = {
+                'objection_type': key[0],
+                'agent_uuid': key[1],
+                'count': 1,
+                'total_score': score,
+                'best_score': score,
+                'best_response': fact['seller_response'],
+            }
+            continue
+        row['count'] += 1
+        row['total_score'] += score
+        if score > row['best_score']:
+            row['best_score'] = score
+            row['best_response'] = fact['seller_response']
+    return list(stats.values())
+
+
+def merge_objection_stats(*stats_lists):
+    """Add up objection stats rows for the same objection type and agent."""
+    merged = {}
+    for stats in stats_lists:
+        for row in stats:
+            key = (row['objection_type'], row['agent_uuid'])
+            current = merged.get(key)
+            if current is None:
+                merged[key] = dict(row)
+                continue
+            current['count'] += row['count']
+            current['total_score'] += row['total_score']
+            if row['best_score'] > current['best_score']:
+                current['best_score'] = row['best_score']
+                current['best_response'] = row['best_response']
+    return list(merged.values())
+
+
+def format_objection_stats(objection_stats, team_members_dict):
+    """Objection analysis table rows from per objection type and agent counters."""
+    if not objection_stats:
         return []
 
     stats = defaultdict(lambda: {
         'count': 0, 
         'total_score': 0, 
-        'sellers': defaultdict(list), 
-        'responses': []
+        'sellers': defaultdict(lambda: {'count': 0, 'total_score': 0}), 
+        'responses': {}
     })
 
-    for obj in objections_list:
-        result = obj.get('result', {})
-        objections_results = result.get('objection_details', {}).get('objections_detected', [])
+    for row in objection_stats:
+        seller_id = row['agent_uuid']
+        seller_name = team_members_dict.get(seller_id, seller_id)
+        data = stats[row['objection_type']]
 
-        seller_id = obj.get('agent_uuid') or obj.get('seller_uuid') or 'Desconhecido'
-        seller_name = seller_id
-        if seller_id in team_members_dict:
-            seller_name = team_members_dict[seller_id]
+        data['count'] += row['count']
+        data['total_score'] += row['total_score']
+        data['sellers'][seller_name]['count'] += row['count']
+        data['sellers'][seller_name]['total_score'] += row['total_score']
 
-        for item in objections_results:
-
-            obj_type = item.get('objection_type', 'other')
-            score = item.get('resolution_quality', 0)
-            response_text = item.get('seller_response', '')
-
-            stats[obj_type]['count'] += 1
-            stats[obj_type]['total_score'] += score
-            stats[obj_type]['sellers'][seller_name].append(score)
-            
-            stats[obj_type]['responses'].append({
-                'seller': seller_name,
-                'score': score,
-                'text': response_text
-            })
+        best = data['responses'].get(seller_name)
+        if best is None or row['best_score'] > best['score']:
+            data['responses'][seller_name] = {'score': row['best_score'], 'text': row['best_response']}
 
     formatted_data = []
-    
-    type_map = {
-        'price': 'Preço', 
-        'trust': 'Confiança', 
-        'timing': 'Tempo', 
-        'competitor': 'Concorrente', 
-        'product_fit': 'Adequação', 
-        'other': 'Outro',
-        'hesitation': 'Hesitação',
-        'payment_method': 'Método de Pagamento',
-        'implicit_price': 'Preço Implícito',
-        'implicit_timing': 'Tempo Implícito'
-    }
 
     for otype, data in stats.items():
+        if not data['count']:
+            continue
         avg_score = data['total_score'] / data['count']
         
         seller_averages = {
-            seller: sum(scores)/len(scores) 
-            for seller, scores in data['sellers'].items()
+            seller: seller_data['total_score'] / seller_data['count']
+            for seller, seller_data in data['sellers'].items()
         }
         
         if not seller_averages:
@@ -255,97 +293,344 @@ def format_objection_data(objections_list, team_members_dict):
 
         best_seller = max(seller_averages, key=seller_averages.get)
         worst_seller = min(seller_averages, key=seller_averages.get)
-        
-        best_seller_responses = [r for r in data['responses'] if r['seller'] == best_seller]
-        
-        if best_seller_responses:
-
-            best_response_obj = max(best_seller_responses, key=lambda x: x['score'])
-            best_response_text = best_response_obj['text']
-        else:
-            best_response_text = max(data['responses'], key=lambda x: x['score'])['text']
 
         formatted_data.append({
-            'type': type_map.get(otype, otype.capitalize()),
+            'type': OBJECTION_TYPE_LABELS.get(otype, otype.capitalize()),
             'freq': data['count'],
             'score': int(avg_score),
             'best': best_seller,
             'worst': worst_seller,
-            'best_response': best_response_text
+            'best_response': data['responses'][best_seller]['text']
         })
 
     return sorted(formatted_data, key=lambda x: x['freq'], reverse=True)
 
-def calculate_agent_scores(agent, analysis_list, start_date=None):
-    if not agent or not agent.external_uuid:
-        return {}
-    
-    agent_uuid = str(agent.external_uuid).strip()
-    if not agent_uuid:
-        return {}
-    
-    seller_data = {
-        'seller_name': agent.user.username,
-        'real_name': agent.user.first_name,
-        'uuid': agent_uuid
-    }
 
-    sales_data = get_sales_stage_metrics([agent_uuid], start_date=start_date)
-    
-    seller_data['total_conversations'] = sales_data.get('total_conversations', 0)
-    seller_data['sale_stage_distribution'] = sales_data.get('raw_stages', {})
-    seller_data['total_sales'] = sales_data.get('total_sales', 0)
+def format_objection_data(objections_list, team_members_dict):
+    """Objection analysis table rows from raw SALES_PERFORMANCE analytics rows."""
+    if not objections_list:
+        return []
 
-    followups = get_followups_detection([agent_uuid], start_date=start_date)
-    total_followups = sum(f.get('count', 0) for f in followups)
+    return format_objection_stats(objection_stats_from_facts(explode_objections(objections_list)), team_members_dict)
 
-    seller_data['total_followups'] = total_followups
 
-    if seller_data['total_conversations'] > 0:
-        seller_data['follow_up_rate'] = (total_followups / seller_data['total_conversations']) * 100
-    else:
-        seller_data['follow_up_rate'] = 0
+def _objection_facts_watermark():
+    """Watermark of the objection facts table, or None when it can't be used"""
+    if not getattr(settings, 'METRICS_ROLLUP_ENABLED', True):
+        return None
+    from .rollups import OBJECTION_FACTS_NAME, get_watermark
+    try:
+        return get_watermark(OBJECTION_FACTS_NAME)
+    except Exception as e:
+        print(f"Error reading objection facts watermark: {e}")
+        return None
 
 
-    scores = [a.get('result', {}).get('score') for a in analysis_list if a.get('analysis_type') == 'SENTIMENT_ANALYSIS']
-    scores = [s for s in scores if s is not None]
-    
-    seller_data['avg_performance'] = (sum(scores) / len(scores)) if scores else 0
+def _objection_facts_tail(agent_uuids, start_date, watermark):
+    """Objections of the analyses stored after the facts table was last updated"""
+    from .rollups import as_aware
 
-    best_practices_list = get_best_practices(analysis_list)
-    
-    counts = {
+    since = max(start_date, watermark) if start_date else watermark
+    tail = []
+    for fact in explode_objections(get_objections_from_database(agent_uuids, start_date=since)):
+        fact['created_at'] = as_aware(fact['created_at'])
+        if fact['created_at'] > watermark:
+            tail.append(fact)
+    return tail
+
+
+OBJECTION_FACT_FIELDS = (
+    'agent_uuid', 'conversation_uuid', 'created_at', 'objection_type',
+    'resolution_quality', 'resolved', 'objection_text', 'seller_response',
+)
+
+
+def get_critical_objections(team_members_uuids, start_date=None, threshold=60, limit=5):
+    """
+    Worst resolved objections of a team.
+
+    Reads the objection facts table (ordered by resolution_quality, created_at
+    with a LIMIT) plus the analyses stored since its last update; falls back to
+    exploding every SALES_PERFORMANCE row when the table hasn't been built.
+
+    Returns:
+        Dict with 'items' (the `limit` lowest scored objections under `threshold`,
+        shaped like ObjectionFact) and 'count' (all objections under `threshold`)
+    """
+    agent_uuids = list(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    if not agent_uuids:
+        return {'items': [], 'count': 0}
+
+    def sort_key(fact):
+        return (fact['resolution_quality'], fact['created_at'])
+
+    watermark = _objection_facts_watermark()
+    if watermark is not None:
+        from .models import ObjectionFact
+        try:
+            queryset = ObjectionFact.objects.filter(
+                agent_uuid__in=agent_uuids,
+                resolution_quality__lt=threshold,
+                created_at__lte=watermark
+            )
+            if start_date:
+                queryset = queryset.filter(created_at__gte=start_date)
+
+            items = list(queryset.order_by('resolution_quality', 'created_at').values(*OBJECTION_FACT_FIELDS)[:limit])
+            count = queryset.count()
+
+            tail = [fact for fact in _objection_facts_tail(agent_uuids, start_date, watermark)
+                    if fact['resolution_quality'] < threshold]
+
+            return {'items': sorted(items + tail, key=sort_key)[:limit], 'count': count + len(tail)}
+        except Exception as e:
+            print(f"Error reading objection facts, falling back to raw analyses: {e}")
+
+    facts = [fact for fact in explode_objections(get_objections_from_database(agent_uuids, start_date=start_date))
+             if fact['resolution_quality'] < threshold]
+    facts.sort(key=sort_key)
+    return {'items': facts[:limit], 'count': len(facts)}
+
+
+def get_objection_stats(team_members_uuids, start_date=None):
+    """
+    Objection counters per objection type and agent, for format_objection_stats.
+
+    Grouped in the objection facts table (plus the analyses stored since its
+    last update) or, when it hasn't been built, from the raw analyses.
+
+    Returns:
+        List of dicts with objection_type, agent_uuid, count, total_score,
+        best_score and best_response (the agent's best scored seller response)
+    """
+    agent_uuids = list(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    if not agent_uuids:
+        return []
+
+    watermark = _objection_facts_watermark()
+    if watermark is not None:
+        from django.db.models import Count, Max, Sum
+        from .models import ObjectionFact
+        try:
+            queryset = ObjectionFact.objects.filter(agent_uuid__in=agent_uuids, created_at__lte=watermark)
+            if start_date:
+                queryset = queryset.filter(created_at__gte=start_date)
+
+            stats = {}
+            grouped = queryset.order_by().values('objection_type', 'agent_uuid').annotate(
+                count=Count('id'),
+                total_score=Sum('resolution_quality'),
+                best_score=Max('resolution_quality')
+            )
+            for row in grouped:
+                stats[(row['objection_type'], row['agent_uuid'])] = {**row, 'best_response': ''}
+
+            best_responses = queryset.order_by(
+                'objection_type', 'agent_uuid', '-resolution_quality', 'created_at'
+            ).distinct('objection_type', 'agent_uuid').values('objection_type', 'agent_uuid', 'seller_response')
+            for row in best_responses:
+                key = (row['objection_type'], row['agent_uuid'])
+                if key in stats:
+                    stats[key]['best_response'] = row['seller_response']
+
+            tail = _objection_facts_tail(agent_uuids, start_date, watermark)
+            return merge_objection_stats(list(stats.values()), objection_stats_from_facts(tail))
+        except Exception as e:
+            print(f"Error reading objection facts, falling back to raw analyses: {e}")
+
+    return objection_stats_from_facts(explode_objections(get_objections_from_database(agent_uuids, start_date=start_date)))
+
+
+def empty_analysis_counters():
+    """Zeroed counters used to score an agent's analytics rows."""
+    return {
+        'best_practices_count': 0,
         'discount_score_sum': 0,
         'attempted_meetings': 0,
         'meetings_accepted': 0,
         'meetings_scheduled': 0,
         'referrals_attempted': 0,
-        'referrals_received': 0
+        'referrals_received': 0,
+        'sentiment_sum': 0,
+        'sentiment_count': 0,
+        'objections_total': 0,
+        'objections_resolved': 0,
     }
 
-    bp_count = len(best_practices_list)
-
-    for item in best_practices_list:
-        # Discount
-        d_score = item.get('discount_strategies', {}).get('discount_execution_score')
-        counts['discount_score_sum'] += d_score if d_score else 0
-
-        # Meetings
-        mp = item.get('meeting_planning', {})
-        if mp.get('attempted_meeting_scheduling') in [True, 'true']:
-            counts['attempted_meetings'] += 1
-        if mp.get('meeting_accepted') in [True, 'true']:
-            counts['meetings_accepted'] += 1
-        if mp.get('scheduled_datetime') not in [None, 'null']:
-            counts['meetings_scheduled'] += 1
-            
-        # Referrals
-        ref = item.get('referral_requests', {})
-        if ref.get('attempted_referral_request') in [True, 'true']:
-            counts['referrals_attempted'] += 1
-        counts['referrals_received'] += ref.get('referrals_received_count', 0)
 
+def analysis_counters_from_row(row):
+    """Counters dict from a row returned by analysis_counters_query."""
+    counters = empty_analysis_counters()
+    for key in counters:
+        value = row.get(key) or 0
+        counters[key] = float(value) if key in ('discount_score_sum', 'sentiment_sum') else int(value)
+    return counters
+
+
+def analysis_counters_query(where_sql, group_by_day=False):
+    """
+    SQL reducing the scored analytics rows to the scoring counters (see
+    empty_analysis_counters) in Postgres, one row per agent (or per agent
+    and day).
+
+    where_sql filters the analytics table and may contain %s placeholders.
+    Non-numeric JSON values count as 0.
+    """
+    table_name = getattr(settings, 'ANALYTICS_TABLE_NAME', 'analytics')
+    agent_id_col = getattr(settings, 'ANALYTICS_AGENT_ID_COLUMN', 'agent_uuid')
+    timestamp_col = getattr(settings, 'ANALYTICS_TIMESTAMP_COLUMN', 'created_at')
 
+    day_select = f", ({timestamp_col} AT TIME ZONE 'UTC')::date AS day" if group_by_day else ""
+    group_by = "agent_uuid, day" if group_by_day else "agent_uuid"
+
+    return f"""
+        WITH base AS (
+            SELECT {agent_id_col} AS agent_uuid{day_select}, analysis_type, result::jsonb AS r
+            FROM {table_name}
+            WHERE {where_sql}
+        ), scored AS (
+            SELECT
+                base.*,
+                CASE WHEN jsonb_typeof(r->'objection_details'->'objections_detected') = 'array'
+                     THEN r->'objection_details'->'objections_detected'
+                     ELSE '[]'::jsonb END AS objections
+            FROM base
+        ), scored_objections AS (
+            SELECT
+                scored.*,
+                jsonb_array_length(objections) AS objection_count,
+                (
+                    SELECT COUNT(*) FROM jsonb_array_elements(objections) AS o(value)
+                    WHERE o.value->>'resolved' = 'true'
+                ) AS resolved_count
+            FROM scored
+        )
+        SELECT
+            {group_by},
+            COUNT(*) FILTER (
+                WHERE analysis_type = 'BEST_PRACTICES' AND r IS NOT NULL AND r <> '{{}}'::jsonb
+            ) AS best_practices_count,
+            COALESCE(SUM(
+                CASE WHEN jsonb_typeof(r->'discount_strategies'->'discount_execution_score') = 'number'
+                     THEN (r->'discount_strategies'->>'discount_execution_score')::numeric END
+            ) FILTER (WHERE analysis_type = 'BEST_PRACTICES'), 0) AS discount_score_sum,
+            COUNT(*) FILTER (
+                WHERE analysis_type = 'BEST_PRACTICES'
+                AND r->'meeting_planning'->>'attempted_meeting_scheduling' = 'true'
+            ) AS attempted_meetings,
+            COUNT(*) FILTER (
+                WHERE analysis_type = 'BEST_PRACTICES'
+                AND r->'meeting_planning'->>'meeting_accepted' = 'true'
+            ) AS meetings_accepted,
+            COUNT(*) FILTER (
+                WHERE analysis_type = 'BEST_PRACTICES'
+                AND r->'meeting_planning'->>'scheduled_datetime' IS NOT NULL
+                AND r->'meeting_planning'->>'scheduled_datetime' <> 'null'
+            ) AS meetings_scheduled,
+            COUNT(*) FILTER (
+                WHERE analysis_type = 'BEST_PRACTICES'
+                AND r->'referral_requests'->>'attempted_referral_request' = 'true'
+            ) AS referrals_attempted,
+            COALESCE(SUM(
+                CASE WHEN jsonb_typeof(r->'referral_requests'->'referrals_received_count') = 'number'
+                     THEN (r->'referral_requests'->>'referrals_received_count')::numeric END
+            ) FILTER (WHERE analysis_type = 'BEST_PRACTICES'), 0) AS referrals_received,
+            COALESCE(SUM(
+                CASE WHEN jsonb_typeof(r->'score') = 'number' THEN (r->>'score')::numeric END
+            ) FILTER (WHERE analysis_type = 'SENTIMENT_ANALYSIS'), 0) AS sentiment_sum,
+            COUNT(*) FILTER (
+                WHERE analysis_type = 'SENTIMENT_ANALYSIS' AND jsonb_typeof(r->'score') = 'number'
+            ) AS sentiment_count,
+            COALESCE(SUM(objection_count) FILTER (
+                WHERE analysis_type = 'SALES_PERFORMANCE'
+            ), 0) AS objections_total,
+            COALESCE(SUM(resolved_count) FILTER (
+                WHERE analysis_type = 'SALES_PERFORMANCE'
+            ), 0) AS objections_resolved
+        FROM scored_objections
+        GROUP BY {group_by}
+    """
+
+
+def get_analysis_counters_by_agent(team_members_uuids, start_date=None, end_date=None):
+    """
+    Compute the scoring counters for every agent in Postgres, over the
+    analyses from start_date (inclusive) to end_date (exclusive).
+
+    The BEST_PRACTICES, SENTIMENT_ANALYSIS and SALES_PERFORMANCE results are
+    reduced with jsonb operators and FILTER clauses, so only one small row per
+    agent is transferred instead of every analytics row with its full JSON.
+
+    Returns:
+        Dict keyed by agent UUID string with the scoring counters (see empty_analysis_counters).
+        Every requested agent gets an entry.
+    """
+    agent_uuids = tuple(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    counters_by_agent = {agent_uuid: empty_analysis_counters() for agent_uuid in agent_uuids}
+
+    if not agent_uuids:
+        return counters_by_agent
+
+    try:
+        db_name = "analytics"
+        db_config = settings.DATABASES.get(db_name)
+        
+        if not db_config:
+            print(f"Error: Database {db_name} not configured.")
+            return counters_by_agent
+
+        agent_id_col = getattr(settings, 'ANALYTICS_AGENT_ID_COLUMN', 'agent_uuid')
+        timestamp_col = getattr(settings, 'ANALYTICS_TIMESTAMP_COLUMN', 'created_at')
+
+        params = [agent_uuids, SCORED_ANALYSIS_TYPES]
+        date_filter = ""
+        if start_date:
+            date_filter = f"AND {timestamp_col} >= %s"
+            params.append(start_date)
+        if end_date:
+            date_filter += f" AND {timestamp_col} < %s"
+            params.append(end_date)
+
+        query = analysis_counters_query(
+            f"{agent_id_col} IN %s AND analysis_type IN %s {date_filter}"
+        )
+
+        with get_connection(db_name) as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, tuple(params))
+                rows = cursor.fetchall()
+
+        for row in rows:
+            agent_uuid = str(row['agent_uuid'])
+            if agent_uuid in counters_by_agent:
+                counters_by_agent[agent_uuid] = analysis_counters_from_row(row)
+
+        return counters_by_agent
+
+    except Exception as e:
+        print(f"Unexpected error aggregating metrics: {e}")
+        return counters_by_agent
+
+
+def build_agent_scores(agent_uuid, sales_data, total_followups, counts):
+    """Compute an agent's score dict from its event counts and analysis counters."""
+    seller_data = {'uuid': agent_uuid}
+
+    seller_data['total_conversations'] = sales_data.get('total_conversations', 0)
+    seller_data['sale_stage_distribution'] = sales_data.get('raw_stages', {})
+    seller_data['total_sales'] = sales_data.get('total_sales', 0)
+
+    seller_data['total_followups'] = total_followups
+
+    if seller_data['total_conversations'] > 0:
+        seller_data['follow_up_rate'] = (total_followups / seller_data['total_conversations']) * 100
+    else:
+        seller_data['follow_up_rate'] = 0
+
+    sentiment_count = counts['sentiment_count']
+    seller_data['avg_performance'] = (counts['sentiment_sum'] / sentiment_count) if sentiment_count else 0
+
+    bp_count = counts['best_practices_count']
     base_count = bp_count if bp_count > 0 else 1
 
     seller_data['discount_strategy_rate'] = (counts['discount_score_sum'] / base_count)
@@ -356,17 +641,8 @@ def calculate_agent_scores(agent, analysis_list, start_date=None):
     seller_data['meetings_scheduled'] = counts['meetings_scheduled']
     seller_data['referrals_received'] = counts['referrals_received']
 
-    sales_performance_list = get_sales_performance(analysis_list)
-    obj_resolved = 0
-    obj_total = 0
-    
-    for item in sales_performance_list:
-        objs = item.get('objection_details', {}).get('objections_detected', [])
-        for obj in objs:
-            obj_total += 1
-            if obj.get('resolved') in [True, 'true']:
-                obj_resolved += 1
-                
+    obj_total = counts['objections_total']
+    obj_resolved = counts['objections_resolved']
     seller_data['objection_resolution_rate'] = (obj_resolved / obj_total * 100) if obj_total > 0 else 0
     
     seller_data['avg_seller_messages'] = 0 
@@ -375,9 +651,51 @@ def calculate_agent_scores(agent, analysis_list, start_date=None):
     return seller_data
     
 
-def get_team_summary_stats(team_members, start_date=None):
-    from .analytics_metrics import get_metrics_for_agent, calculate_agent_scores
+def empty_agent_scores(agent_uuid=''):
+    """Score dict of an agent without any events or analyses"""
+    return build_agent_scores(agent_uuid, {}, 0, empty_analysis_counters())
+
+
+def get_team_agent_scores(team_uuids, start_date=None):
+    """
+    Score every agent of a team with a constant number of queries.
+
+    Per-agent score dicts (see build_agent_scores), keyed by agent UUID
+    string. Reads the daily rollup when it has been built (settings.METRICS_ROLLUP_ENABLED), else the raw tables.
+    """
+    agent_uuids = list(dict.fromkeys(str(uid).strip() for uid in team_uuids or [] if uid and str(uid).strip()))
+    if not agent_uuids:
+        return {}
+
+    rollup_counts = None
+    if getattr(settings, 'METRICS_ROLLUP_ENABLED', True):
+        from .rollups import get_rollup_agent_counts
+        try:
+            rollup_counts = get_rollup_agent_counts(agent_uuids, start_date=start_date)
+        except Exception as e:
+            print(f"Error reading agent metrics rollup, falling back to raw tables: {e}")
 
+    if rollup_counts is not None:
+        event_counts, analysis_counters = rollup_counts
+    else:
+        event_counts = get_event_counts_by_agent(agent_uuids, start_date=start_date)
+        analysis_counters = get_analysis_counters_by_agent(agent_uuids, start_date=start_date)
+
+    scores = {}
+    for agent_uuid in agent_uuids:
+        counts = event_counts.get(agent_uuid, {})
+        scores[agent_uuid] = build_agent_scores(
+            agent_uuid,
+            counts,
+            counts.get('total_followups', 0),
+            analysis_counters.get(agent_uuid, empty_analysis_counters())
+        )
+
+    return scores
+
+
+def summarize_team_scores(team_members, agent_scores):
+    """Team summary card values from per-agent score dicts keyed by agent UUID."""
     aggregates = {
         'total_conversations': 0,
         'total_sales': 0,
@@ -388,10 +706,11 @@ def get_team_summary_stats(team_members, start_date=None):
     }
 
     for member in team_members:
-        analysis_list = get_metrics_for_agent(member.external_uuid, start_date)
-        agent_data = calculate_agent_scores(member, analysis_list, start_date=start_date)
-        
-        if not agent_data: continue
+        agent_uuid = str(member.external_uuid or '').strip()
+        if not agent_uuid: continue
+
+        # Agents without any events or analyses in the period score zero
+        agent_data = agent_scores.get(agent_uuid) or empty_agent_scores(agent_uuid)
 
         aggregates['total_conversations'] += agent_data.get('total_conversations', 0)
         aggregates['total_sales'] += agent_data.get('total_sales', 0)
@@ -418,6 +737,201 @@ def get_team_summary_stats(team_members, start_date=None):
         'avg_performance': round(aggregates['sum_performance'] / num_agents, 2)
     }
 
+
+def get_team_summary_stats(team_members, start_date=None):
+    team_uuids = [member.external_uuid for member in team_members if member.external_uuid]
+    agent_scores = get_team_agent_scores(team_uuids, start_date=start_date)
+
+    return summarize_team_scores(team_members, agent_scores)
+
+
+METRIC_WINDOWS = (7, 30, 90, 365)
+
+
+def get_windowed_analysis_counters_by_agent(team_members_uuids, periods):
+    """
+    Per-agent scheduled meetings and sentiment average for several periods in
+    one scan, using one FILTER aggregate per period.
+
+    Args:
+        team_members_uuids: Agent UUIDs
+        periods: (name, start, end) tuples from events_db.window_periods
+
+    Returns:
+        Dict keyed by period name, then by agent UUID, with 'meetings_scheduled'
+        and 'avg_performance'. Raises on database errors.
+    """
+    agent_uuids = tuple(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    counters = {
+        name: {agent_uuid: {'meetings_scheduled': 0, 'avg_performance': 0} for agent_uuid in agent_uuids}
+        for name, _, _ in periods
+    }
+    db_name = 'analytics'
+    if not agent_uuids or not periods or not settings.DATABASES.get(db_name):
+        return counters
+
+    table_name = getattr(settings, 'ANALYTICS_TABLE_NAME', 'analytics')
+    agent_id_col = getattr(settings, 'ANALYTICS_AGENT_ID_COLUMN', 'agent_uuid')
+    timestamp_col = getattr(settings, 'ANALYTICS_TIMESTAMP_COLUMN', 'created_at')
+
+    params = {'agent_uuids': agent_uuids, 'oldest': min(start for _, start, _ in periods)}
+    aggregates = []
+    for name, start, end in periods:
+        params[f'{name}_start'] = start
+        params[f'{name}_end'] = end
+        condition = window_filter(name, end, timestamp_col)
+        aggregates.append(f"""
+            COUNT(*) FILTER (
+                WHERE analysis_type = 'BEST_PRACTICES'
+                AND r->'meeting_planning'->>'scheduled_datetime' IS NOT NULL
+                AND r->'meeting_planning'->>'scheduled_datetime' <> 'null'
+                AND {condition}
+            ) AS {name}_meetings,
+            AVG(CASE WHEN jsonb_typeof(r->'score') = 'number' THEN (r->>'score')::numeric END) FILTER (
+                WHERE analysis_type = 'SENTIMENT_ANALYSIS' AND {condition}
+            ) AS {name}_sentiment""")
+
+    query = f"""
+        WITH base AS (
+            SELECT {agent_id_col} AS agent_uuid, {timestamp_col}, analysis_type, result::jsonb AS r
+            FROM {table_name}
+            WHERE {agent_id_col} IN %(agent_uuids)s
+            AND analysis_type IN ('BEST_PRACTICES', 'SENTIMENT_ANALYSIS')
+            AND {timestamp_col} >= %(oldest)s
+        )
+        SELECT agent_uuid, {','.join(aggregates)}
+        FROM base
+        GROUP BY agent_uuid
+    """
+
+    with get_connection(db_name) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+    for row in rows:
+        agent_uuid = str(row['agent_uuid'])
+        for name, _, _ in periods:
+            agent_counters = counters[name].get(agent_uuid)
+            if agent_counters is None:
+                continue
+            agent_counters['meetings_scheduled'] = row[f'{name}_meetings']
+            agent_counters['avg_performance'] = float(row[f'{name}_sentiment'] or 0)
+
+    return counters
+
+
+def _rollup_window_scores(team_uuids, periods):
+    """
+    Per-period agent score dicts (see build_agent_scores) from the daily
+    rollup, with the distinct conversation counts from the raw events.
+
+    Returns:
+        Dict keyed by period name, then by agent UUID, or None when the
+        rollup is disabled, hasn't been built or can't be read
+    """
+    if not getattr(settings, 'METRICS_ROLLUP_ENABLED', True):
+        return None
+
+    from .rollups import get_rollup_agent_counts
+
+    period_scores = {}
+    try:
+        for name, start, end in periods:
+            rollup_counts = get_rollup_agent_counts(team_uuids, start_date=start, end_date=end, count_conversations=False)
+            if rollup_counts is None:
+                return None
+            event_counts, analysis_counters = rollup_counts
+            period_scores[name] = {
+                agent_uuid: build_agent_scores(
+                    agent_uuid,
+                    event_counts.get(agent_uuid, {}),
+                    event_counts.get(agent_uuid, {}).get('total_followups', 0),
+                    analysis_counters.get(agent_uuid, empty_analysis_counters())
+                )
+                for agent_uuid in team_uuids
+            }
+    except Exception as e:
+        print(f"Error reading agent metrics rollup, falling back to raw tables: {e}")
+        return None
+
+    conversation_counts = get_windowed_conversation_counts_by_agent(team_uuids, periods)
+    for name, agent_scores in period_scores.items():
+        for agent_uuid, scores in agent_scores.items():
+            scores['total_conversations'] = conversation_counts[name].get(agent_uuid, 0)
+    return period_scores
+
+
+def get_team_window_metrics(team_members, windows=METRIC_WINDOWS):
+    """
+    Team summary (see get_team_summary_stats) for standard windows and the
+    period before each.
+
+    Sales, follow-ups, meetings and sentiment are read from the daily rollup
+    (see rollups.get_rollup_agent_counts) once it has been built, so only the
+    partial days at the edges of each period hit the raw tables; the distinct
+    conversation counts, which can't be summed across days, come from one raw
+    scan of every period. Without the rollup each database is scanned once
+    for all the periods.
+
+    Each window is cached per team for settings.METRIC_WINDOWS_CACHE_TTL
+    seconds, so switching back to a period or comparing with the previous
+    period is free. On a miss only the missing windows are computed, so
+    callers should ask for the windows they show rather than all of them.
+
+    Returns:
+        Dict keyed by window length in days, each with 'current' and 'previous'
+        summaries and 'deltas' (percent change per summary value, None when the
+        previous value is 0)
+    """
+    team_uuids = sorted({str(member.external_uuid).strip() for member in team_members if member.external_uuid})
+    team_key = 'team_window_metrics:' + hashlib.sha1(','.join(team_uuids).encode()).hexdigest()
+    cache_keys = {days: f'{team_key}:{days}' for days in windows}
+
+    cached = cache.get_many(list(cache_keys.values()))
+    window_metrics = {days: cached[key] for days, key in cache_keys.items() if key in cached}
+    missing = [days for days in windows if days not in window_metrics]
+    if not missing:
+        return window_metrics
+
+    periods = window_periods(missing, timezone.now())
+    period_scores = _rollup_window_scores(team_uuids, periods)
+    if period_scores is None:
+        event_counts = get_windowed_event_counts_by_agent(team_uuids, periods)
+        analysis_counters = get_windowed_analysis_counters_by_agent(team_uuids, periods)
+        period_scores = {
+            name: {
+                agent_uuid: {**event_counts[name].get(agent_uuid, {}), **analysis_counters[name].get(agent_uuid, {})}
+                for agent_uuid in team_uuids
+            }
+            for name, _, _ in periods
+        }
+
+    summaries = {
+        name: summarize_team_scores(team_members, period_scores[name])
+        for name, _, _ in periods
+    }
+
+    computed = {}
+    for days in missing:
+        current = summaries[f'current_{days}']
+        previous = summaries[f'previous_{days}']
+        computed[days] = {
+            'current': current,
+            'previous': previous,
+            'deltas': {
+                key: round((value - previous[key]) / previous[key] * 100, 1) if previous[key] else None
+                for key, value in current.items()
+            },
+        }
+
+    cache.set_many(
+        {cache_keys[days]: metrics for days, metrics in computed.items()},
+        getattr(settings, 'METRIC_WINDOWS_CACHE_TTL', 300)
+    )
+    window_metrics.update(computed)
+    return {days: window_metrics[days] for days in windows}
+
 def get_stage_scores(analysis_list, members_analysis=None):
     LABEL_TRANSLATIONS = {
         'closing': 'Fechamento',
@@ -0,0 +1,264 @@
+"""
+Columnar query engine for the analytics_* views.
+
+query_dataset() filters, sorts, selects columns and paginates a dataset held
+either as a pyarrow Table (the gold datasets, see gold_store.py) or as a list
+of dicts (the clients analysis). Sorting is typed (numbers and timestamps in
+value order, text case-insensitively, empty values last) and done with a
+vectorized argsort; the permutation is cached per dataset object, column and
+direction, so paging through or re-sorting a dataset that hasn't changed
+costs no sort at all. Only the rows of the requested page are materialized
+as dicts.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Timestamps are rendered like in the JSON copies of the gold datasets
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Sort permutations kept, one per (dataset, column, direction)
+SORT_CACHE_SIZE = 64
+
+# (id(dataset), column, descending) -> (dataset, permutation); the dataset is
+# kept referenced so its id can't be reused while the entry exists
+_sort_cache = OrderedDict()
+_sort_cache_lock = threading.Lock()
+
+FILTER_OPERATORS = {
+    '==': lambda value, operand: value == operand,
+    '=': lambda value, operand: value == operand,
+    '!=': lambda value, operand: value != operand,
+    '<': lambda value, operand: value is not None and value < operand,
+    '<=': lambda value, operand: value is not None and value <= operand,
+    '>': lambda value, operand: value is not None and value > operand,
+    '>=': lambda value, operand: value is not None and value >= operand,
+    'in': lambda value, operand: value in operand,
+    'not in': lambda value, operand: value not in operand,
+}
+
+
+def _is_table(dataset):
+    return hasattr(dataset, 'schema') and hasattr(dataset, 'num_rows')
+
+
+def dataset_columns(dataset):
+    """Column names of a table, or the keys of a record list's first record"""
+    if _is_table(dataset):
+        return dataset.column_names
+    return list(dataset[0].keys()) if dataset else []
+
+
+def table_to_records(table):
+    """Rows of an Arrow table as dicts, with timestamps formatted like the JSON copies"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for index, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            seconds = pc.cast(table.column(index), pa.timestamp('s', tz=field.type.tz), safe=False)
+            table = table.set_column(index, field.name, pc.strftime(seconds, format=TIMESTAMP_FORMAT))
+    return table.to_pylist()
+
+
+def _column_array(values):
+    import pyarrow as pa
+
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def records_to_table(records):
+    """
+    Arrow table of a list of dicts, with the first record's columns; a column
+    mixing incompatible types is kept as text
+    """
+    import pyarrow as pa
+
+    columns = dataset_columns(records)
+    if not columns:
+        return pa.table({})
+    return pa.Table.from_arrays(
+        [_column_array([record.get(column) for record in records]) for column in columns], names=columns
+    )
+
+
+def record_matches(record, filters):
+    """Whether a record passes (column, operator, value) filters"""
+    for column, operator, operand in filters:
+        if hasattr(operand, 'strftime'):
+            operand = operand.strftime(TIMESTAMP_FORMAT)
+        if not FILTER_OPERATORS[operator](record.get(column), operand):
+            return False
+    return True
+
+
+def _text_key(value):
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value).lower()
+    return str(value).lower()
+
+
+def _record_sort_key(records, column):
+    """Arrow array to sort a record list by: numeric when every value is a number, else lower-cased text"""
+    import pyarrow as pa
+
+    values = [record.get(column) for record in records]
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return pa.array([float(value) if value is not None else None for value in values], type=pa.float64())
+    return pa.array([_text_key(value) if value is not None else None for value in values], type=pa.string())
+
+
+def _table_sort_key(table, column):
+    """Arrow array to sort a table by: the column itself, lower-cased for text"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    array = table.column(column)
+    column_type = array.type
+    if pa.types.is_string(column_type) or pa.types.is_large_string(column_type):
+        return pc.utf8_lower(array)
+    is_list = pa.types.is_list(column_type) or pa.types.is_large_list(column_type)
+    if is_list and (pa.types.is_string(column_type.value_type) or pa.types.is_large_string(column_type.value_type)):
+        return pc.utf8_lower(pc.binary_join(array, ', '))
+    if pa.types.is_null(column_type):
+        return array
+    if is_list or pa.types.is_struct(column_type) or pa.types.is_map(column_type):
+        return pa.array([_text_key(value) if value is not None else None for value in array.to_pylist()])
+    return array
+
+
+def sort_permutation(dataset, column, descending=False, cache=True):
+    """
+    Row order of a dataset sorted by one column (stable, empty values last).
+
+    With cache, the permutation is kept (with a reference to the dataset)
+    and reused for the same dataset object; datasets built per request
+    should pass cache=False rather than fill the cache. Cached datasets must
+    not be mutated.
+
+    Returns:
+        NumPy array of row indices
+    """
+    import pyarrow.compute as pc
+
+    key = (id(dataset), column, descending)
+    if cache:
+        with _sort_cache_lock:
+            entry = _sort_cache.get(key)
+            if entry is not None and entry[0] is dataset:
+                _sort_cache.move_to_end(key)
+                return entry[1]
+
+    sort_key = _table_sort_key(dataset, column) if _is_table(dataset) else _record_sort_key(dataset, column)
+    permutation = pc.sort_indices(
+        sort_key, sort_keys=[('', 'descending' if descending else 'ascending')], null_placement='at_end'
+    ).to_numpy()
+    if not cache:
+        return permutation
+
+    with _sort_cache_lock:
+        _sort_cache[key] = (dataset, permutation)
+        _sort_cache.move_to_end(key)
+        while len(_sort_cache) > SORT_CACHE_SIZE:
+            _sort_cache.popitem(last=False)
+    return permutation
+
+
+def _filter_mask(dataset, filters):
+    """Boolean NumPy mask of the rows passing filters"""
+    if _is_table(dataset):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = list(dict.fromkeys(column for column, _, _ in filters))
+        row_numbers = pa.array(np.arange(dataset.num_rows))
+        matching = dataset.select(columns).append_column('__row', row_numbers).filter(
+            pq.filters_to_expression(filters)
+        ).column('__row').to_numpy()
+        mask = np.zeros(dataset.num_rows, dtype=bool)
+        mask[matching] = True
+        return mask
+    return np.fromiter((record_matches(record, filters) for record in dataset), dtype=bool, count=len(dataset))
+
+
+def query_dataset(
+    dataset, sort=None, order='asc', filters=None, columns=None, page=1, per_page=50, cache_sort=True, rows=None
+):
+    """
+    One page of a dataset, filtered and sorted.
+
+    Args:
+        dataset: pyarrow Table or list of dicts (not modified)
+        sort: Column to sort by (ignored if unknown; None keeps the dataset order)
+        order: 'asc' or 'desc'
+        filters: (column, operator, value) tuples, all of which must match;
+            operators are those of FILTER_OPERATORS
+        columns: Columns to return (None for all)
+        page: 1-based page number
+        per_page: Rows per page
+        cache_sort: Keep the sort permutation for later queries on the same
+            dataset object (see sort_permutation)
+        rows: Indices of the rows to query (e.g. looked up in an index);
+            None for all rows
+
+    Returns:
+        Dict with 'data' (dicts of the page's rows), 'stats' (row_count of
+        the filtered rows, column_count and columns) and 'total_pages'
+    """
+    if dataset is None:
+        dataset = []
+    is_table = _is_table(dataset)
+    row_total = dataset.num_rows if is_table else len(dataset)
+    all_columns = dataset_columns(dataset)
+
+    if sort and sort in all_columns and row_total:
+        indices = sort_permutation(dataset, sort, descending=(order == 'desc'), cache=cache_sort)
+    else:
+        indices = None
+
+    if rows is not None:
+        # Restrict to the given rows, in dataset order unless sorted
+        rows = np.asarray(rows, dtype=np.int64)
+        if indices is not None:
+            mask = np.zeros(row_total, dtype=bool)
+            mask[rows] = True
+            indices = indices[mask[indices]]
+        else:
+            indices = np.sort(rows)
+
+    if filters and row_total:
+        mask = _filter_mask(dataset, filters)
+        if indices is not None:
+            indices = indices[mask[indices]]
+        else:
+            indices = np.flatnonzero(mask)
+
+    row_count = len(indices) if indices is not None else row_total
+    start = max(page - 1, 0) * per_page
+    if indices is not None:
+        page_indices = indices[start:start + per_page]
+    else:
+        page_indices = np.arange(start, min(start + per_page, row_total))
+
+    if columns:
+        columns = [column for column in columns if column in all_columns]
+    result_columns = columns or all_columns
+
+    if is_table:
+        page_table = dataset.take(page_indices) if len(page_indices) else dataset.slice(0, 0)
+        data = table_to_records(page_table.select(result_columns))
+    else:
+        data = [dataset[index] for index in page_indices]
+        if columns:
+            data = [{column: record.get(column) for column in columns} for record in data]
+
+    return {
+        'data': data,
+        'stats': {'row_count': row_count, 'column_count': len(result_columns), 'columns': result_columns},
+        'total_pages': (row_count + per_page - 1) // per_page if per_page else 0,
+    }
@@ -1,15 +1,114 @@
 """
-Utility functions for loading analytics data from JSON files
+Utility functions for loading analytics data from JSON and Parquet files
+
+The gold datasets also ship as Parquet (GOLD_PARQUET_DIR). read_gold_table
+and get_gold_page serve them from the memory-mapped Arrow store shared by all
+workers (see gold_store.py); get_gold_page filters, sorts and pages them with
+the columnar query engine (see analytics_query.py), which materializes only
+the rows of the requested page.
+
+Parsed files are kept in an in-process LRU cache keyed by path and
+modification time (see load_cached_dataset), so repeat requests don't parse
+them again and updated files are picked up without a restart. Cached data
+is shared between requests: callers must not mutate it.
 """
 import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from django.conf import settings
 import os
 
+from .analytics_query import query_dataset, records_to_table
+
 
 # Base directory for gold JSON data
 GOLD_DATA_DIR = Path(__file__).resolve().parent.parent / 'tempData' / 'handoff_package_20251202' / 'gold_json'
 
+# Parquet copies of the gold datasets (same rows, typed columns)
+GOLD_PARQUET_DIR = GOLD_DATA_DIR.parent / 'gold'
+
+# Gold dataset name -> file name without extension (.json / .parquet)
+GOLD_DATASETS = {
+    'cx_volumetrics': 'exploratory_cx_volumetrics_20251126',
+    'friction_heuristics': 'exploratory_friction_heuristics_20251126',
+    'temporal_heat': 'exploratory_temporal_heat_20251126',
+    'churn_risk_monitor': 'gold_churn_risk_monitor_20251126',
+    'sales_velocity': 'gold_sales_velocity_20251126',
+    'segmentation_matrix': 'gold_segmentation_matrix_20251126',
+}
+
+# Datasets whose Parquet copy holds the same rows as the JSON one; the
+# temporal heat Parquet file has different counts, so it is read from JSON
+GOLD_PARQUET_DATASETS = {
+    'cx_volumetrics', 'friction_heuristics', 'churn_risk_monitor', 'sales_velocity', 'segmentation_matrix',
+}
+
+# Clients analysis with per-window metrics, and the windows it covers
+CLIENTS_ANALYSIS_FILE = 'clients_analysis_20251211_055217.json'
+CLIENT_TIME_WINDOWS = ['last_week', 'last_month', 'last_3_months', 'last_6_months', 'last_year']
+
+# (path, loader) -> ((mtime_ns, size), data, size), least recently used first
+_dataset_cache = OrderedDict()
+_dataset_cache_lock = threading.Lock()
+
+
+def _read_json(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _read_json_table(file_path):
+    return records_to_table(_read_json(file_path) or [])
+
+
+def load_cached_dataset(file_path, loader=_read_json):
+    """
+    Parsed contents of a data file, from the in-process cache while the file
+    is unchanged.
+    
+    Entries are keyed by path and loader, and invalidated when the file's
+    mtime or size changes. The cache holds at most settings.GOLD_DATA_CACHE_MAX_BYTES of
+    files (by size on disk), evicting the least recently used ones; a single
+    larger file is still kept.
+    
+    Args:
+        file_path: Path of the file
+        loader: Function parsing the file at a path (json.load by default)
+    
+    Returns:
+        Whatever loader returns; raises OSError if the file can't be read
+    """
+    stat = os.stat(file_path)
+    key = (str(file_path), loader)
+    version = (stat.st_mtime_ns, stat.st_size)
+    
+    with _dataset_cache_lock:
+        entry = _dataset_cache.get(key)
+        if entry is not None and entry[0] == version:
+            _dataset_cache.move_to_end(key)
+            return entry[1]
+    
+    # Parse outside the lock; concurrent misses on the same file both parse it
+    data = loader(file_path)
+    
+    max_bytes = getattr(settings, 'GOLD_DATA_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+    with _dataset_cache_lock:
+        _dataset_cache[key] = (version, data, stat.st_size)
+        _dataset_cache.move_to_end(key)
+        total = sum(size for _, _, size in _dataset_cache.values())
+        while total > max_bytes and len(_dataset_cache) > 1:
+            _, (_, _, size) = _dataset_cache.popitem(last=False)
+            total -= size
+    
+    return data
+
+
+def clear_dataset_cache():
+    """Drop every cached dataset"""
+    with _dataset_cache_lock:
+        _dataset_cache.clear()
+
 
 def load_json_file(filename):
     """
@@ -27,14 +126,113 @@ def load_json_file(filename):
         return None
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
+        return load_cached_dataset(file_path)
     except Exception as e:
         print(f"Error loading {filename}: {e}")
         return None
 
 
+def load_json_table(filename):
+    """
+    Arrow table of a JSON file from the gold data directory (see
+    analytics_query.records_to_table), cached like load_json_file
+    
+    Returns:
+        pyarrow.Table or None if file not found
+    """
+    file_path = GOLD_DATA_DIR / filename
+    
+    if not file_path.exists():
+        return None
+    
+    try:
+        return load_cached_dataset(file_path, loader=_read_json_table)
+    except Exception as e:
+        print(f"Error loading {filename}: {e}")
+        return None
+
+
+def read_gold_table(name, columns=None, filters=None):
+    """
+    Arrow table of a gold dataset, from the shared memory-mapped store.
+    
+    Column selection is zero-copy; filters are evaluated on the mapped
+    columns they reference and only the matching rows are copied. When the
+    store can't be read (e.g. a full disk or a corrupt Arrow file), the
+    table is built from the dataset's JSON copy instead.
+    
+    Args:
+        name: Key of GOLD_DATASETS
+        columns: Column names to return (None for all)
+        filters: pyarrow filters, e.g. [('client_name', '==', 'ACME'),
+            ('date', '>=', datetime(2025, 1, 1))]
+    
+    Returns:
+        pyarrow.Table, or None when the dataset has no data file
+    """
+    import pyarrow.parquet as pq
+    from .gold_store import get_table
+    
+    try:
+        table = get_table(name)
+    except Exception as e:
+        print(f"Error reading {name} from the Arrow store, falling back to JSON: {e}")
+        table = load_json_table(f'{GOLD_DATASETS[name]}.json')
+    if table is None:
+        return None
+    
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    return table.select(columns) if columns else table
+
+
+def get_gold_stats(name):
+    """
+    Statistics of a gold dataset, as get_summary_stats plus per-column
+    column_stats, from its manifest (see gold_store.get_gold_manifest)
+    without reading the data
+    """
+    import pyarrow as pa
+    from .gold_store import get_gold_manifest
+    
+    try:
+        manifest = get_gold_manifest(name)
+    except (OSError, ValueError, pa.ArrowException) as e:
+        print(f"Error reading the {name} manifest: {e}")
+        manifest = None
+    if manifest is None:
+        return get_summary_stats(None)
+    return manifest
+
+
+def get_gold_page(name, page=1, per_page=50, columns=None, filters=None, sort=None, order='asc'):
+    """
+    One page of a gold dataset, materializing only the rows of that page.
+    
+    Queries the Arrow store (see read_gold_table) with query_dataset and falls
+    back to the JSON copy when it has no table for the dataset.
+    
+    Args:
+        name: Key of GOLD_DATASETS
+        page: 1-based page number
+        per_page: Rows per page
+        columns: Column names to return (None for all)
+        filters: Row filters, as for read_gold_table
+        sort: Column to sort by (None keeps the file order)
+        order: 'asc' or 'desc'
+    
+    Returns:
+        Dict with 'data' (list of dicts), 'stats' (as get_summary_stats, for
+        the filtered rows) and 'total_pages'
+    """
+    dataset = read_gold_table(name)
+    if dataset is None:
+        dataset = load_json_file(f'{GOLD_DATASETS[name]}.json') or []
+    return query_dataset(
+        dataset, sort=sort, order=order, filters=filters, columns=columns, page=page, per_page=per_page
+    )
+
+
 def get_cx_volumetrics():
     """Load CX volumetrics data"""
     return load_json_file('exploratory_cx_volumetrics_20251126.json')
@@ -54,21 +252,62 @@ def get_churn_risk_monitor():
     """Load churn risk monitor data"""
     return load_json_file('gold_churn_risk_monitor_20251126.json')
 
-def get_clients_analysis():
-    """Load clients analysis data from the newest JSON file"""
-    file_path = GOLD_DATA_DIR / 'clients_analysis_20251211_055217.json'
+def _read_clients_analysis(file_path):
+    """Parsed clients analysis plus its per-window projections (see get_client_window_table)"""
+    data = _read_json(file_path)
+    metadata = data.get('metadata') or {}
+    time_windows = metadata.get('time_windows_available') or CLIENT_TIME_WINDOWS
+    clients = data.get('clients', [])
+    window_tables = {window: build_client_window_table(clients, window) for window in time_windows}
+    return data, window_tables
+
+
+def load_clients_analysis():
+    """(parsed file, window tables) of the clients analysis, or None if it can't be read"""
+    file_path = GOLD_DATA_DIR / CLIENTS_ANALYSIS_FILE
     
     if not file_path.exists():
-        return None, None, None
+        return None
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        # Return clients array, metadata, and global_analyses
-        return data.get('clients', []), data.get('metadata', {}), data.get('global_analyses', {})
+        return load_cached_dataset(file_path, loader=_read_clients_analysis)
     except Exception as e:
-        print(f"Error loading clients_analysis_20251211_055217.json: {e}")
+        print(f"Error loading {CLIENTS_ANALYSIS_FILE}: {e}")
+        return None
+
+
+def get_clients_analysis():
+    """Load clients analysis data from the newest JSON file"""
+    loaded = load_clients_analysis()
+    if loaded is None:
         return None, None, None
+    
+    data = loaded[0]
+    # Return clients array, metadata, and global_analyses
+    return data.get('clients', []), data.get('metadata', {}), data.get('global_analyses', {})
+
+
+def get_client_window_table(time_window='last_6_months'):
+    """
+    Columnar projection of the clients analysis for a time window, with the
+    columns of transform_clients_for_time_window.
+    
+    The projections of every window are built once when the file is loaded
+    and cached with it, so switching windows or sorting (the query engine
+    caches sort orders per table) doesn't rebuild any rows.
+    
+    Returns:
+        pyarrow.Table, or None if the file or the window isn't available
+    """
+    loaded = load_clients_analysis()
+    if loaded is None:
+        return None
+    return loaded[1].get(time_window)
+
+
+def build_client_window_table(clients, time_window):
+    """Rows of transform_clients_for_time_window as an Arrow table"""
+    return records_to_table(transform_clients_for_time_window(clients, time_window))
 
 
 def transform_clients_for_time_window(clients, time_window='last_6_months'):
@@ -0,0 +1,45 @@
+"""
+Async versions of the events, analytics, followups and MongoDB fetchers for the ASGI views.
+
+psycopg2 and pymongo are blocking drivers, so each fetcher runs in the event
+loop's thread pool (sync_to_async with thread_sensitive=False). They go through
+the shared connection pool and MongoClient, so many in-flight requests can wait
+on I/O without holding a worker each.
+"""
+from asgiref.sync import sync_to_async
+
+from . import events_db, analytics_metrics, followups, mongodb
+
+
+def _to_async(func):
+    return sync_to_async(func, thread_sensitive=False)
+
+
+# Events database
+aget_events_for_conversation = _to_async(events_db.get_events_for_conversation)
+aget_sales_stage_metrics = _to_async(events_db.get_sales_stage_metrics)
+aget_event_counts_by_agent = _to_async(events_db.get_event_counts_by_agent)
+
+# Analytics database
+aget_metrics_for_agent = _to_async(analytics_metrics.get_metrics_for_agent)
+aget_metrics_for_team_members = _to_async(analytics_metrics.get_metrics_for_team_members)
+aget_objections_from_database = _to_async(analytics_metrics.get_objections_from_database)
+aget_critical_objections = _to_async(analytics_metrics.get_critical_objections)
+aget_objection_stats = _to_async(analytics_metrics.get_objection_stats)
+aget_analysis_counters_by_agent = _to_async(analytics_metrics.get_analysis_counters_by_agent)
+aget_team_agent_scores = _to_async(analytics_metrics.get_team_agent_scores)
+aget_team_summary_stats = _to_async(analytics_metrics.get_team_summary_stats)
+aget_team_window_metrics = _to_async(analytics_metrics.get_team_window_metrics)
+
+# Followups database
+aget_followups_for_agent = _to_async(followups.get_followups_for_agent)
+aget_link_tracking_from_agent = _to_async(followups.get_link_tracking_from_agent)
+acreate_tracked_link = _to_async(followups.create_tracked_link)
+
+# MongoDB
+aget_conversations_collection = _to_async(mongodb.get_conversations_collection)
+aget_all_sellers = _to_async(mongodb.get_all_sellers)
+aget_all_tags = _to_async(mongodb.get_all_tags)
+aget_all_sales_stages = _to_async(mongodb.get_all_sales_stages)
+aget_uuid_to_email_mapping = _to_async(mongodb.get_uuid_to_email_mapping)
+amongodb_health_check = _to_async(mongodb.mongodb_health_check)
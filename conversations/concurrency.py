@@ -0,0 +1,128 @@
+"""
+Run independent data fetches concurrently (thread pool for sync views, asyncio for ASGI views)
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.db import connections
+
+# Fetches still running after their request gave up on them
+_stuck_lock = threading.Lock()
+_stuck_count = 0
+
+
+def _fetch_executor(task_count):
+    """Thread pool for one fan-out, sized to its tasks (at most settings.FETCH_POOL_MAX_WORKERS)"""
+    max_workers = max(min(task_count, getattr(settings, 'FETCH_POOL_MAX_WORKERS', 8)), 1)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cosmos-fetch')
+
+
+def _track_stuck(future):
+    """Count a timed-out fetch until its thread finishes"""
+    global _stuck_count
+
+    with _stuck_lock:
+        _stuck_count += 1
+
+    def _done(_):
+        global _stuck_count
+        with _stuck_lock:
+            _stuck_count -= 1
+
+    future.add_done_callback(_done)
+
+
+def get_stuck_fetch_count():
+    """Number of timed-out fetches whose threads are still running"""
+    with _stuck_lock:
+        return _stuck_count
+
+
+def _run_task(func):
+    try:
+        return func()
+    finally:
+        # Django opens one connection per thread; don't leave them behind in pool threads
+        connections.close_all()
+
+
+def fetch_concurrently(tasks, timeout=None):
+    """
+    Run independent fetches in parallel and collect their results.
+
+    Args:
+        tasks: Dict mapping a result name to a (callable, default) tuple. Use
+               functools.partial to bind arguments. The default is returned
+               when the call raises or doesn't finish in time.
+        timeout: Seconds to wait for all calls (settings.FETCH_TIMEOUT if None)
+
+    Returns:
+        Dict mapping each name to its result (or its default)
+
+    Usage:
+        results = fetch_concurrently({
+            'followups': (partial(get_followups_for_agent, agent_uuid), []),
+            'links': (partial(get_link_tracking_from_agent, agent_uuid), []),
+        })
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'FETCH_TIMEOUT', 20)
+
+    # A per-call pool: a fetch that hangs past the timeout only holds a thread
+    # of its own request (until the database's statement_timeout ends it),
+    # never a worker shared with other requests.
+    executor = _fetch_executor(len(tasks))
+    futures = {name: executor.submit(_run_task, func) for name, (func, _) in tasks.items()}
+    deadline = time.monotonic() + timeout
+
+    results = {}
+    try:
+        for name, future in futures.items():
+            default = tasks[name][1]
+            try:
+                results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                print(f"Fetch '{name}' timed out after {timeout}s")
+                if not future.cancel():
+                    _track_stuck(future)
+                results[name] = default
+            except Exception as e:
+                print(f"Fetch '{name}' failed: {e}")
+                results[name] = default
+    finally:
+        # Don't wait for timed-out fetches; queued ones never start
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+async def afetch_concurrently(tasks, timeout=None):
+    """
+    Async counterpart of fetch_concurrently for the ASGI views.
+
+    Args:
+        tasks: Dict mapping a result name to an (awaitable, default) tuple
+        timeout: Seconds each awaitable may take (settings.FETCH_TIMEOUT if None)
+
+    Returns:
+        Dict mapping each name to its result (or its default)
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'FETCH_TIMEOUT', 20)
+
+    async def _guarded(name, awaitable, default):
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            print(f"Fetch '{name}' timed out after {timeout}s")
+            return default
+        except Exception as e:
+            print(f"Fetch '{name}' failed: {e}")
+            return default
+
+    names = list(tasks)
+    values = await asyncio.gather(*(_guarded(name, *tasks[name]) for name in names))
+    return dict(zip(names, values))
@@ -0,0 +1,234 @@
+"""
+Shared PostgreSQL connection pools for the external databases (events, analytics, followups)
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection could be checked out before the timeout"""
+
+
+def _statement_timeout():
+    """Request-path query limit in milliseconds (settings.DB_STATEMENT_TIMEOUT, 0 for no limit)"""
+    return int(getattr(settings, 'DB_STATEMENT_TIMEOUT', 30000))
+
+
+def _connection_options():
+    """
+    libpq options: every query capped at the request-path limit by default,
+    and the session in UTC, the time zone the external databases' naive
+    timestamps are stored in (see rollups.as_aware), so date casts and
+    comparisons with aware datetimes agree with the app whatever the
+    server's default time zone
+    """
+    return f"-c statement_timeout={_statement_timeout()} -c timezone=UTC"
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections for one settings.DATABASES alias.
+
+    Connections are health-checked on checkout and discarded (instead of being
+    returned to the pool) whenever the caller raised a connection-level error.
+    Queries running longer than settings.DB_STATEMENT_TIMEOUT are cancelled
+    by the server, unless the checkout sets its own limit (see get_connection).
+    """
+
+    def __init__(self, alias, db_config, min_size=1, max_size=10, timeout=10):
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._pool = pg_pool.ThreadedConnectionPool(
+            min_size,
+            max_size,
+            host=db_config.get('HOST', 'localhost'),
+            port=db_config.get('PORT', '5432'),
+            database=db_config.get('NAME'),
+            user=db_config.get('USER'),
+            password=db_config.get('PASSWORD'),
+            connect_timeout=db_config.get('OPTIONS', {}).get('connect_timeout', 5),
+            options=_connection_options(),
+        )
+        # ThreadedConnectionPool raises instead of blocking when exhausted,
+        # so the semaphore makes callers wait for a free slot instead.
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'in_use': 0,
+            'failed_health_checks': 0,
+            'recycled': 0,
+            'timeouts': 0,
+        }
+
+    def _incr(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _is_healthy(self, conn):
+        """Check a pooled connection is still usable before handing it out"""
+        if conn.closed:
+            return False
+        try:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds for a free slot"""
+        if not self._slots.acquire(timeout=self.timeout):
+            self._incr('timeouts')
+            raise PoolTimeout(f"Timed out waiting for a '{self.alias}' database connection")
+
+        try:
+            # Idle connections may have been dropped by the server; replace
+            # each dead one until a working connection comes back.
+            for _ in range(self.max_size + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    break
+                self._incr('failed_health_checks')
+                self._pool.putconn(conn, close=True)
+            else:
+                raise psycopg2.OperationalError(
+                    f"No healthy '{self.alias}' database connection after {self.max_size + 1} attempts"
+                )
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._incr('checkouts')
+        self._incr('in_use')
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool, closing it instead when discard is set"""
+        try:
+            if discard or conn.closed:
+                self._incr('recycled')
+                self._pool.putconn(conn, close=True)
+            else:
+                self._pool.putconn(conn)
+        finally:
+            self._incr('in_use', -1)
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def stats(self):
+        """Snapshot of the pool counters"""
+        with self._stats_lock:
+            data = dict(self._stats)
+        data.update({
+            'alias': self.alias,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'idle': len(self._pool._pool),
+        })
+        return data
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+_POOLS_PID = os.getpid()
+
+
+def _pool_settings():
+    """Pool sizing from settings (DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT)"""
+    return {
+        'min_size': getattr(settings, 'DB_POOL_MIN_SIZE', 1),
+        'max_size': getattr(settings, 'DB_POOL_MAX_SIZE', 10),
+        'timeout': getattr(settings, 'DB_POOL_TIMEOUT', 10),
+    }
+
+
+def get_pool(alias):
+    """Get (lazily creating) the connection pool for a settings.DATABASES alias"""
+    global _POOLS_PID
+
+    with _POOLS_LOCK:
+        # Connections must not be shared across a fork (e.g. gunicorn --preload),
+        # so a child process drops the parent's pools and builds its own.
+        if _POOLS_PID != os.getpid():
+            _POOLS.clear()
+            _POOLS_PID = os.getpid()
+
+        connection_pool = _POOLS.get(alias)
+        if connection_pool is None:
+            db_config = settings.DATABASES.get(alias)
+            if not db_config:
+                raise psycopg2.OperationalError(f"Database '{alias}' not configured.")
+            connection_pool = ConnectionPool(alias, db_config, **_pool_settings())
+            _POOLS[alias] = connection_pool
+            if settings.DEBUG:
+                print(f"Created connection pool for '{alias}' database")
+        return connection_pool
+
+
+@contextmanager
+def get_connection(alias, statement_timeout=None):
+    """
+    Check out a pooled connection for a settings.DATABASES alias.
+
+    Behaves like `with psycopg2.connect(...) as conn`: the transaction is
+    committed on success and rolled back on error. Connections that hit a
+    connection-level error are closed instead of going back to the pool.
+
+    Queries are limited to settings.DB_STATEMENT_TIMEOUT milliseconds, meant
+    for requests; batch jobs (e.g. the rollup rebuilds) pass their own
+    statement_timeout, 0 for no limit, which lasts until the transaction ends.
+
+    Usage:
+        with get_connection('events') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                ...
+    """
+    connection_pool = get_pool(alias)
+    conn = connection_pool.getconn()
+    discard = False
+    try:
+        if statement_timeout is not None and statement_timeout != _statement_timeout():
+            with conn.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', (int(statement_timeout),))
+        yield conn
+        if not conn.closed:
+            conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
+        raise
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            discard = True
+        raise
+    finally:
+        connection_pool.putconn(conn, discard=discard)
+
+
+def get_pool_stats():
+    """Statistics for every pool created in this process"""
+    with _POOLS_LOCK:
+        return {alias: connection_pool.stats() for alias, connection_pool in _POOLS.items()}
+
+
+def close_all_pools():
+    """Close every pooled connection in this process"""
+    with _POOLS_LOCK:
+        for connection_pool in _POOLS.values():
+            connection_pool.closeall()
+        _POOLS.clear()
@@ -5,6 +5,7 @@ from django.conf import settings
 from django.db import connections
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from .db_pool import get_connection
 
 
 def get_events_for_conversation(conversation_uuid):
@@ -26,15 +27,6 @@ def get_events_for_conversation(conversation_uuid):
                 print("Events database not configured")
             return []
         
-        # Connect to the events database
-        conn = psycopg2.connect(
-            host=events_db.get('HOST', 'localhost'),
-            port=events_db.get('PORT', '5432'),
-            database=events_db.get('NAME', 'events_db'),
-            user=events_db.get('USER', 'postgres'),
-            password=events_db.get('PASSWORD', '')
-        )
-        
         table_name = getattr(settings, 'EVENTS_TABLE_NAME', 'events')
         conversation_id_col = getattr(settings, 'EVENTS_CONVERSATION_ID_COLUMN', 'conversation_infobip_uuid')
         timestamp_col = getattr(settings, 'EVENTS_TIMESTAMP_COLUMN', 'datetime')
@@ -49,19 +41,17 @@ def get_events_for_conversation(conversation_uuid):
             ORDER BY {timestamp_col} DESC
         """
         
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
         # Convert UUID to string if needed for the query
         conversation_uuid_str = str(conversation_uuid)
-        cursor.execute(query, (conversation_uuid_str,))
         
-        events = cursor.fetchall()
+        with get_connection('events') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, (conversation_uuid_str,))
+                events = cursor.fetchall()
         
         # Convert RealDictRow objects to regular dictionaries
         events_list = [dict(event) for event in events]
         
-        cursor.close()
-        conn.close()
-        
         if settings.DEBUG:
             print(f"Fetched {len(events_list)} events for conversation UUID {conversation_uuid_str}")
         
@@ -77,6 +67,163 @@ def get_events_for_conversation(conversation_uuid):
         return []
 
 
+def iter_events_for_conversations(conversation_uuids, itersize=2000):
+    """
+    Events of several conversations, read through a server-side cursor.
+
+    Args:
+        conversation_uuids: Conversation UUIDs
+        itersize: Rows fetched from the server per round trip
+
+    Yields:
+        Event dicts (as returned by get_events_for_conversation, plus
+        conversation_uuid), ordered by conversation and timestamp
+    """
+    if not conversation_uuids or not settings.DATABASES.get('events'):
+        return
+
+    table_name = getattr(settings, 'EVENTS_TABLE_NAME', 'events')
+    conversation_id_col = getattr(settings, 'EVENTS_CONVERSATION_ID_COLUMN', 'conversation_infobip_uuid')
+    timestamp_col = getattr(settings, 'EVENTS_TIMESTAMP_COLUMN', 'datetime')
+
+    query = f"""
+        SELECT id, {conversation_id_col} AS conversation_uuid, event_type, event_subtype,
+               {timestamp_col} AS datetime, dialogue, agent_infobip_uuid, json
+        FROM {table_name}
+        WHERE {conversation_id_col} IN %s
+        ORDER BY {conversation_id_col}, {timestamp_col}
+    """
+
+    with get_connection('events') as conn:
+        with conn.cursor(name='conversation_events_export', cursor_factory=RealDictCursor) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, (tuple(str(conversation_uuid) for conversation_uuid in conversation_uuids),))
+            for event in cursor:
+                yield dict(event)
+
+
+EVENT_DASHBOARD_FACETS = {
+    # facet: (event_type, json key grouped by, or None for the distinct conversation count)
+    'stages': ('SALES_STAGE_CHANGE', 'NEW_STAGE'),
+    'conversations': ('SALES_STAGE_CHANGE', None),
+    'followups': ('FOLLOWUP_DETECTION', 'FOLLOWUP_TRY'),
+    'objections': ('OBJECTION_DETECTION', 'OBJECTION_TYPE'),
+}
+
+
+def _query_event_dashboard(team_members_uuids, start_date=None, facets=None):
+    """get_event_dashboard without the error handling (raises on database errors)"""
+    facets = [facet for facet in (facets or EVENT_DASHBOARD_FACETS) if facet in EVENT_DASHBOARD_FACETS]
+    dashboard = {}
+    if 'stages' in facets:
+        dashboard['stages'] = {}
+    if 'conversations' in facets:
+        dashboard['total_conversations'] = 0
+    if 'followups' in facets:
+        dashboard['followups'] = []
+    if 'objections' in facets:
+        dashboard['objections'] = []
+
+    if not team_members_uuids or not facets:
+        return dashboard
+
+    event_types = tuple(dict.fromkeys(EVENT_DASHBOARD_FACETS[facet][0] for facet in facets))
+    key_cases = " ".join(
+        f"WHEN '{EVENT_DASHBOARD_FACETS[facet][0]}' THEN json->>'{EVENT_DASHBOARD_FACETS[facet][1]}'"
+        for facet in facets if EVENT_DASHBOARD_FACETS[facet][1]
+    )
+    facet_key = f"CASE event_type {key_cases} END" if key_cases else "NULL::text"
+
+    grouping_sets = []
+    if key_cases:
+        grouping_sets.append("(event_type, facet_key)")
+    if 'conversations' in facets:
+        grouping_sets.append("(event_type)")
+    if key_cases:
+        key_select, is_total = "facet_key", "GROUPING(facet_key)"
+    else:
+        key_select, is_total = "NULL AS facet_key", "1"
+
+    params = [tuple(str(uid) for uid in team_members_uuids), event_types]
+    date_filter = ""
+    if start_date:
+        date_filter = "AND created_at >= %s"
+        params.append(start_date)
+
+    # One scan of the team's events; each grouping set yields one facet
+    query = f"""
+        SELECT
+            event_type,
+            {key_select},
+            {is_total} AS is_total,
+            COUNT(*) AS count,
+            COUNT(DISTINCT conversation_uuid) AS conversations
+        FROM (
+            SELECT event_type, conversation_uuid, {facet_key} AS facet_key
+            FROM events
+            WHERE agent_uuid IN %s
+            AND event_type IN %s
+            {date_filter}
+        ) AS team_events
+        GROUP BY GROUPING SETS ({', '.join(grouping_sets)})
+        ORDER BY count DESC
+    """
+
+    with get_connection('events') as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, tuple(params))
+            rows = cursor.fetchall()
+
+    for row in rows:
+        event_type = row['event_type']
+        if row['is_total']:
+            if event_type == 'SALES_STAGE_CHANGE' and 'conversations' in facets:
+                dashboard['total_conversations'] = row['conversations']
+        elif event_type == 'SALES_STAGE_CHANGE' and 'stages' in facets:
+            dashboard['stages'][row['facet_key']] = row['count']
+        elif event_type == 'FOLLOWUP_DETECTION' and 'followups' in facets:
+            dashboard['followups'].append({'followup_try': row['facet_key'], 'count': row['count']})
+        elif event_type == 'OBJECTION_DETECTION' and 'objections' in facets:
+            dashboard['objections'].append({'objection_type': row['facet_key'], 'count': row['count']})
+
+    return dashboard
+
+
+def get_event_dashboard(team_members_uuids, start_date=None, facets=None):
+    """
+    Event metrics of a team from a single scan of the events table.
+
+    Args:
+        team_members_uuids: Agent UUIDs of the team
+        start_date: Only count events created at or after this datetime
+        facets: Subset of 'stages', 'conversations', 'followups' and 'objections'
+                (all of them if None); only the matching event types are read
+
+    Returns:
+        Dict with one entry per requested facet:
+            'stages': {raw NEW_STAGE: count of stage changes}
+            'total_conversations': distinct conversations with a stage change
+            'followups': [{'followup_try', 'count'}] by count descending
+            'objections': [{'objection_type', 'count'}] by count descending
+    """
+    try:
+        if not settings.DATABASES.get('events'):
+            if settings.DEBUG:
+                print("Events database not configured")
+            return _query_event_dashboard([], facets=facets)
+
+        return _query_event_dashboard(team_members_uuids, start_date=start_date, facets=facets)
+
+    except psycopg2.Error as e:
+        if settings.DEBUG:
+            print(f"Error fetching event dashboard from PostgreSQL: {e}")
+        return _query_event_dashboard([], facets=facets)
+    except Exception as e:
+        if settings.DEBUG:
+            print(f"Unexpected error fetching event dashboard: {e}")
+        return _query_event_dashboard([], facets=facets)
+
+
 def get_sales_stage_metrics(team_members_uuids, start_date=None):
     LABEL_TRANSLATIONS = {
         'purchased_payment_confirmed': 'Pagamento Confirmado', 
@@ -105,66 +252,16 @@ def get_sales_stage_metrics(team_members_uuids, start_date=None):
                 print("Events database not configured")
             return {}
 
-        uuids_formatted = tuple(str(uid) for uid in team_members_uuids)
-        params = [uuids_formatted]
-
-        query_stages = """
-            SELECT json->>'NEW_STAGE' as stage, COUNT(*) as count
-            FROM events
-            WHERE event_type = 'SALES_STAGE_CHANGE'
-            AND agent_uuid IN %s
-            GROUP BY json->>'NEW_STAGE'
-        """
-
-        query_total = """
-            SELECT COUNT(DISTINCT conversation_uuid)
-            FROM events
-            WHERE event_type = 'SALES_STAGE_CHANGE'
-            AND agent_uuid IN %s
-        """
-
-        if start_date:
-            query_stages = """
-                SELECT json->>'NEW_STAGE' as stage, COUNT(*) as count
-                FROM events
-                WHERE event_type = 'SALES_STAGE_CHANGE'
-                AND agent_uuid IN %s
-                AND created_at >= %s
-                GROUP BY json->>'NEW_STAGE' 
-            """
-
-            query_total = """
-                SELECT COUNT(DISTINCT conversation_uuid)
-                FROM events
-                WHERE event_type = 'SALES_STAGE_CHANGE'
-                AND agent_uuid IN %s
-                AND created_at >= %s
-            """
-            params.append(start_date)
-
-        with psycopg2.connect(
-            host=events_db.get('HOST', 'localhost'),
-            port=events_db.get('PORT', '5432'),
-            database=events_db.get('NAME', 'events_db'),
-            user=events_db.get('USER', 'postgres'),
-            password=events_db.get('PASSWORD', '')
-        ) as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query_stages, tuple(params))
-                stage_results = cursor.fetchall()
-
-                cursor.execute(query_total, tuple(params))
-                total_conversations_count = cursor.fetchone()['count']
-
+        dashboard = _query_event_dashboard(
+            team_members_uuids, start_date=start_date, facets=('stages', 'conversations')
+        )
+        total_conversations_count = dashboard['total_conversations']
         
         translated_stages = {}
         raw_stages = {}
         sales_count = 0
 
-        for row in stage_results:
-            raw_stage = row.get('stage')
-            count = row['count']
-            
+        for raw_stage, count in dashboard['stages'].items():
             if not raw_stage: continue
             label = LABEL_TRANSLATIONS.get(raw_stage, raw_stage.replace('_', ' ').title())
             
@@ -192,127 +289,426 @@ def get_sales_stage_metrics(team_members_uuids, start_date=None):
     except Exception as e:
         if settings.DEBUG: print(f"Unexpected error fetching stages: {e}")
         return mock_data
-    
-def get_followups_detection(team_members_uuids, start_date=None):
-    followups_detected = []
+
+
+def get_event_counts_by_agent(team_members_uuids, start_date=None, end_date=None, count_conversations=True):
+    """
+    Per-agent sales stage and follow-up counts for a whole team in a constant
+    number of queries (GROUP BY agent_uuid) instead of one round trip per agent.
+
+    Events are counted from start_date (inclusive) to end_date (exclusive);
+    either bound may be None. Without count_conversations the distinct
+    conversation count isn't queried and stays 0.
+
+    Returns:
+        Dict keyed by agent UUID string with 'raw_stages', 'total_conversations',
+        'total_sales' and 'total_followups'. Every requested agent gets an entry.
+    """
+    agent_uuids = tuple(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    counts_by_agent = {
+        agent_uuid: {
+            'raw_stages': {},
+            'total_conversations': 0,
+            'total_sales': 0,
+            'total_followups': 0,
+        }
+        for agent_uuid in agent_uuids
+    }
+
     try:
-        if not team_members_uuids:
-            return followups_detected
-            
+        if not agent_uuids:
+            return counts_by_agent
+
         events_db = settings.DATABASES.get('events')
         if not events_db:
             if settings.DEBUG:
                 print("Events database not configured")
-            return followups_detected
-        
-        uuids_formatted = tuple(str(uid) for uid in team_members_uuids)
-        params=[uuids_formatted]
+            return counts_by_agent
+
+        params = [agent_uuids]
+        date_filter = ""
+        if start_date:
+            date_filter = "AND created_at >= %s"
+            params.append(start_date)
+        if end_date:
+            date_filter += " AND created_at < %s"
+            params.append(end_date)
 
-        query = """
-            SELECT json->>'FOLLOWUP_TRY' as followup_try, COUNT(*) as count
+        query_stages = f"""
+            SELECT agent_uuid, json->>'NEW_STAGE' as stage, COUNT(*) as count
             FROM events
-            WHERE event_type = 'FOLLOWUP_DETECTION'
+            WHERE event_type = 'SALES_STAGE_CHANGE'
             AND agent_uuid IN %s
-            GROUP BY json->>'FOLLOWUP_TRY'
-            ORDER BY count DESC
+            {date_filter}
+            GROUP BY agent_uuid, json->>'NEW_STAGE'
         """
 
-        if start_date:
-            query = """
-                SELECT json->>'FOLLOWUP_TRY' as followup_try, COUNT(*) as count
-                FROM events
-                WHERE event_type = 'FOLLOWUP_DETECTION'
-                AND agent_uuid IN %s
-                AND created_at >= %s
-                GROUP BY json->>'FOLLOWUP_TRY'
-                ORDER BY count DESC
-            """
-            params.append(start_date)
+        query_total = f"""
+            SELECT agent_uuid, COUNT(DISTINCT conversation_uuid) as count
+            FROM events
+            WHERE event_type = 'SALES_STAGE_CHANGE'
+            AND agent_uuid IN %s
+            {date_filter}
+            GROUP BY agent_uuid
+        """
+
+        query_followups = f"""
+            SELECT agent_uuid, COUNT(*) as count
+            FROM events
+            WHERE event_type = 'FOLLOWUP_DETECTION'
+            AND agent_uuid IN %s
+            {date_filter}
+            GROUP BY agent_uuid
+        """
 
-        with psycopg2.connect(
-            host=events_db.get('HOST', 'localhost'),
-            port=events_db.get('PORT', '5432'),
-            database=events_db.get('NAME', 'events_db'),
-            user=events_db.get('USER', 'postgres'),
-            password=events_db.get('PASSWORD', '')
-        ) as conn:
+        with get_connection('events') as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query, tuple(params))
-                results = cursor.fetchall()
-                followups_detected = [dict(event) for event in results]
-        
+                cursor.execute(query_stages, tuple(params))
+                stage_results = cursor.fetchall()
+
+                total_results = []
+                if count_conversations:
+                    cursor.execute(query_total, tuple(params))
+                    total_results = cursor.fetchall()
+
+                cursor.execute(query_followups, tuple(params))
+                followup_results = cursor.fetchall()
+
+        for row in stage_results:
+            agent_data = counts_by_agent.get(str(row['agent_uuid']))
+            raw_stage = row.get('stage')
+            if agent_data is None or not raw_stage:
+                continue
+
+            agent_data['raw_stages'][raw_stage] = agent_data['raw_stages'].get(raw_stage, 0) + row['count']
+            if raw_stage == 'purchased_payment_confirmed':
+                agent_data['total_sales'] += row['count']
+
+        for row in total_results:
+            agent_data = counts_by_agent.get(str(row['agent_uuid']))
+            if agent_data is not None:
+                agent_data['total_conversations'] = row['count']
+
+        for row in followup_results:
+            agent_data = counts_by_agent.get(str(row['agent_uuid']))
+            if agent_data is not None:
+                agent_data['total_followups'] = row['count']
+
         if settings.DEBUG:
-            print(f"Fetched {len(followups_detected)} followups for conversation team.")
+            print(f"Fetched event counts for {len(agent_uuids)} agents.")
+
+        return counts_by_agent
 
-        return followups_detected
-        
     except psycopg2.Error as e:
         if settings.DEBUG:
-            print(f"Error fetching followups from PostgreSQL: {e}")
-        return followups_detected
-    
+            print(f"Error fetching event counts from PostgreSQL: {e}")
+        return counts_by_agent
     except Exception as e:
         if settings.DEBUG:
-            print(f"Unexpected error fetching followups: {e}")
-        return followups_detected
+            print(f"Unexpected error fetching event counts: {e}")
+        return counts_by_agent
+
+def get_conversation_counts_by_agent(team_members_uuids, start_date=None, end_date=None):
+    """
+    COUNT(DISTINCT conversation_uuid) of sales stage changes per agent, from
+    start_date (inclusive) to end_date (exclusive).
+
+    Distinct counts can't be summed across days; the rollup reads them from
+    AgentConversationActivity instead, and falls back to this until that
+    has been built.
+    """
+    agent_uuids = tuple(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    counts = {agent_uuid: 0 for agent_uuid in agent_uuids}
 
-def get_objections_events_for_team(team_members_uuids, start_date=None):
     try:
-        if not team_members_uuids:
-            return []
-            
-        events_db = settings.DATABASES.get('events')
-        if not events_db:
-            if settings.DEBUG:
-                print("Events database not configured")
-            return []
-        
-        uuids_formatted = tuple(str(uid) for uid in team_members_uuids)
-        params = [uuids_formatted]
+        if not agent_uuids or not settings.DATABASES.get('events'):
+            return counts
+
+        params = [agent_uuids]
+        date_filter = ""
+        if start_date:
+            date_filter = "AND created_at >= %s"
+            params.append(start_date)
+        if end_date:
+            date_filter += " AND created_at < %s"
+            params.append(end_date)
 
-        query = """
-            SELECT json->>'OBJECTION_TYPE' as objection_type, COUNT(*) as count
+        query = f"""
+            SELECT agent_uuid, COUNT(DISTINCT conversation_uuid) as count
             FROM events
-            WHERE event_type = 'OBJECTION_DETECTION'
+            WHERE event_type = 'SALES_STAGE_CHANGE'
             AND agent_uuid IN %s
-            GROUP BY json->>'OBJECTION_DETECTION'
-            ORDER BY count DESC
+            {date_filter}
+            GROUP BY agent_uuid
         """
 
-        if start_date:
-            query = """
-                SELECT json->>'OBJECTION_TYPE' as objection_type, COUNT(*) as count
-                FROM events
-                WHERE event_type = 'OBJECTION_DETECTION'
-                AND agent_uuid IN %s
-                AND created_at >= %s
-                GROUP BY json->>'OBJECTION_DETECTION'
-                ORDER BY count DESC
-            """
-            params.append(start_date)
-        
-        with psycopg2.connect(
-            host=events_db.get('HOST', 'localhost'),
-            port=events_db.get('PORT', '5432'),
-            database=events_db.get('NAME', 'events_db'),
-            user=events_db.get('USER', 'postgres'),
-            password=events_db.get('PASSWORD', '')
-        ) as conn:
+        with get_connection('events') as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 cursor.execute(query, tuple(params))
-                results = cursor.fetchall()
-                events_list = [dict(event) for event in results]
+                for row in cursor.fetchall():
+                    agent_uuid = str(row['agent_uuid'])
+                    if agent_uuid in counts:
+                        counts[agent_uuid] = row['count']
 
+        return counts
+
+    except Exception as e:
         if settings.DEBUG:
-            print(f"Fetched {len(events_list)} objection events.")
-        
-        return events_list
-        
-    except psycopg2.Error as e:
-        if settings.DEBUG:
-            print(f"Error fetching events from PostgreSQL: {e}")
-        return []
+            print(f"Unexpected error fetching conversation counts: {e}")
+        return counts
+
+
+def get_agent_conversations(team_members_uuids, start_date=None):
+    """
+    Distinct (agent_uuid, conversation_uuid) pairs of the agents' sales stage
+    changes since start_date, for the conversation counts of the rollup tail.
+
+    Returns:
+        Set of (agent_uuid, conversation_uuid) string tuples
+    """
+    agent_uuids = tuple(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    pairs = set()
+
+    try:
+        if not agent_uuids or not settings.DATABASES.get('events'):
+            return pairs
+
+        params = [agent_uuids]
+        date_filter = ""
+        if start_date:
+            date_filter = "AND created_at >= %s"
+            params.append(start_date)
+
+        query = f"""
+            SELECT DISTINCT agent_uuid, conversation_uuid
+            FROM events
+            WHERE event_type = 'SALES_STAGE_CHANGE'
+            AND agent_uuid IN %s
+            AND conversation_uuid IS NOT NULL
+            {date_filter}
+        """
+
+        with get_connection('events') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, tuple(params))
+                pairs.update((str(agent_uuid), str(conversation_uuid)) for agent_uuid, conversation_uuid in cursor)
+
+        return pairs
+
     except Exception as e:
         if settings.DEBUG:
-            print(f"Unexpected error fetching events: {e}")
-        return []
\ No newline at end of file
+            print(f"Unexpected error fetching agent conversations: {e}")
+        return pairs
+
+
+def window_periods(windows, now):
+    """
+    (name, start, end) of the current and previous period of every window.
+
+    Names are 'current_<days>' (the last `days` days) and 'previous_<days>'
+    (the `days` days before that); end is None for the current period.
+    """
+    from datetime import timedelta
+
+    periods = []
+    for days in windows:
+        current_start = now - timedelta(days=days)
+        periods.append((f'current_{days}', current_start, None))
+        periods.append((f'previous_{days}', current_start - timedelta(days=days), current_start))
+    return periods
+
+
+def window_filter(name, end, timestamp_col='created_at'):
+    """SQL condition (with named placeholders) selecting the rows of one window period"""
+    condition = f"{timestamp_col} >= %({name}_start)s"
+    if end is not None:
+        condition += f" AND {timestamp_col} < %({name}_end)s"
+    return condition
+
+
+def get_windowed_event_counts_by_agent(team_members_uuids, periods):
+    """
+    Per-agent conversations, sales and follow-ups for several periods in one
+    scan, using one FILTER aggregate per period.
+
+    Args:
+        team_members_uuids: Agent UUIDs
+        periods: (name, start, end) tuples from window_periods
+
+    Returns:
+        Dict keyed by period name, then by agent UUID, with 'total_conversations',
+        'total_sales' and 'total_followups'. Raises on database errors.
+    """
+    agent_uuids = tuple(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    counts = {
+        name: {agent_uuid: {'total_conversations': 0, 'total_sales': 0, 'total_followups': 0} for agent_uuid in agent_uuids}
+        for name, _, _ in periods
+    }
+    if not agent_uuids or not periods:
+        return counts
+
+    params = {'agent_uuids': agent_uuids, 'oldest': min(start for _, start, _ in periods)}
+    aggregates = []
+    for name, start, end in periods:
+        params[f'{name}_start'] = start
+        params[f'{name}_end'] = end
+        condition = window_filter(name, end)
+        aggregates.append(f"""
+            COUNT(DISTINCT conversation_uuid) FILTER (
+                WHERE event_type = 'SALES_STAGE_CHANGE' AND {condition}
+            ) AS {name}_conversations,
+            COUNT(*) FILTER (
+                WHERE event_type = 'SALES_STAGE_CHANGE'
+                AND json->>'NEW_STAGE' = 'purchased_payment_confirmed' AND {condition}
+            ) AS {name}_sales,
+            COUNT(*) FILTER (
+                WHERE event_type = 'FOLLOWUP_DETECTION' AND {condition}
+            ) AS {name}_followups""")
+
+    query = f"""
+        SELECT agent_uuid, {','.join(aggregates)}
+        FROM events
+        WHERE agent_uuid IN %(agent_uuids)s
+        AND event_type IN ('SALES_STAGE_CHANGE', 'FOLLOWUP_DETECTION')
+        AND created_at >= %(oldest)s
+        GROUP BY agent_uuid
+    """
+
+    with get_connection('events') as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+    for row in rows:
+        agent_uuid = str(row['agent_uuid'])
+        for name, _, _ in periods:
+            agent_counts = counts[name].get(agent_uuid)
+            if agent_counts is None:
+                continue
+            agent_counts['total_conversations'] = row[f'{name}_conversations']
+            agent_counts['total_sales'] = row[f'{name}_sales']
+            agent_counts['total_followups'] = row[f'{name}_followups']
+
+    return counts
+
+
+def get_windowed_conversation_counts_by_agent(team_members_uuids, periods):
+    """
+    Per-agent distinct conversations with a sales stage change for several
+    periods in one scan (the counter the daily rollup can't sum across days).
+
+    Returns:
+        Dict keyed by period name, then by agent UUID. Raises on database errors.
+    """
+    agent_uuids = tuple(dict.fromkeys(str(uid).strip() for uid in team_members_uuids or [] if uid))
+    counts = {name: {agent_uuid: 0 for agent_uuid in agent_uuids} for name, _, _ in periods}
+    if not agent_uuids or not periods:
+        return counts
+
+    params = {'agent_uuids': agent_uuids, 'oldest': min(start for _, start, _ in periods)}
+    aggregates = []
+    for name, start, end in periods:
+        params[f'{name}_start'] = start
+        params[f'{name}_end'] = end
+        aggregates.append(
+            f"COUNT(DISTINCT conversation_uuid) FILTER (WHERE {window_filter(name, end)}) AS {name}_conversations"
+        )
+
+    query = f"""
+        SELECT agent_uuid, {', '.join(aggregates)}
+        FROM events
+        WHERE agent_uuid IN %(agent_uuids)s
+        AND event_type = 'SALES_STAGE_CHANGE'
+        AND created_at >= %(oldest)s
+        GROUP BY agent_uuid
+    """
+
+    with get_connection('events') as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+    for row in rows:
+        agent_uuid = str(row['agent_uuid'])
+        for name, _, _ in periods:
+            if agent_uuid in counts[name]:
+                counts[name][agent_uuid] = row[f'{name}_conversations']
+
+    return counts
+
+
+def get_conversation_activity(since=None):
+    """
+    Latest sales stage change per agent and conversation, for the conversation
+    activity rollup. Runs from the rollup command, so the query has no
+    statement timeout.
+
+    Args:
+        since: Only consider events created at or after this datetime (all events if None)
+
+    Returns:
+        List of dicts with agent_uuid, conversation_uuid and last_event_at
+    """
+    params = []
+    date_filter = ""
+    if since:
+        date_filter = "AND created_at >= %s"
+        params.append(since)
+
+    query = f"""
+        SELECT agent_uuid, conversation_uuid, MAX(created_at) AS last_event_at
+        FROM events
+        WHERE event_type = 'SALES_STAGE_CHANGE'
+        AND agent_uuid IS NOT NULL
+        AND conversation_uuid IS NOT NULL
+        {date_filter}
+        GROUP BY agent_uuid, conversation_uuid
+    """
+
+    with get_connection('events', statement_timeout=0) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
+
+
+def get_daily_event_counts(since=None):
+    """
+    Stage change and follow-up counts per agent, day and metric, for the daily rollup.
+
+    Metrics are 'stage:<NEW_STAGE>' and 'followups'. Runs from the rollup
+    command, so the query has no statement timeout.
+
+    Args:
+        since: Only count events created at or after this datetime (all events if None)
+
+    Returns:
+        List of dicts with agent_uuid, day, metric and count
+    """
+    params = []
+    date_filter = ""
+    if since:
+        date_filter = "AND created_at >= %s"
+        params.append(since)
+
+    query = f"""
+        SELECT
+            agent_uuid,
+            (created_at AT TIME ZONE 'UTC')::date AS day,
+            CASE WHEN event_type = 'SALES_STAGE_CHANGE'
+                 THEN 'stage:' || (json->>'NEW_STAGE')
+                 ELSE 'followups' END AS metric,
+            COUNT(*) AS count
+        FROM events
+        WHERE (
+            (event_type = 'SALES_STAGE_CHANGE' AND COALESCE(json->>'NEW_STAGE', '') <> '')
+            OR event_type = 'FOLLOWUP_DETECTION'
+        )
+        AND agent_uuid IS NOT NULL
+        {date_filter}
+        GROUP BY 1, 2, 3
+    """
+
+    with get_connection('events', statement_timeout=0) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, tuple(params))
+            return [dict(row) for row in cursor.fetchall()]
@@ -0,0 +1,325 @@
+"""
+Streaming export of the conversation list filter result.
+
+The rows of the filtered conversations (or of their messages or events) are
+read in chunks through server-side cursors and encoded as CSV, JSON lines or
+Parquet as they arrive, so conversation_export can hand the generator to a
+StreamingHttpResponse and memory stays bounded by one chunk.
+"""
+import csv
+import itertools
+import json
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .events_db import iter_events_for_conversations
+from .facets import parse_tags
+from .models import Conversation, Message
+from .rollups import as_aware
+
+EXPORT_FORMATS = {
+    # format: (content type, file extension)
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Exported columns per record kind, as (name, type); types are 'text',
+# 'datetime' and 'json' (lists and objects, JSON encoded in CSV and Parquet)
+EXPORT_COLUMNS = {
+    'conversations': [
+        ('uuid', 'text'),
+        ('organization', 'text'),
+        ('created_at', 'datetime'),
+        ('updated_at', 'datetime'),
+        ('origin', 'text'),
+        ('agents', 'json'),
+        ('client_name', 'text'),
+        ('client_email', 'text'),
+        ('sales_stage', 'text'),
+        ('tags', 'json'),
+        ('metadata', 'json'),
+    ],
+    'messages': [
+        ('uuid', 'text'),
+        ('conversation_uuid', 'text'),
+        ('sender_uuid', 'text'),
+        ('created_at', 'datetime'),
+        ('type', 'text'),
+        ('channel', 'text'),
+        ('subchannel', 'text'),
+        ('origin', 'text'),
+        ('content', 'text'),
+        ('link', 'text'),
+        ('metadata', 'json'),
+    ],
+    'events': [
+        ('id', 'text'),
+        ('conversation_uuid', 'text'),
+        ('event_type', 'text'),
+        ('event_subtype', 'text'),
+        ('datetime', 'datetime'),
+        ('dialogue', 'text'),
+        ('agent_infobip_uuid', 'text'),
+        ('json', 'json'),
+    ],
+}
+
+CONVERSATION_VALUES = ('id', 'alma_internal_organization', 'created_at', 'updated_at', 'origin', 'agents', 'metadata')
+MESSAGE_VALUES = (
+    'id', 'conversation_uuid', 'sender_uuid', 'created_at', 'type', 'channel',
+    'subchannel', 'origin', 'content', 'link', 'metadata'
+)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _conversation_record(row):
+    metadata = row['metadata'] or {}
+    return {
+        'uuid': row['id'],
+        'organization': row['alma_internal_organization'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'],
+        'origin': row['origin'],
+        'agents': list(row['agents'] or []),
+        'client_name': metadata.get('clientName'),
+        'client_email': metadata.get('clientEmail'),
+        'sales_stage': metadata.get('salesStage'),
+        'tags': parse_tags(metadata.get('clientTagsInput')),
+        'metadata': metadata,
+    }
+
+
+def _message_record(row):
+    return {
+        'uuid': row['id'],
+        'conversation_uuid': row['conversation_uuid'],
+        'sender_uuid': row['sender_uuid'],
+        'created_at': row['created_at'],
+        'type': row['type'],
+        'channel': row['channel'],
+        'subchannel': row['subchannel'],
+        'origin': row['origin'],
+        'content': row['content'],
+        'link': row['link'],
+        'metadata': row['metadata'],
+    }
+
+
+def _event_record(row):
+    return {name: row.get(name) for name, _ in EXPORT_COLUMNS['events']}
+
+
+def iter_conversation_uuid_chunks(queryset, chunk_size=2000):
+    """
+    UUIDs of a filter_conversations queryset (conversations or filter index
+    rows), in its order, as lists of up to chunk_size
+    """
+    field = 'id' if queryset.model is Conversation else 'conversation_uuid'
+    return _chunks(queryset.values_list(field, flat=True).iterator(chunk_size=chunk_size), chunk_size)
+
+
+def iter_export_records(queryset, kind='conversations', chunk_size=2000):
+    """
+    Export records of the conversations of a filter_conversations queryset.
+
+    Args:
+        queryset: Result of filter_conversations
+        kind: 'conversations', or 'messages' / 'events' for those of the
+            filtered conversations
+        chunk_size: Rows read per round trip (and conversations per
+            message/event query)
+
+    Yields:
+        Dicts keyed by the EXPORT_COLUMNS names of the kind
+    """
+    if kind == 'conversations' and queryset.model is Conversation:
+        for row in queryset.values(*CONVERSATION_VALUES).iterator(chunk_size=chunk_size):
+            yield _conversation_record(row)
+        return
+
+    for conversation_uuids in iter_conversation_uuid_chunks(queryset, chunk_size):
+        if kind == 'conversations':
+            # Filter index rows: fetch the conversations of the chunk, keeping its order
+            rows = {
+                row['id']: row
+                for row in Conversation.objects.filter(id__in=conversation_uuids).values(*CONVERSATION_VALUES)
+            }
+            for conversation_uuid in conversation_uuids:
+                if conversation_uuid in rows:
+                    yield _conversation_record(rows[conversation_uuid])
+        elif kind == 'messages':
+            messages = Message.objects.filter(conversation_uuid__in=conversation_uuids).order_by(
+                'conversation_uuid', 'created_at'
+            ).values(*MESSAGE_VALUES)
+            for row in messages.iterator(chunk_size=chunk_size):
+                yield _message_record(row)
+        elif kind == 'events':
+            for row in iter_events_for_conversations(conversation_uuids, itersize=chunk_size):
+                yield _event_record(row)
+
+
+def _datetime_value(value):
+    """
+    Timestamp column value as an aware datetime; text that isn't an ISO
+    timestamp (some events store their datetime as text) is kept as is
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return as_aware(value) if isinstance(value, datetime) else value
+
+
+def _text_value(value, column_type):
+    """Column value as exported to CSV and Parquet (None stays None)"""
+    if value is None:
+        return None
+    if column_type == 'json':
+        # Text columns holding JSON (e.g. events.json) are exported as stored
+        return value if isinstance(value, str) else json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+    if column_type == 'datetime':
+        return _datetime_value(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value if isinstance(value, str) else str(value)
+
+
+class _Echo:
+    """File-like object whose write() hands back what was written (for csv.writer)"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(records, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in columns])
+    for record in records:
+        row = []
+        for name, column_type in columns:
+            value = _text_value(record.get(name), column_type)
+            row.append(value.isoformat() if isinstance(value, datetime) else value)
+        yield writer.writerow(row)
+
+
+def stream_jsonl(records, columns):
+    for record in records:
+        yield json.dumps(
+            {
+                name: _datetime_value(record.get(name)) if column_type == 'datetime' else record.get(name)
+                for name, column_type in columns
+            },
+            cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
+
+
+class _ParquetBuffer:
+    """Write-only file object collecting ParquetWriter output until drained"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_parquet(records, columns, row_group_size=10000):
+    """Parquet file bytes, one row group per row_group_size records"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {'text': pa.string(), 'json': pa.string(), 'datetime': pa.timestamp('us', tz='UTC')}
+    schema = pa.schema([(name, arrow_types[column_type]) for name, column_type in columns])
+
+    buffer = _ParquetBuffer()
+    writer = pq.ParquetWriter(buffer, schema, compression='snappy')
+
+    def write_rows(rows):
+        arrays = []
+        for index, (name, column_type) in enumerate(columns):
+            values = [row[index] for row in rows]
+            if column_type == 'datetime':
+                # Text that isn't a timestamp can't go in a timestamp column
+                values = [value.astimezone(dt_timezone.utc) if isinstance(value, datetime) else None for value in values]
+            arrays.append(pa.array(values, type=arrow_types[column_type]))
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    try:
+        for rows in _chunks(
+            ([_text_value(record.get(name), column_type) for name, column_type in columns] for record in records),
+            row_group_size
+        ):
+            write_rows(rows)
+            yield buffer.drain()
+    finally:
+        writer.close()
+    yield buffer.drain()
+
+
+def _records_until_error(records):
+    """Records until one can't be read, after which the export ends there"""
+    try:
+        yield from records
+    except Exception as e:
+        print(f"Export ended early, error reading records: {e}")
+
+
+def stream_export(queryset, export_format='csv', kind='conversations', chunk_size=2000):
+    """
+    Encoded export of a filter_conversations queryset, chunk by chunk.
+    Raises if the first records can't be read.
+
+    Returns:
+        Generator of str (csv, jsonl) or bytes (parquet) pieces
+    """
+    columns = EXPORT_COLUMNS[kind]
+    records = iter_export_records(queryset, kind=kind, chunk_size=chunk_size)
+
+    # Read the first record now, so an error reaching the databases fails
+    # the request before the response starts; later errors end the records
+    # early and the file is still closed properly (see _records_until_error)
+    try:
+        first = next(records)
+    except StopIteration:
+        records = iter(())
+    else:
+        records = _records_until_error(itertools.chain([first], records))
+
+    if export_format == 'parquet':
+        return stream_parquet(records, columns)
+    if export_format == 'jsonl':
+        return stream_jsonl(records, columns)
+    return stream_csv(records, columns)
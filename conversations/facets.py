@@ -0,0 +1,294 @@
+"""
+Per-organization filter facets (sellers, tags, sales stages) for the conversation list.
+
+ConversationFacetValue keeps one row per conversation and facet value, and
+ConversationFilterIndex one row per conversation with its normalized sales
+stage, tags and agents, so the list filters use B-tree and GIN indexes
+instead of scanning the JSON metadata. Both are refreshed incrementally from
+conversations.updated_at by the update_conversation_facets management command
+(run periodically by scheduler.sh). Rows of deleted conversations are
+dropped by a full rebuild or, less often than the refresh, by
+prune_deleted_conversations (--prune). Requests only read the index, and
+the per-organization counts are served from the cache. An index not
+refreshed for settings.CONVERSATION_INDEX_MAX_AGE seconds is bypassed in
+favour of the live tables rather than served stale.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Conversation, ConversationFacetValue, ConversationFilterIndex, RollupWatermark
+from .rollups import as_aware, lock_watermark
+
+FACETS_NAME = 'conversation_facets'
+SELLER_FACET = 'seller'
+TAG_FACET = 'tag'
+SALES_STAGE_FACET = 'sales_stage'
+
+
+def parse_agents(agents):
+    """Seller IDs of a conversation's agents column (list, or array/JSON text)"""
+    if not agents:
+        return []
+
+    if isinstance(agents, (list, tuple, set)):
+        values = agents
+    elif isinstance(agents, str):
+        if agents.startswith('{') and agents.endswith('}'):
+            # PostgreSQL array format: {item1,item2}
+            values = [a.strip().strip('"').strip("'") for a in agents[1:-1].split(',')]
+        else:
+            try:
+                parsed = json.loads(agents)
+                values = parsed if isinstance(parsed, list) else []
+            except ValueError:
+                # Last resort: treat as single value
+                values = [agents]
+    else:
+        return []
+
+    return [str(agent).strip() for agent in values if agent and str(agent).strip()]
+
+
+def parse_tags(tags):
+    """Tags of a conversation's metadata.clientTagsInput (comma separated string or list)"""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        return [t.strip() for t in tags.split(',') if t.strip()]
+    if isinstance(tags, list):
+        return [str(t) for t in tags if t]
+    return []
+
+
+def normalize_filter_value(value):
+    """Sales stage or tag as stored in ConversationFilterIndex (case-insensitive matching)"""
+    return str(value).strip().lower()[:255] if value else ''
+
+
+def conversation_filter_index(conv_id, organization, agents, tags, sales_stage, updated_at):
+    """ConversationFilterIndex row of one conversation"""
+    return ConversationFilterIndex(
+        conversation_uuid=conv_id,
+        organization=organization,
+        sales_stage=normalize_filter_value(sales_stage),
+        tags=list(dict.fromkeys(normalize_filter_value(tag) for tag in parse_tags(tags))),
+        agents=list(dict.fromkeys(agent[:255] for agent in parse_agents(agents))),
+        updated_at=as_aware(updated_at),
+    )
+
+
+def conversation_facet_values(agents, tags, sales_stage):
+    """
+    (facet, value) pairs of one conversation, without duplicates. Tags and
+    sales stages are kept trimmed, one per normalized value, so they count
+    the conversations the filter index matches.
+    """
+    values = dict.fromkeys((SELLER_FACET, agent[:255]) for agent in parse_agents(agents))
+    tag_values = {}
+    for tag in parse_tags(tags):
+        normalized = normalize_filter_value(tag)
+        if normalized:
+            tag_values.setdefault(normalized, str(tag).strip()[:255])
+    values.update(dict.fromkeys((TAG_FACET, tag) for tag in tag_values.values()))
+    if normalize_filter_value(sales_stage):
+        values[(SALES_STAGE_FACET, str(sales_stage).strip()[:255])] = None
+    return list(values)
+
+
+def update_conversation_facets(full=False, chunk_size=2000):
+    """
+    Re-index the conversations updated since the watermark (all of them when
+    full is set or the index was never built).
+
+    Runs in one transaction holding the watermark row lock, so concurrent
+    refreshes (e.g. overlapping cron runs) don't index twice.
+
+    Returns:
+        Number of conversations indexed
+    """
+    with transaction.atomic():
+        watermark_row, created = lock_watermark(FACETS_NAME)
+        full = full or created
+
+        queryset = Conversation.objects.order_by('updated_at').values_list(
+            'id', 'alma_internal_organization', 'agents',
+            'metadata__clientTagsInput', 'metadata__salesStage', 'updated_at'
+        )
+        if full:
+            ConversationFacetValue.objects.all().delete()
+            ConversationFilterIndex.objects.all().delete()
+        else:
+            queryset = queryset.filter(updated_at__gte=watermark_row.high_water_mark)
+
+        indexed = 0
+        high_water_mark = None if full else watermark_row.high_water_mark
+        chunk = []
+
+        def flush(rows):
+            if not full:
+                ConversationFacetValue.objects.filter(conversation_uuid__in=[row[0] for row in rows]).delete()
+            ConversationFacetValue.objects.bulk_create(
+                [
+                    ConversationFacetValue(conversation_uuid=conv_id, organization=organization, facet=facet, value=value)
+                    for conv_id, organization, agents, tags, sales_stage, _ in rows
+                    for facet, value in conversation_facet_values(agents, tags, sales_stage)
+                ],
+                batch_size=1000
+            )
+            ConversationFilterIndex.objects.bulk_create(
+                [conversation_filter_index(*row) for row in rows],
+                update_conflicts=True,
+                unique_fields=['conversation_uuid'],
+                update_fields=['organization', 'sales_stage', 'tags', 'agents', 'updated_at'],
+                batch_size=1000
+            )
+
+        for row in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                indexed += len(chunk)
+                high_water_mark = as_aware(chunk[-1][-1])
+                chunk = []
+
+        if chunk:
+            flush(chunk)
+            indexed += len(chunk)
+            high_water_mark = as_aware(chunk[-1][-1])
+
+        watermark_row.high_water_mark = high_water_mark or timezone.now()
+        watermark_row.save()
+
+    return indexed
+
+
+def prune_deleted_conversations(chunk_size=2000):
+    """
+    Drop the facet and filter index rows of conversations that no longer
+    exist. The conversations live in another database, so every indexed UUID
+    is checked against it chunk by chunk: this walks the whole index, so it
+    runs on its own schedule rather than with each incremental refresh, and
+    outside the refresh's watermark lock.
+
+    Returns:
+        Number of conversations dropped
+    """
+    indexed_uuids = ConversationFilterIndex.objects.order_by('conversation_uuid').values_list(
+        'conversation_uuid', flat=True
+    )
+
+    deleted = []
+    chunk = []
+
+    def collect(uuids):
+        existing = set(Conversation.objects.filter(id__in=uuids).values_list('id', flat=True))
+        deleted.extend(conv_id for conv_id in uuids if conv_id not in existing)
+
+    for conv_id in indexed_uuids.iterator(chunk_size=chunk_size):
+        chunk.append(conv_id)
+        if len(chunk) >= chunk_size:
+            collect(chunk)
+            chunk = []
+    if chunk:
+        collect(chunk)
+
+    for start in range(0, len(deleted), chunk_size):
+        batch = deleted[start:start + chunk_size]
+        with transaction.atomic():
+            ConversationFacetValue.objects.filter(conversation_uuid__in=batch).delete()
+            ConversationFilterIndex.objects.filter(conversation_uuid__in=batch).delete()
+
+    return len(deleted)
+
+
+def is_conversation_index_fresh():
+    """
+    Whether the facet and filter index tables have been built and refreshed
+    within settings.CONVERSATION_INDEX_MAX_AGE seconds (0 for no limit)
+    """
+    refreshed_at = RollupWatermark.objects.filter(name=FACETS_NAME).values_list('updated_at', flat=True).first()
+    if refreshed_at is None:
+        return False
+    max_age = getattr(settings, 'CONVERSATION_INDEX_MAX_AGE', 3600)
+    return not max_age or timezone.now() - refreshed_at <= timedelta(seconds=max_age)
+
+
+def filter_conversation_index(organization=None, seller_id=None, sales_stage=None, tag=None):
+    """
+    ConversationFilterIndex rows matching the conversation list filters
+    (every organization if None), newest first.
+
+    Sales stage and tag match case-insensitively on the whole value.
+
+    Returns:
+        Queryset, or None when the index hasn't been built yet or is stale
+        (see is_conversation_index_fresh)
+    """
+    if not is_conversation_index_fresh():
+        return None
+
+    queryset = ConversationFilterIndex.objects.all()
+    if organization is not None:
+        queryset = queryset.filter(organization=organization)
+    if seller_id:
+        queryset = queryset.filter(agents__contains=[seller_id])
+    if sales_stage:
+        queryset = queryset.filter(sales_stage=normalize_filter_value(sales_stage))
+    if tag:
+        queryset = queryset.filter(tags__contains=[normalize_filter_value(tag)])
+    return queryset.order_by('-updated_at')
+
+
+def get_conversation_facets(organization=None):
+    """
+    Distinct sellers, tags and sales stages of an organization's conversations
+    (every organization if None), with their conversation counts.
+
+    Tags and sales stages that differ only in case or surrounding whitespace
+    are one option (they filter the same rows), shown in their most common
+    spelling. Served from the cache for settings.CONVERSATION_FACETS_CACHE_TTL
+    seconds; on a miss the counts are read from the index as last refreshed.
+
+    Returns:
+        Dict with 'sellers', 'tags' and 'sales_stages' lists of {'value', 'count'}
+        sorted by value, or None when the index hasn't been built yet or is
+        stale (see is_conversation_index_fresh), for the caller to fall back
+        to uncounted options
+    """
+    cache_key = f'conversation_facets:{organization or "all"}'
+    facets = cache.get(cache_key)
+    if facets is not None:
+        return facets
+
+    if not is_conversation_index_fresh():
+        return None
+
+    queryset = ConversationFacetValue.objects.all()
+    if organization is not None:
+        queryset = queryset.filter(organization=organization)
+
+    facets = {'sellers': [], 'tags': [], 'sales_stages': []}
+    keys = {SELLER_FACET: 'sellers', TAG_FACET: 'tags', SALES_STAGE_FACET: 'sales_stages'}
+    # (facet, normalized value) -> [display value, its count, total count]
+    options = {}
+    for row in queryset.values('facet', 'value').annotate(count=Count('id')).order_by('facet', 'value'):
+        if row['facet'] not in keys:
+            continue
+        value = row['value'] if row['facet'] == SELLER_FACET else normalize_filter_value(row['value'])
+        option = options.setdefault((row['facet'], value), [row['value'], row['count'], 0])
+        if row['count'] > option[1]:
+            option[0], option[1] = row['value'], row['count']
+        option[2] += row['count']
+    for (facet, _), (value, _, count) in options.items():
+        facets[keys[facet]].append({'value': value, 'count': count})
+    for values in facets.values():
+        values.sort(key=lambda option: option['value'])
+
+    cache.set(cache_key, facets, getattr(settings, 'CONVERSATION_FACETS_CACHE_TTL', 300))
+    return facets
@@ -5,9 +5,9 @@ import random
 import string
 from django.conf import settings
 from django.db import connections
-import psycopg2
 from psycopg2 import errors
 from psycopg2.extras import RealDictCursor
+from .db_pool import get_connection
 
 
 def get_followups_for_agent(agent_uuid):
@@ -21,14 +21,6 @@ def get_followups_for_agent(agent_uuid):
             print("Error: Database 'followups' not configured.")
             return []
         
-        conn = psycopg2.connect(
-            host=db_config.get('HOST', 'localhost'),
-            port=db_config.get('PORT', '5432'),
-            database=db_config.get('NAME'),
-            user=db_config.get('USER'),
-            password=db_config.get('PASSWORD')
-        )
-        
         table_name = getattr(settings, 'FOLLOWUPS_TABLE_NAME', 'follow_up')
         agent_id_col = getattr(settings, 'FOLLOWUPS_AGENT_ID_COLUMN', 'agent_uuid')
         timestamp_col = getattr(settings, 'FOLLOWUPS_TIMESTAMP_COLUMN', 'follow_up_date')
@@ -40,16 +32,13 @@ def get_followups_for_agent(agent_uuid):
             ORDER BY {timestamp_col} ASC
         """
         
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute(query, (str(agent_uuid),))
-        
-        followups = cursor.fetchall()
+        with get_connection('followups') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, (str(agent_uuid),))
+                followups = cursor.fetchall()
         
         followup_list = [dict(row) for row in followups]
         
-        cursor.close()
-        conn.close()
-        
         return followup_list
         
     except Exception as e:
@@ -68,31 +57,19 @@ def get_link_tracking_from_agent(agent_uuid):
             print("Error: Database 'followups' not configured.")
             return []
         
-        conn = psycopg2.connect(
-            host=db_config.get('HOST', 'localhost'),
-            port=db_config.get('PORT', '5432'),
-            database=db_config.get('NAME'),
-            user=db_config.get('USER'),
-            password=db_config.get('PASSWORD')
-        )
-        
         query = """
             SELECT slug, original_url, seller_id
             FROM link_tracking
             WHERE seller_id = %s
         """
         
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cursor.execute(query, (agent_uuid,))
-        
-        links = cursor.fetchall()
+        with get_connection('followups') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, (agent_uuid,))
+                links = cursor.fetchall()
         
         links_list = [dict(row) for row in links]
         
-        cursor.close()
-        conn.close()
-        
         return links_list
         
     except Exception as e:
@@ -110,73 +87,61 @@ def get_conversation_id(url, id_name, separator):
 
 def create_tracked_link(original_url, seller_name):
     """Generate an unique slug, save on db and return a short link."""
-    try:
-        db_config = settings.DATABASES.get('followups')
-        if not db_config:
-            print("Error: Database 'followups' not configured.")
-            return None
-        
-        conn = psycopg2.connect(
-            host=db_config.get('HOST', 'localhost'),
-            port=db_config.get('PORT', '5432'),
-            database=db_config.get('NAME'),
-            user=db_config.get('USER'),
-            password=db_config.get('PASSWORD')
-        )
-
-    except Exception as e:
-        print(f"Error trying to connect to database: {e}")
+    db_config = settings.DATABASES.get('followups')
+    if not db_config:
+        print("Error: Database 'followups' not configured.")
         return None
 
     base_url = "https://followupsbot-prod.up.railway.app"
 
     try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT slug FROM link_tracking 
-                WHERE original_url = %s AND seller_id = %s
-            """, (original_url, seller_name))
-            
-            existing = cur.fetchone()
-            
-            if existing:
-                slug = existing['slug'] if isinstance(existing, dict) else existing[0]
-                conn.close()
-                return f"{base_url}/r/{slug}"
+        with get_connection('followups') as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT slug FROM link_tracking 
+                        WHERE original_url = %s AND seller_id = %s
+                    """, (original_url, seller_name))
+                    
+                    existing = cur.fetchone()
+                    
+                    if existing:
+                        slug = existing[0]
+                        return f"{base_url}/r/{slug}"
 
-    except Exception as e:
-        print(f"Error trying to verify existing link: {e}")
-        if conn: conn.close()
-        return None
+            except Exception as e:
+                print(f"Error trying to verify existing link: {e}")
+                return None
 
-    chars = string.ascii_letters + string.digits
+            chars = string.ascii_letters + string.digits
 
-    for _ in range(5): 
-        slug = ''.join(random.choice(chars) for _ in range(6))
-        
-        try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO link_tracking (slug, original_url, seller_id)
-                    VALUES (%s, %s, %s)
-                """, (slug, original_url, seller_name))
+            for _ in range(5): 
+                slug = ''.join(random.choice(chars) for _ in range(6))
                 
-                conn.commit()
-                conn.close()
-                return f"{base_url}/r/{slug}"
-                
-        except errors.UniqueViolation:
-            conn.rollback()
-            continue
-            
-        except Exception as e:
-            conn.rollback()
-            print(f"Error trying to create new short link: {e}")
-            if conn: conn.close()
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("""
+                            INSERT INTO link_tracking (slug, original_url, seller_id)
+                            VALUES (%s, %s, %s)
+                        """, (slug, original_url, seller_name))
+                        
+                        conn.commit()
+                        return f"{base_url}/r/{slug}"
+                        
+                except errors.UniqueViolation:
+                    conn.rollback()
+                    continue
+                    
+                except Exception as e:
+                    conn.rollback()
+                    print(f"Error trying to create new short link: {e}")
+                    return original_url
+
             return original_url
 
-    if conn: conn.close()
-    return original_url
+    except Exception as e:
+        print(f"Error trying to connect to database: {e}")
+        return None
 
 def create_infobip_conversation_link(conversationId):
     """Create a link for Infobip given a conversationId."""
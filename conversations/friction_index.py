@@ -0,0 +1,142 @@
+"""
+Client and date indexes of the friction heuristics gold dataset.
+
+FrictionIndex orders the interactions by date, and by client then date with
+each client's rows as one contiguous slice, so a client's drilldown or a date
+range is a dict lookup plus a binary search instead of a scan of every row.
+Score thresholds are then applied with NumPy to the candidate rows only. The
+index is built once per version of the dataset's Arrow table.
+"""
+import threading
+
+import numpy as np
+
+from .facets import normalize_filter_value
+
+# Score columns that accept a minimum threshold
+FRICTION_SCORE_COLUMNS = ('urgency_score', 'failure_score', 'escalation_score')
+
+# (table, index) of the last table indexed
+_index_cache = None
+_index_cache_lock = threading.Lock()
+
+
+def _datetime64(value):
+    """numpy datetime64[ns] of a date/datetime bound (None stays None)"""
+    return None if value is None else np.datetime64(value, 'ns')
+
+
+class FrictionIndex:
+    """Sorted-date and client-group indexes over a friction heuristics table"""
+
+    def __init__(self, table):
+        import pyarrow.compute as pc
+
+        self.row_count = table.num_rows
+        # Missing dates (NaT) sort last
+        self.dates = table.column('date').to_numpy().astype('datetime64[ns]')
+
+        # Rows in date order, and their dates for bisecting
+        self.date_order = np.argsort(self.dates, kind='stable')
+        self.sorted_dates = self.dates[self.date_order]
+
+        # Rows grouped by normalized client name, each group in date order
+        names = [normalize_filter_value(name) for name in pc.fill_null(table.column('client_name'), '').to_pylist()]
+        client_keys, client_codes = np.unique(np.array(names, dtype=object), return_inverse=True)
+        self.client_order = np.lexsort((self.dates, client_codes))
+        self.client_dates = self.dates[self.client_order]
+        boundaries = np.searchsorted(client_codes[self.client_order], np.arange(len(client_keys) + 1))
+        self.client_slices = {
+            key: (int(boundaries[code]), int(boundaries[code + 1]))
+            for code, key in enumerate(client_keys) if key
+        }
+
+        self.scores = {
+            column: pc.fill_null(table.column(column), 0).to_numpy()
+            for column in FRICTION_SCORE_COLUMNS if column in table.column_names
+        }
+
+    def lookup(self, client=None, since=None, until=None, min_scores=None):
+        """
+        Rows matching a client, a date range and score thresholds.
+
+        Args:
+            client: Client name (case-insensitive); None for every client
+            since: Earliest date (inclusive), date or datetime
+            until: Latest date (exclusive), date or datetime
+            min_scores: Dict of FRICTION_SCORE_COLUMNS column -> minimum score
+
+        Returns:
+            NumPy array of row indices, in date order
+        """
+        if client:
+            bounds = self.client_slices.get(normalize_filter_value(client))
+            if bounds is None:
+                return np.empty(0, dtype=np.int64)
+            order = self.client_order[bounds[0]:bounds[1]]
+            dates = self.client_dates[bounds[0]:bounds[1]]
+        else:
+            order = self.date_order
+            dates = self.sorted_dates
+
+        start, end = 0, len(dates)
+        if since is not None or until is not None:
+            # Rows without a date never match a date range
+            end = np.searchsorted(dates, np.datetime64('NaT'), side='left')
+        if since is not None:
+            start = np.searchsorted(dates[:end], _datetime64(since), side='left')
+        if until is not None:
+            end = np.searchsorted(dates[:end], _datetime64(until), side='left')
+        rows = order[start:end]
+
+        for column, minimum in (min_scores or {}).items():
+            if minimum is not None and column in self.scores:
+                rows = rows[self.scores[column][rows] >= minimum]
+        return rows
+
+
+def get_friction_index():
+    """
+    FrictionIndex of the friction heuristics dataset and its Arrow table,
+    rebuilt only when the table changes.
+
+    Returns:
+        (index, table), or (None, None) when the dataset has no data file
+    """
+    from .analytics_utils import read_gold_table
+
+    global _index_cache
+
+    table = read_gold_table('friction_heuristics')
+    if table is None:
+        return None, None
+
+    with _index_cache_lock:
+        if _index_cache is not None and _index_cache[0] is table:
+            return _index_cache[1], table
+
+    index = FrictionIndex(table)
+    with _index_cache_lock:
+        _index_cache = (table, index)
+    return index, table
+
+
+def filter_friction(client=None, since=None, until=None, min_scores=None, sort=None, order='asc', page=1, per_page=50):
+    """
+    One page of friction heuristics interactions matching FrictionIndex.lookup
+    filters, via the query engine.
+
+    Returns:
+        query_dataset result ('data', 'stats', 'total_pages')
+    """
+    from .analytics_query import query_dataset
+
+    index, table = get_friction_index()
+    if index is None:
+        return query_dataset([], page=page, per_page=per_page)
+
+    min_scores = {column: minimum for column, minimum in (min_scores or {}).items() if minimum is not None}
+    rows = None
+    if client or since is not None or until is not None or min_scores:
+        rows = index.lookup(client=client, since=since, until=until, min_scores=min_scores)
+    return query_dataset(table, sort=sort, order=order, page=page, per_page=per_page, rows=rows)
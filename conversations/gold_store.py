@@ -0,0 +1,389 @@
+"""
+Memory-mapped Arrow store of the gold datasets, shared by all workers.
+
+Each gold dataset is converted once (at deploy by the build_gold_store
+management command, or by the first worker that notices its source file
+changed) into an uncompressed Arrow IPC file in settings.GOLD_ARROW_CACHE_DIR,
+named after the source file's mtime and size. Workers memory-map that file
+read-only: the tables' buffers point into the OS page cache, which every
+process shares, so per-worker memory doesn't grow with the data and slices
+and column selections are zero-copy.
+
+Next to each Arrow file, a statistics manifest (row count, and per column
+its type, null count, min/max and a small histogram or its most common
+values) is written with the same version, as is one for the clients
+analysis. Pages that only show dataset statistics read the manifest
+instead of the data (see get_gold_manifest and get_clients_manifest).
+"""
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .analytics_query import TIMESTAMP_FORMAT, records_to_table
+from .analytics_utils import (
+    CLIENTS_ANALYSIS_FILE, GOLD_DATA_DIR, GOLD_DATASETS, GOLD_PARQUET_DATASETS, GOLD_PARQUET_DIR,
+)
+
+# Histogram buckets of numeric and date columns, and most common values kept for text columns
+MANIFEST_HISTOGRAM_BINS = 10
+MANIFEST_TOP_VALUES = 5
+
+# name -> (Arrow file path, memory-mapped table)
+_mapped_tables = {}
+_mapped_tables_lock = threading.Lock()
+
+# Attempts at reading a dataset whose files a newer version removed meanwhile
+GOLD_STORE_READ_ATTEMPTS = 3
+
+# dataset name -> (manifest path, parsed manifest) of its current version
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_store_dir():
+    return Path(getattr(settings, 'GOLD_ARROW_CACHE_DIR', settings.BASE_DIR / '.gold_arrow'))
+
+
+def get_source_path(name):
+    """File the dataset is built from: its Parquet copy when current, else its JSON copy (None if neither exists)"""
+    stem = GOLD_DATASETS[name]
+    parquet_path = GOLD_PARQUET_DIR / f'{stem}.parquet'
+    if name in GOLD_PARQUET_DATASETS and parquet_path.exists():
+        return parquet_path
+    json_path = GOLD_DATA_DIR / f'{stem}.json'
+    return json_path if json_path.exists() else None
+
+
+def _versioned_path(stem, source_path, suffix):
+    stat = os.stat(source_path)
+    return get_store_dir() / f'{stem}-{stat.st_mtime_ns}-{stat.st_size}{suffix}'
+
+
+def _arrow_path(name, source_path):
+    return _versioned_path(GOLD_DATASETS[name], source_path, '.arrow')
+
+
+def _manifest_path(stem, source_path):
+    return _versioned_path(stem, source_path, '.manifest.json')
+
+
+def _remove_old_versions(stem, current_paths):
+    # Workers still mapping an old version keep it alive until they remap
+    for pattern in (f'{stem}-*.arrow', f'{stem}-*.manifest.json'):
+        for old_path in get_store_dir().glob(pattern):
+            if old_path not in current_paths:
+                try:
+                    old_path.unlink()
+                except OSError:
+                    pass
+
+
+def _read_current_version(read):
+    """
+    Call read() (which resolves the dataset's current source and opens its
+    files), again when a file it opens is gone: another worker that built a
+    newer version removed it (see _remove_old_versions), so the next attempt
+    finds the newer version.
+    """
+    for attempt in range(GOLD_STORE_READ_ATTEMPTS):
+        try:
+            return read()
+        except FileNotFoundError:
+            if attempt == GOLD_STORE_READ_ATTEMPTS - 1:
+                raise
+
+
+def _temp_path(path):
+    """
+    New, unique temporary file next to path, to be renamed into place once
+    written; unique per call, so threads and processes never share one
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=f'{path.name}.', suffix='.tmp', dir=path.parent)
+    os.close(fd)
+    return Path(temp_path)
+
+
+def _replace_from_temp(path, write):
+    """Call write(temp_path) and move the written file into place at path"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = _temp_path(path)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _read_source(source_path):
+    import pyarrow.parquet as pq
+
+    if source_path.suffix == '.parquet':
+        return pq.read_table(source_path)
+    # Like the request path's JSON fallback: columns mixing types are kept as text
+    with open(source_path, 'r', encoding='utf-8') as f:
+        return records_to_table(json.load(f) or [])
+
+
+def build_arrow_file(name):
+    """
+    Arrow IPC file of a dataset's current source, building it if needed.
+
+    The file is written under a temporary name and renamed into place, so
+    concurrent builders never expose a partial file; older versions of the
+    dataset are removed.
+
+    Returns:
+        Path of the Arrow file, or None when the dataset has no source file
+    """
+    import pyarrow as pa
+
+    source_path = get_source_path(name)
+    if source_path is None:
+        return None
+
+    arrow_path = _arrow_path(name, source_path)
+    manifest_path = _manifest_path(GOLD_DATASETS[name], source_path)
+    if arrow_path.exists():
+        if not manifest_path.exists():
+            with pa.memory_map(str(arrow_path), 'r') as source:
+                _write_manifest(manifest_path, name, source_path, pa.ipc.open_file(source).read_all())
+        return arrow_path
+
+    table = _read_source(source_path)
+
+    def write(temp_path):
+        with pa.OSFile(str(temp_path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    _replace_from_temp(arrow_path, write)
+    _write_manifest(manifest_path, name, source_path, table)
+
+    _remove_old_versions(GOLD_DATASETS[name], {arrow_path, manifest_path})
+    return arrow_path
+
+
+def build_gold_store():
+    """
+    Build the Arrow files and manifests of every gold dataset, and the
+    clients analysis manifest; returns {name: Arrow file path or None}
+    """
+    paths = {name: build_arrow_file(name) for name in GOLD_DATASETS}
+    get_clients_manifest()
+    return paths
+
+
+def get_table(name):
+    """
+    Memory-mapped Arrow table of a gold dataset (remapped when its source
+    file changes).
+
+    Returns:
+        pyarrow.Table, or None when the dataset has no source file
+    """
+    import pyarrow as pa
+
+    def read():
+        source_path = get_source_path(name)
+        if source_path is None:
+            return None
+
+        arrow_path = _arrow_path(name, source_path)
+        with _mapped_tables_lock:
+            mapped = _mapped_tables.get(name)
+            if mapped is not None and mapped[0] == arrow_path:
+                return mapped[1]
+
+        build_arrow_file(name)
+        source = pa.memory_map(str(arrow_path), 'r')
+        table = pa.ipc.open_file(source).read_all()
+
+        with _mapped_tables_lock:
+            _mapped_tables[name] = (arrow_path, table)
+        return table
+
+    return _read_current_version(read)
+
+
+def _json_value(value):
+    """min/max/histogram edge as stored in a manifest"""
+    if hasattr(value, 'strftime'):
+        return value.strftime(TIMESTAMP_FORMAT)
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def column_statistics(array):
+    """
+    Manifest statistics of an Arrow column: type and null count, plus min,
+    max and a histogram ({'edges', 'counts'}) for numbers and dates, the
+    distinct count and most common values for text, or the true count for
+    booleans
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    column_type = array.type
+    stats = {'type': str(column_type), 'null_count': array.null_count}
+    present = pc.drop_null(array)
+
+    is_numeric = pa.types.is_integer(column_type) or pa.types.is_floating(column_type)
+    is_temporal = pa.types.is_timestamp(column_type) or pa.types.is_date(column_type)
+    if is_numeric or is_temporal:
+        if is_temporal:
+            present = pc.cast(present, pa.timestamp('s'), safe=False) if pa.types.is_date(column_type) else present
+            values = present.cast(pa.int64()).to_numpy() if len(present) else np.empty(0)
+        else:
+            # Infinite and NaN values are counted apart from min/max and the histogram
+            values = present.to_numpy().astype(np.float64) if len(present) else np.empty(0)
+            finite = np.isfinite(values)
+            if not finite.all():
+                stats['non_finite_count'] = int((~finite).sum())
+            values = values[finite]
+        if len(values):
+            counts, edges = np.histogram(values, bins=MANIFEST_HISTOGRAM_BINS)
+            if is_temporal:
+                edges = pa.array(edges.astype(np.int64), type=present.type).to_pylist()
+                min_max = pc.min_max(present)
+                minimum, maximum = min_max['min'].as_py(), min_max['max'].as_py()
+            else:
+                minimum, maximum = values.min(), values.max()
+                if pa.types.is_integer(column_type):
+                    minimum, maximum = int(minimum), int(maximum)
+            stats.update({
+                'min': _json_value(minimum),
+                'max': _json_value(maximum),
+                'histogram': {'edges': [_json_value(edge) for edge in edges], 'counts': counts.tolist()},
+            })
+    elif pa.types.is_string(column_type) or pa.types.is_large_string(column_type):
+        value_counts = pc.value_counts(present)
+        top = pc.sort_indices(value_counts.field('counts'), sort_keys=[('', 'descending')])[:MANIFEST_TOP_VALUES]
+        stats.update({
+            'distinct_count': len(value_counts),
+            'top_values': [
+                {'value': item['values'], 'count': item['counts']} for item in value_counts.take(top).to_pylist()
+            ],
+        })
+    elif pa.types.is_boolean(column_type):
+        stats['true_count'] = pc.sum(present).as_py() or 0
+    return stats
+
+
+def table_statistics(table):
+    """Manifest statistics of an Arrow table (row_count, column_count and columns as get_summary_stats, plus column_stats)"""
+    return {
+        'row_count': table.num_rows,
+        'column_count': table.num_columns,
+        'columns': table.column_names,
+        'column_stats': {field.name: column_statistics(table.column(field.name)) for field in table.schema},
+    }
+
+
+def _write_manifest(manifest_path, name, source_path, table, **extra):
+    """Write a dataset's manifest (atomically, like the Arrow files)"""
+    stat = os.stat(source_path)
+    manifest = {
+        'dataset': name,
+        'source': source_path.name,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_size': stat.st_size,
+        'generated_at': timezone.now().isoformat(),
+        **table_statistics(table),
+        **extra,
+    }
+    def write(temp_path):
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+    _replace_from_temp(manifest_path, write)
+    return manifest
+
+
+def _read_manifest(name, manifest_path):
+    """Parsed manifest of a dataset's version, cached until the dataset has a newer one"""
+    with _manifests_lock:
+        cached = _manifests.get(name)
+    if cached is not None and cached[0] == manifest_path:
+        return cached[1]
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    with _manifests_lock:
+        _manifests[name] = (manifest_path, manifest)
+    return manifest
+
+
+def get_gold_manifest(name):
+    """
+    Statistics manifest of a gold dataset's current source (see
+    table_statistics), building the dataset if needed. Callers must not
+    modify it.
+
+    Returns:
+        Dict, or None when the dataset has no source file; raises OSError
+        or pyarrow.ArrowException when the store can't be built or read
+    """
+    def read():
+        source_path = get_source_path(name)
+        if source_path is None:
+            return None
+
+        manifest_path = _manifest_path(GOLD_DATASETS[name], source_path)
+        if not manifest_path.exists():
+            build_arrow_file(name)
+        return _read_manifest(name, manifest_path)
+
+    return _read_current_version(read)
+
+
+def get_clients_manifest():
+    """
+    Statistics manifest of the clients analysis: the time window projection's
+    statistics, its metadata totals and the critical cases' statistics
+    (under 'critical_cases'). Built from the parsed file when it changes.
+
+    Returns:
+        Dict, or None when the file doesn't exist or can't be read
+    """
+    import pyarrow as pa
+    from .analytics_utils import get_client_window_table, load_clients_analysis
+
+    source_path = GOLD_DATA_DIR / CLIENTS_ANALYSIS_FILE
+
+    def read():
+        if not source_path.exists():
+            return None
+
+        stem = source_path.stem
+        manifest_path = _manifest_path(stem, source_path)
+        if not manifest_path.exists():
+            loaded = load_clients_analysis()
+            if loaded is None:
+                return None
+            data = loaded[0]
+            metadata = data.get('metadata') or {}
+            window_table = get_client_window_table()
+            if window_table is None:
+                window_table = next(iter(loaded[1].values()), records_to_table([]))
+            critical_cases = (data.get('global_analyses') or {}).get('critical_cases') or []
+            _write_manifest(
+                manifest_path, 'clients_analysis', source_path, window_table,
+                metadata={key: metadata.get(key) for key in ('total_clients', 'total_contacts')},
+                critical_cases=table_statistics(records_to_table(critical_cases)),
+            )
+            _remove_old_versions(stem, {manifest_path})
+        return _read_manifest('clients_analysis', manifest_path)
+
+    try:
+        return _read_current_version(read)
+    except (OSError, ValueError, pa.ArrowException) as e:
+        print(f"Error reading the clients analysis manifest: {e}")
+        return None
@@ -0,0 +1,114 @@
+"""
+Day-of-week × hour heatmaps of the temporal heat gold dataset.
+
+Every numeric metric of the dataset is pivoted at once into a 7×24 NumPy
+matrix (summing rows that share a day and hour) with its min and max. The
+result is cached per version of the dataset's Arrow table, so switching
+metrics is a dict lookup; heatmaps_to_json() serves all of them for the
+client to re-render without reloading the page.
+"""
+import threading
+
+import numpy as np
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Columns that locate a cell rather than measure it
+HEATMAP_KEY_COLUMNS = ('day_of_week', 'day_name', 'hour')
+
+# (table, heatmaps) of the last table pivoted
+_heatmaps_cache = None
+_heatmaps_cache_lock = threading.Lock()
+
+
+def metric_display_name(metric):
+    return metric.replace('_', ' ').title()
+
+
+def build_heatmaps(table):
+    """
+    Pivot every numeric metric of a temporal heat table into 7×24 matrices.
+
+    Rows outside Monday-Sunday (0-6) or hours 0-23 are ignored; empty values
+    count as 0. min and max include 0, as the heatmap legend starts there.
+
+    Args:
+        table: pyarrow Table with day_of_week, hour and metric columns
+
+    Returns:
+        Dict of metric -> {'matrix': float ndarray (7, 24), 'min', 'max'},
+        in column order
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if table is None or table.num_rows == 0 or not {'day_of_week', 'hour'} <= set(table.column_names):
+        return {}
+
+    days = pc.fill_null(table.column('day_of_week'), -1).to_numpy().astype(np.int64)
+    hours = pc.fill_null(table.column('hour'), -1).to_numpy().astype(np.int64)
+    valid = (days >= 0) & (days < 7) & (hours >= 0) & (hours < 24)
+    cells = days[valid] * 24 + hours[valid]
+
+    heatmaps = {}
+    for field in table.schema:
+        if field.name in HEATMAP_KEY_COLUMNS:
+            continue
+        if not (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)):
+            continue
+        values = pc.fill_null(table.column(field.name), 0).to_numpy().astype(np.float64)
+        matrix = np.bincount(cells, weights=np.nan_to_num(values[valid]), minlength=7 * 24).reshape(7, 24)
+        heatmaps[field.name] = {
+            'matrix': matrix,
+            'min': min(float(matrix.min()), 0.0),
+            'max': max(float(matrix.max()), 0.0),
+        }
+    return heatmaps
+
+
+def get_temporal_heatmaps():
+    """
+    Heatmaps of the temporal heat dataset (see build_heatmaps), rebuilt only
+    when the dataset's table changes. Callers must not modify them.
+    """
+    from .analytics_utils import read_gold_table
+
+    global _heatmaps_cache
+
+    table = read_gold_table('temporal_heat')
+    with _heatmaps_cache_lock:
+        if _heatmaps_cache is not None and _heatmaps_cache[0] is table:
+            return _heatmaps_cache[1]
+
+    heatmaps = build_heatmaps(table)
+    with _heatmaps_cache_lock:
+        _heatmaps_cache = (table, heatmaps)
+    return heatmaps
+
+
+def heatmap_rows(heatmap):
+    """Template rows of a heatmap: one per day, with its 24 hour cells"""
+    return [
+        {
+            'day_name': DAY_NAMES[day],
+            'day_num': day,
+            'hours': [{'hour': hour, 'value': value} for hour, value in enumerate(values)],
+        }
+        for day, values in enumerate(heatmap['matrix'].tolist())
+    ]
+
+
+def heatmaps_to_json(heatmaps):
+    """JSON-serializable form of heatmaps: day names, and per metric its display name, 7×24 values, min and max"""
+    return {
+        'day_names': DAY_NAMES,
+        'metrics': {
+            metric: {
+                'display': metric_display_name(metric),
+                'values': heatmap['matrix'].tolist(),
+                'min': heatmap['min'],
+                'max': heatmap['max'],
+            }
+            for metric, heatmap in heatmaps.items()
+        },
+    }
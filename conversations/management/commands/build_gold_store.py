@@ -0,0 +1,21 @@
+"""
+Build the memory-mapped Arrow store of the gold datasets and their statistics
+manifests (see conversations/gold_store.py).
+
+Run at deploy, before the workers start, so none of them has to convert a
+dataset or compute its statistics on its first request.
+"""
+from django.core.management.base import BaseCommand
+
+from conversations.gold_store import build_gold_store
+
+
+class Command(BaseCommand):
+    help = 'Convert the gold datasets into the shared Arrow IPC store and write their statistics manifests'
+
+    def handle(self, *args, **options):
+        for name, path in build_gold_store().items():
+            if path is None:
+                self.stdout.write(self.style.WARNING(f"{name}: no data file"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: {path}"))
@@ -0,0 +1,34 @@
+"""
+Bring the per-agent daily metrics rollup, the conversation activity rollup and
+the objection facts table up to date (see conversations/rollups.py).
+
+Meant to run periodically (scheduler.sh does):
+    python manage.py update_agent_rollups
+"""
+from django.core.management.base import BaseCommand
+
+from conversations.rollups import update_agent_daily_metrics, update_conversation_activity, update_objection_facts
+
+
+class Command(BaseCommand):
+    help = 'Update the per-agent daily metrics and conversation activity rollups and objection facts from the events and analytics databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild every day instead of resuming from the watermark',
+        )
+
+    def handle(self, *args, **options):
+        result = update_agent_daily_metrics(full=options['full'])
+        since = result['since'] or 'the beginning'
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {result['rows']} agent daily metrics since {since}"
+        ))
+
+        activity = update_conversation_activity(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Updated {activity} agent conversation activity rows"))
+
+        objections = update_objection_facts(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Exploded {objections} objection facts"))
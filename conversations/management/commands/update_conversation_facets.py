@@ -0,0 +1,36 @@
+"""
+Bring the conversation list facet and filter indexes up to date (see
+conversations/facets.py).
+
+Run once with --full to build it, then periodically (scheduler.sh does): each
+run indexes the conversations updated since the last one. Add --prune to a
+less frequent run (e.g. nightly) to drop the deleted conversations; it
+checks the whole index. The list view only reads the index.
+"""
+from django.core.management.base import BaseCommand
+
+from conversations.facets import prune_deleted_conversations, update_conversation_facets
+
+
+class Command(BaseCommand):
+    help = 'Update the seller, tag and sales stage facets and filter index of the conversation list'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild the whole index (also drops deleted conversations)',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Also drop the conversations deleted since they were indexed (checks the whole index)',
+        )
+
+    def handle(self, *args, **options):
+        indexed = update_conversation_facets(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed facets of {indexed} conversations"))
+
+        if options['prune'] and not options['full']:
+            pruned = prune_deleted_conversations()
+            self.stdout.write(self.style.SUCCESS(f"Dropped facets of {pruned} deleted conversations"))
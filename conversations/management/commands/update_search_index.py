@@ -0,0 +1,39 @@
+"""
+Bring the conversation search index up to date (see conversations/search.py).
+
+Run once with --full to build it, then periodically (e.g. from cron) to pick
+up new and updated conversations and messages. Add --prune to a less
+frequent run (e.g. nightly) to drop the deleted ones; it checks the whole
+index.
+"""
+from django.core.management.base import BaseCommand
+
+from conversations.search import prune_search_index, update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Update the full-text search index of conversations and messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Re-index every conversation and message (also drops deleted ones)',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Also drop the conversations and messages deleted since they were indexed (checks the whole index)',
+        )
+
+    def handle(self, *args, **options):
+        indexed = update_search_index(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed['conversations']} conversations and {indexed['messages']} messages"
+        ))
+
+        if options['prune'] and not options['full']:
+            pruned = prune_search_index()
+            self.stdout.write(self.style.SUCCESS(
+                f"Dropped {pruned['conversations']} deleted conversations and {pruned['messages']} deleted messages"
+            ))
@@ -0,0 +1,45 @@
+# Generated migration for the per-agent daily metrics rollup and its watermark
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0007_convert_to_uuid_primary_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('high_water_mark', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Watermark',
+                'verbose_name_plural': 'Rollup Watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='AgentDailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agent_uuid', models.CharField(max_length=255)),
+                ('day', models.DateField()),
+                ('metric', models.CharField(max_length=255)),
+                ('value', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Agent Daily Metric',
+                'verbose_name_plural': 'Agent Daily Metrics',
+                'indexes': [models.Index(fields=['day'], name='agent_daily_metric_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='agentdailymetric',
+            constraint=models.UniqueConstraint(fields=('agent_uuid', 'day', 'metric'), name='unique_agent_day_metric'),
+        ),
+    ]
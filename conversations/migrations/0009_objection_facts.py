@@ -0,0 +1,42 @@
+# Generated migration for the objection facts table
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0008_agent_daily_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ObjectionFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analysis_uuid', models.CharField(max_length=255)),
+                ('position', models.PositiveIntegerField()),
+                ('agent_uuid', models.CharField(max_length=255)),
+                ('conversation_uuid', models.CharField(blank=True, max_length=255, null=True)),
+                ('objection_type', models.CharField(max_length=100)),
+                ('resolution_quality', models.FloatField(default=0)),
+                ('resolved', models.BooleanField(default=False)),
+                ('objection_text', models.TextField(blank=True, default='')),
+                ('seller_response', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Objection Fact',
+                'verbose_name_plural': 'Objection Facts',
+                'indexes': [
+                    models.Index(fields=['agent_uuid', 'created_at'], name='objection_fact_agent_idx'),
+                    models.Index(fields=['agent_uuid', 'resolution_quality', 'created_at'], name='objection_fact_quality_idx'),
+                    models.Index(fields=['agent_uuid', 'objection_type'], name='objection_fact_type_idx'),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='objectionfact',
+            constraint=models.UniqueConstraint(fields=('analysis_uuid', 'position'), name='unique_objection_fact'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated migration for the conversation list facet index
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0009_objection_facts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationFacetValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conversation_uuid', models.UUIDField()),
+                ('organization', models.UUIDField(blank=True, null=True)),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Conversation Facet Value',
+                'verbose_name_plural': 'Conversation Facet Values',
+                'indexes': [
+                    models.Index(fields=['organization', 'facet', 'value'], name='conversation_facet_org_idx'),
+                    models.Index(fields=['conversation_uuid'], name='conversation_facet_conv_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated migration for the conversation and message search index
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0010_conversation_facet_values'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='ConversationSearchDocument',
+            fields=[
+                ('conversation_uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('organization', models.UUIDField(blank=True, null=True)),
+                ('client_text', models.TextField(blank=True, default='')),
+                ('document', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Conversation Search Document',
+                'verbose_name_plural': 'Conversation Search Documents',
+                'indexes': [
+                    django.contrib.postgres.indexes.GinIndex(fields=['document'], name='conv_search_document_idx'),
+                    django.contrib.postgres.indexes.GinIndex(fields=['client_text'], name='conv_search_trgm_idx', opclasses=['gin_trgm_ops']),
+                    models.Index(fields=['organization'], name='conv_search_org_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='MessageSearchDocument',
+            fields=[
+                ('message_uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('conversation_uuid', models.UUIDField()),
+                ('organization', models.UUIDField(blank=True, null=True)),
+                ('content', models.TextField(blank=True, default='')),
+                ('document', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Message Search Document',
+                'verbose_name_plural': 'Message Search Documents',
+                'indexes': [
+                    django.contrib.postgres.indexes.GinIndex(fields=['document'], name='msg_search_document_idx'),
+                    models.Index(fields=['organization', 'conversation_uuid'], name='msg_search_org_conv_idx'),
+                ],
+            },
+        ),
+    ]
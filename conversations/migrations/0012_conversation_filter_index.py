@@ -0,0 +1,37 @@
+# Generated migration for the conversation list filter index
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0011_search_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationFilterIndex',
+            fields=[
+                ('conversation_uuid', models.UUIDField(primary_key=True, serialize=False)),
+                ('organization', models.UUIDField(blank=True, null=True)),
+                ('sales_stage', models.CharField(blank=True, default='', max_length=255)),
+                ('tags', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None)),
+                ('agents', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Conversation Filter Index',
+                'verbose_name_plural': 'Conversation Filter Index',
+                'indexes': [
+                    models.Index(fields=['organization', '-updated_at'], name='conv_filter_org_updated_idx'),
+                    models.Index(fields=['organization', 'sales_stage'], name='conv_filter_org_stage_idx'),
+                    models.Index(fields=['-updated_at'], name='conv_filter_updated_idx'),
+                    django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='conv_filter_tags_idx'),
+                    django.contrib.postgres.indexes.GinIndex(fields=['agents'], name='conv_filter_agents_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated migration for the per-agent conversation activity rollup
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('conversations', '0012_conversation_filter_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentConversationActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agent_uuid', models.CharField(max_length=255)),
+                ('conversation_uuid', models.CharField(max_length=255)),
+                ('last_event_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Agent Conversation Activity',
+                'verbose_name_plural': 'Agent Conversation Activity',
+                'indexes': [models.Index(fields=['agent_uuid', 'last_event_at'], name='agent_conv_activity_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='agentconversationactivity',
+            constraint=models.UniqueConstraint(fields=('agent_uuid', 'conversation_uuid'), name='unique_agent_conversation'),
+        ),
+    ]
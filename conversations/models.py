@@ -6,6 +6,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 class Team(models.Model):
@@ -196,3 +198,180 @@ class Message(models.Model):
     def __str__(self):
         return f"Message {self.id} from {self.sender_uuid}"
 
+
+
+class AgentDailyMetric(models.Model):
+    """Per agent, day and metric rollup of the events and analytics databases (see rollups.py)"""
+    agent_uuid = models.CharField(max_length=255)
+    day = models.DateField()
+    metric = models.CharField(max_length=255)
+    value = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Agent Daily Metric'
+        verbose_name_plural = 'Agent Daily Metrics'
+        constraints = [
+            models.UniqueConstraint(fields=['agent_uuid', 'day', 'metric'], name='unique_agent_day_metric'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='agent_daily_metric_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.agent_uuid} {self.day} {self.metric}={self.value}"
+
+
+class AgentConversationActivity(models.Model):
+    """
+    Latest sales stage change of an agent in a conversation, so distinct
+    conversation counts over any period up to now come from the rollup
+    (see rollups.py)
+    """
+    agent_uuid = models.CharField(max_length=255)
+    conversation_uuid = models.CharField(max_length=255)
+    last_event_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Agent Conversation Activity'
+        verbose_name_plural = 'Agent Conversation Activity'
+        constraints = [
+            models.UniqueConstraint(fields=['agent_uuid', 'conversation_uuid'], name='unique_agent_conversation'),
+        ]
+        indexes = [
+            models.Index(fields=['agent_uuid', 'last_event_at'], name='agent_conv_activity_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.agent_uuid} {self.conversation_uuid} at {self.last_event_at}"
+
+
+class RollupWatermark(models.Model):
+    """High-water mark of an incrementally maintained rollup"""
+    name = models.CharField(max_length=100, primary_key=True)
+    high_water_mark = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Rollup Watermark'
+        verbose_name_plural = 'Rollup Watermarks'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
+
+
+class ObjectionFact(models.Model):
+    """One objection detected in a SALES_PERFORMANCE analysis (see rollups.py)"""
+    analysis_uuid = models.CharField(max_length=255)
+    position = models.PositiveIntegerField()
+    agent_uuid = models.CharField(max_length=255)
+    conversation_uuid = models.CharField(max_length=255, blank=True, null=True)
+    objection_type = models.CharField(max_length=100)
+    resolution_quality = models.FloatField(default=0)
+    resolved = models.BooleanField(default=False)
+    objection_text = models.TextField(blank=True, default='')
+    seller_response = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Objection Fact'
+        verbose_name_plural = 'Objection Facts'
+        constraints = [
+            models.UniqueConstraint(fields=['analysis_uuid', 'position'], name='unique_objection_fact'),
+        ]
+        indexes = [
+            models.Index(fields=['agent_uuid', 'created_at'], name='objection_fact_agent_idx'),
+            models.Index(fields=['agent_uuid', 'resolution_quality', 'created_at'], name='objection_fact_quality_idx'),
+            models.Index(fields=['agent_uuid', 'objection_type'], name='objection_fact_type_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.objection_type} ({self.resolution_quality}) in {self.analysis_uuid}"
+
+
+class ConversationFacetValue(models.Model):
+    """Seller, tag or sales stage of a conversation, for the conversation list filters (see facets.py)"""
+    conversation_uuid = models.UUIDField()
+    organization = models.UUIDField(blank=True, null=True)
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=255)
+    
+    class Meta:
+        verbose_name = 'Conversation Facet Value'
+        verbose_name_plural = 'Conversation Facet Values'
+        indexes = [
+            models.Index(fields=['organization', 'facet', 'value'], name='conversation_facet_org_idx'),
+            models.Index(fields=['conversation_uuid'], name='conversation_facet_conv_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.conversation_uuid} {self.facet}={self.value}"
+
+
+class ConversationFilterIndex(models.Model):
+    """
+    Normalized filter columns of a conversation (one row per conversation), so
+    the conversation list filters can use indexes (see facets.py)
+    """
+    conversation_uuid = models.UUIDField(primary_key=True)
+    organization = models.UUIDField(blank=True, null=True)
+    sales_stage = models.CharField(max_length=255, blank=True, default='')
+    tags = ArrayField(models.CharField(max_length=255), blank=True, default=list)
+    agents = ArrayField(models.CharField(max_length=255), blank=True, default=list)
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Conversation Filter Index'
+        verbose_name_plural = 'Conversation Filter Index'
+        indexes = [
+            models.Index(fields=['organization', '-updated_at'], name='conv_filter_org_updated_idx'),
+            models.Index(fields=['organization', 'sales_stage'], name='conv_filter_org_stage_idx'),
+            models.Index(fields=['-updated_at'], name='conv_filter_updated_idx'),
+            GinIndex(fields=['tags'], name='conv_filter_tags_idx'),
+            GinIndex(fields=['agents'], name='conv_filter_agents_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Filter index of conversation {self.conversation_uuid}"
+
+
+class ConversationSearchDocument(models.Model):
+    """Full-text and trigram search document of a conversation's client metadata (see search.py)"""
+    conversation_uuid = models.UUIDField(primary_key=True)
+    organization = models.UUIDField(blank=True, null=True)
+    client_text = models.TextField(blank=True, default='')
+    document = SearchVectorField(blank=True, null=True)
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Conversation Search Document'
+        verbose_name_plural = 'Conversation Search Documents'
+        indexes = [
+            GinIndex(fields=['document'], name='conv_search_document_idx'),
+            GinIndex(fields=['client_text'], name='conv_search_trgm_idx', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['organization'], name='conv_search_org_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Search document of conversation {self.conversation_uuid}"
+
+
+class MessageSearchDocument(models.Model):
+    """Full-text search document of a message's content (see search.py)"""
+    message_uuid = models.UUIDField(primary_key=True)
+    conversation_uuid = models.UUIDField()
+    organization = models.UUIDField(blank=True, null=True)
+    content = models.TextField(blank=True, default='')
+    document = SearchVectorField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Message Search Document'
+        verbose_name_plural = 'Message Search Documents'
+        indexes = [
+            GinIndex(fields=['document'], name='msg_search_document_idx'),
+            models.Index(fields=['organization', 'conversation_uuid'], name='msg_search_org_conv_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Search document of message {self.message_uuid}"
@@ -1,8 +1,10 @@
 """
 MongoDB connection and utility functions
 """
+import os
+import threading
 from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError, ConfigurationError
+from pymongo.errors import ServerSelectionTimeoutError, ConfigurationError, PyMongoError
 from django.conf import settings
 
 # Cache for UUID to email mapping (loaded once at startup)
@@ -13,9 +15,15 @@ _ALL_SELLERS_CACHE = None
 _ALL_TAGS_CACHE = None
 _ALL_SALES_STAGES_CACHE = None
 
+# Process-wide MongoClient (pymongo pools connections internally).
+# The owning PID is tracked so a forked worker builds its own client.
+_MONGO_CLIENT = None
+_MONGO_CLIENT_PID = None
+_MONGO_CLIENT_LOCK = threading.Lock()
 
-def get_mongodb_client():
-    """Get MongoDB client connection"""
+
+def _create_mongodb_client():
+    """Create and verify a new MongoDB client"""
     mongodb_url = settings.MONGODB_URL
     
     # Check if MongoDB URL is configured (not using default localhost)
@@ -29,7 +37,8 @@ def get_mongodb_client():
         client = MongoClient(
             mongodb_url,
             serverSelectionTimeoutMS=5000,  # 5 second timeout
-            connectTimeoutMS=5000
+            connectTimeoutMS=5000,
+            maxPoolSize=getattr(settings, 'MONGODB_MAX_POOL_SIZE', 20),
         )
         # Test the connection
         client.admin.command('ping')
@@ -46,6 +55,50 @@ def get_mongodb_client():
         )
 
 
+def get_mongodb_client():
+    """Get the shared MongoDB client for this process (created and pinged on first use)"""
+    global _MONGO_CLIENT, _MONGO_CLIENT_PID
+    
+    pid = os.getpid()
+    if _MONGO_CLIENT is not None and _MONGO_CLIENT_PID == pid:
+        return _MONGO_CLIENT
+    
+    with _MONGO_CLIENT_LOCK:
+        if _MONGO_CLIENT is None or _MONGO_CLIENT_PID != pid:
+            # A client inherited from the parent process is not fork-safe;
+            # drop the reference without closing the parent's sockets.
+            _MONGO_CLIENT = _create_mongodb_client()
+            _MONGO_CLIENT_PID = pid
+            if settings.DEBUG:
+                print(f"Created MongoDB client for process {pid}")
+        return _MONGO_CLIENT
+
+
+def close_mongodb_client():
+    """Close the shared MongoDB client (a new one is created on next use)"""
+    global _MONGO_CLIENT, _MONGO_CLIENT_PID
+    
+    with _MONGO_CLIENT_LOCK:
+        if _MONGO_CLIENT is not None and _MONGO_CLIENT_PID == os.getpid():
+            _MONGO_CLIENT.close()
+        _MONGO_CLIENT = None
+        _MONGO_CLIENT_PID = None
+
+
+def mongodb_health_check():
+    """
+    Cheap health probe for the shared MongoDB client.
+    
+    Returns:
+        Tuple (is_healthy, error_message)
+    """
+    try:
+        get_mongodb_client().admin.command('ping')
+        return True, None
+    except (PyMongoError, ConnectionError) as e:
+        return False, str(e)
+
+
 def get_conversations_collection():
     """Get the conversations collection from MongoDB"""
     client = get_mongodb_client()
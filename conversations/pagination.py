@@ -0,0 +1,109 @@
+"""
+Keyset (cursor) pagination for the conversations database.
+
+Pages are selected with a WHERE on (order field, uuid) instead of OFFSET, so
+every page costs the same no matter how deep it is, and totals can be taken
+from the planner's row estimate instead of a COUNT(*).
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor can't be decoded"""
+
+
+def encode_cursor(value, pk):
+    """Opaque cursor for the row with this order field value and primary key"""
+    payload = json.dumps([value.isoformat(), str(pk)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(order field value, primary key) of a cursor made by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(value), uuid.UUID(pk)
+    except (ValueError, TypeError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_page(queryset, order_field, cursor=None, direction='next', per_page=20, descending=True):
+    """
+    One page of a queryset ordered by (order_field, pk).
+
+    Args:
+        queryset: Unordered or ordered queryset (its ordering is replaced); a
+            values() queryset must include order_field and 'pk'
+        order_field: Timestamp field to page on, e.g. 'updated_at'
+        cursor: Cursor of the row to start after (None for the first page)
+        direction: 'next' for the rows after the cursor, 'previous' for the ones before it
+        per_page: Page size
+        descending: Order newest first
+
+    Returns:
+        Dict with 'items' (model instances or dicts in display order), 'next_cursor' and
+        'previous_cursor' (None when there is nothing in that direction)
+    """
+    forward = direction != 'previous'
+    # Walking backwards reads the rows before the cursor in reverse order
+    newest_first = descending == forward
+
+    if newest_first:
+        ordering = (f'-{order_field}', '-pk')
+        after = 'lt'
+    else:
+        ordering = (order_field, 'pk')
+        after = 'gt'
+
+    page_queryset = queryset.order_by(*ordering)
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        # The redundant inclusive bound lets PostgreSQL range-scan an
+        # (order_field, uuid) index instead of evaluating the OR per row
+        page_queryset = page_queryset.filter(
+            Q(**{f'{order_field}__{after}e': value}),
+            Q(**{f'{order_field}__{after}': value}) |
+            Q(**{order_field: value, f'pk__{after}': pk})
+        )
+
+    rows = list(page_queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    def row_cursor(row):
+        if isinstance(row, dict):
+            return encode_cursor(row[order_field], row['pk'])
+        return encode_cursor(getattr(row, order_field), row.pk)
+
+    if forward:
+        has_next, has_previous = has_more, bool(cursor)
+    else:
+        has_next, has_previous = bool(cursor), has_more
+
+    return {
+        'items': rows,
+        'next_cursor': row_cursor(rows[-1]) if rows and has_next else None,
+        'previous_cursor': row_cursor(rows[0]) if rows and has_previous else None,
+    }
+
+
+def estimate_count(queryset):
+    """
+    Row count of a queryset as estimated by the PostgreSQL planner (no scan).
+
+    Returns:
+        Estimated number of rows, or None if the plan couldn't be read
+    """
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception:
+        return None
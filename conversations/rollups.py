@@ -0,0 +1,471 @@
+"""
+Rollups of the events and analytics databases kept in the default database.
+
+update_agent_daily_metrics() (run by the update_agent_rollups management command)
+folds the raw rows into AgentDailyMetric, one row per agent, UTC day and metric,
+and advances a watermark. get_rollup_agent_counts() then answers the team scoring
+queries from the rollup for every complete day and only scans the raw tables for
+the partial first and last days and the days after the watermark.
+
+Distinct conversation counts can't be summed across days, so
+update_conversation_activity() keeps AgentConversationActivity, the latest
+sales stage change of each agent in each conversation: an agent's
+conversations since a date are its rows with a later last_event_at, plus the
+ones only seen in the raw tail after the watermark.
+
+update_objection_facts() explodes the objections of new SALES_PERFORMANCE
+analyses into ObjectionFact, one row per detected objection.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from psycopg2.extras import RealDictCursor
+
+from .db_pool import get_connection
+from .models import AgentConversationActivity, AgentDailyMetric, ObjectionFact, RollupWatermark
+
+ROLLUP_NAME = 'agent_daily_metrics'
+ACTIVITY_NAME = 'agent_conversation_activity'
+OBJECTION_FACTS_NAME = 'objection_facts'
+STAGE_PREFIX = 'stage:'
+ANALYSIS_PREFIX = 'analysis:'
+FOLLOWUPS_METRIC = 'followups'
+SALE_STAGE = 'purchased_payment_confirmed'
+
+
+def get_watermark(name=ROLLUP_NAME):
+    """Datetime up to which a rollup is complete, or None if it was never built"""
+    watermark = RollupWatermark.objects.filter(name=name).first()
+    return watermark.high_water_mark if watermark else None
+
+
+def lock_watermark(name):
+    """
+    Get (creating if needed) a watermark row and lock it until the end of the
+    current transaction, so concurrent refreshes of the same index serialize.
+
+    Returns:
+        (RollupWatermark, created) tuple; a just created watermark has no
+        index behind it yet
+    """
+    watermark, created = RollupWatermark.objects.get_or_create(
+        name=name, defaults={'high_water_mark': timezone.now()}
+    )
+    return RollupWatermark.objects.select_for_update().get(pk=watermark.pk), created
+
+
+def _start_of_day(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def as_aware(value):
+    """Treat naive timestamps from the external databases as UTC"""
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _utc_day(value):
+    """UTC calendar day of a datetime"""
+    return as_aware(value).astimezone(dt_timezone.utc).date()
+
+
+def _lookback_start(watermark):
+    """Start of the UTC day settings.ROLLUP_LOOKBACK seconds before a watermark, where a refresh resumes"""
+    return _start_of_day(_utc_day(watermark - timedelta(seconds=getattr(settings, 'ROLLUP_LOOKBACK', 86400))))
+
+
+def _daily_analysis_counts(since=None):
+    """Scoring counters (see empty_analysis_counters) per agent and day, as (agent_uuid, day, metric, value) tuples"""
+    from .analytics_metrics import SCORED_ANALYSIS_TYPES, analysis_counters_from_row, analysis_counters_query
+
+    db_name = 'analytics'
+    if not settings.DATABASES.get(db_name):
+        return []
+
+    timestamp_col = getattr(settings, 'ANALYTICS_TIMESTAMP_COLUMN', 'created_at')
+    where_sql = "analysis_type IN %s"
+    params = [SCORED_ANALYSIS_TYPES]
+    if since:
+        where_sql += f" AND {timestamp_col} >= %s"
+        params.append(since)
+
+    with get_connection(db_name, statement_timeout=0) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(analysis_counters_query(where_sql, group_by_day=True), tuple(params))
+            rows = cursor.fetchall()
+
+    counts = []
+    for row in rows:
+        if not row['agent_uuid']:
+            continue
+        for key, value in analysis_counters_from_row(row).items():
+            if value:
+                counts.append((str(row['agent_uuid']), row['day'], ANALYSIS_PREFIX + key, value))
+    return counts
+
+
+def update_agent_daily_metrics(full=False):
+    """
+    Bring the rollup up to date.
+
+    Recomputes every day from the one containing settings.ROLLUP_LOOKBACK
+    seconds before the watermark (or everything when full is set or no
+    watermark exists yet), so rows inserted or updated late with an older
+    timestamp are picked up on the next run.
+
+    Returns:
+        Dict with the recomputed start day and the number of rows written
+    """
+    from .events_db import get_daily_event_counts
+
+    now = timezone.now()
+    watermark = None if full else get_watermark()
+    since = _lookback_start(watermark) if watermark else None
+
+    counts = [
+        (str(row['agent_uuid']), row['day'], row['metric'], row['count'])
+        for row in get_daily_event_counts(since=since)
+        if row['agent_uuid'] and row['metric']
+    ]
+    counts.extend(_daily_analysis_counts(since=since))
+
+    with transaction.atomic():
+        stale = AgentDailyMetric.objects.all()
+        if since:
+            stale = stale.filter(day__gte=since.date())
+        stale.delete()
+
+        AgentDailyMetric.objects.bulk_create(
+            [
+                AgentDailyMetric(agent_uuid=agent_uuid, day=day, metric=metric, value=value)
+                for agent_uuid, day, metric, value in counts
+            ],
+            batch_size=1000
+        )
+
+        RollupWatermark.objects.update_or_create(
+            name=ROLLUP_NAME,
+            defaults={'high_water_mark': now}
+        )
+
+    return {'since': since.date() if since else None, 'rows': len(counts)}
+
+
+def update_conversation_activity(full=False):
+    """
+    Bring AgentConversationActivity up to date.
+
+    Re-reads the events from the day containing settings.ROLLUP_LOOKBACK
+    seconds before the watermark (or all of them when full is set or no
+    watermark exists yet) and moves each agent's conversation to its latest
+    sales stage change.
+
+    Returns:
+        Number of (agent, conversation) rows written
+    """
+    from .events_db import get_conversation_activity
+
+    now = timezone.now()
+    watermark = None if full else get_watermark(ACTIVITY_NAME)
+    since = _lookback_start(watermark) if watermark else None
+
+    rows = [
+        AgentConversationActivity(
+            agent_uuid=str(row['agent_uuid']),
+            conversation_uuid=str(row['conversation_uuid']),
+            last_event_at=as_aware(row['last_event_at']),
+        )
+        for row in get_conversation_activity(since=since)
+    ]
+
+    with transaction.atomic():
+        if since is None:
+            AgentConversationActivity.objects.all().delete()
+
+        # Re-read events are at least as recent as the stored ones
+        AgentConversationActivity.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['agent_uuid', 'conversation_uuid'],
+            update_fields=['last_event_at']
+        )
+
+        RollupWatermark.objects.update_or_create(
+            name=ACTIVITY_NAME,
+            defaults={'high_water_mark': now}
+        )
+
+    return len(rows)
+
+
+def _rollup_conversation_counts(agent_uuids, start_date=None):
+    """
+    Distinct conversations with a sales stage change since start_date per
+    agent: AgentConversationActivity rows active since then, plus the pairs
+    only seen in the raw events from the activity watermark's day on.
+
+    Returns:
+        Dict keyed by agent UUID, or None if the activity rollup hasn't been built
+    """
+    from .events_db import get_agent_conversations
+
+    watermark = get_watermark(ACTIVITY_NAME)
+    if watermark is None:
+        return None
+
+    tail_start = _start_of_day(_utc_day(watermark))
+    if start_date and start_date > tail_start:
+        tail_start = start_date
+
+    activity = AgentConversationActivity.objects.filter(agent_uuid__in=agent_uuids)
+    if start_date:
+        activity = activity.filter(last_event_at__gte=start_date)
+
+    counts = {agent_uuid: 0 for agent_uuid in agent_uuids}
+    for row in activity.values('agent_uuid').annotate(count=Count('id')).order_by():
+        counts[row['agent_uuid']] = row['count']
+
+    tail_pairs = get_agent_conversations(agent_uuids, start_date=tail_start)
+    if tail_pairs:
+        counted = set(
+            activity.filter(conversation_uuid__in={conversation_uuid for _, conversation_uuid in tail_pairs})
+            .values_list('agent_uuid', 'conversation_uuid')
+        )
+        for agent_uuid, _ in tail_pairs - counted:
+            if agent_uuid in counts:
+                counts[agent_uuid] += 1
+    return counts
+
+
+def _add_event_counts(event_counts, extra_counts):
+    """Add get_event_counts_by_agent stage and follow-up counts into event_counts"""
+    for agent_uuid, extra in extra_counts.items():
+        agent_events = event_counts.setdefault(
+            agent_uuid, {'raw_stages': {}, 'total_conversations': 0, 'total_sales': 0, 'total_followups': 0}
+        )
+        for stage, count in extra['raw_stages'].items():
+            agent_events['raw_stages'][stage] = agent_events['raw_stages'].get(stage, 0) + count
+        agent_events['total_sales'] += extra['total_sales']
+        agent_events['total_followups'] += extra['total_followups']
+
+
+def _add_analysis_counters(analysis_counters, extra_counters):
+    """Add get_analysis_counters_by_agent counters into analysis_counters"""
+    from .analytics_metrics import empty_analysis_counters
+
+    for agent_uuid, extra in extra_counters.items():
+        agent_counters = analysis_counters.setdefault(agent_uuid, empty_analysis_counters())
+        for key, value in extra.items():
+            agent_counters[key] += value
+
+
+def get_rollup_agent_counts(agent_uuids, start_date=None, end_date=None, count_conversations=True):
+    """
+    Event counts and analysis counters per agent, in the shapes returned by
+    get_event_counts_by_agent and get_analysis_counters_by_agent, from
+    start_date (inclusive) to end_date (exclusive); either bound may be None.
+
+    Only whole UTC days between start_date and the watermark's day (or
+    end_date's day, if earlier) come from the rollup. The partial day of
+    start_date (from start_date to the next UTC midnight) and everything
+    from the last rollup day on are read from the raw tables. The distinct
+    conversation count comes from the conversation activity rollup (see
+    _rollup_conversation_counts) for open-ended periods, else from the raw
+    events; without count_conversations it isn't queried and stays 0.
+
+    Returns:
+        (event_counts, analysis_counters) tuple, or None if the rollup hasn't been built
+    """
+    from .analytics_metrics import empty_analysis_counters, get_analysis_counters_by_agent
+    from .events_db import get_conversation_counts_by_agent, get_event_counts_by_agent
+
+    watermark = get_watermark()
+    if watermark is None:
+        return None
+
+    start_date = as_aware(start_date) if start_date else None
+    end_date = as_aware(end_date) if end_date else None
+
+    # Whole UTC days from first_day (inclusive) to last_day (exclusive) come from the rollup
+    first_day = None
+    if start_date:
+        first_day = _utc_day(start_date)
+        if start_date > _start_of_day(first_day):
+            # The rollup only holds whole days; start_date's own day is partial
+            first_day += timedelta(days=1)
+    last_day = _utc_day(watermark)
+    if end_date and _utc_day(end_date) < last_day:
+        last_day = _utc_day(end_date)
+
+    use_rollup = first_day is None or first_day < last_day
+    if use_rollup:
+        raw_ranges = [(_start_of_day(last_day), end_date)]
+        if start_date and start_date < _start_of_day(first_day):
+            raw_ranges.append((start_date, _start_of_day(first_day)))
+    else:
+        # No whole day left for the rollup: read it all from the raw tables
+        raw_ranges = [(start_date, end_date)]
+
+    event_counts = {}
+    analysis_counters = {}
+    for range_start, range_end in raw_ranges:
+        if range_end is not None and range_start >= range_end:
+            continue
+        _add_event_counts(
+            event_counts,
+            get_event_counts_by_agent(agent_uuids, start_date=range_start, end_date=range_end, count_conversations=False)
+        )
+        _add_analysis_counters(
+            analysis_counters, get_analysis_counters_by_agent(agent_uuids, start_date=range_start, end_date=range_end)
+        )
+
+    conversation_counts = {}
+    if count_conversations:
+        # The activity rollup only knows each conversation's latest change, so it can't bound the end
+        conversation_counts = _rollup_conversation_counts(agent_uuids, start_date=start_date) if end_date is None else None
+        if conversation_counts is None:
+            conversation_counts = get_conversation_counts_by_agent(agent_uuids, start_date=start_date, end_date=end_date)
+
+    totals = defaultdict(dict)
+    if use_rollup:
+        rollup = AgentDailyMetric.objects.filter(agent_uuid__in=agent_uuids, day__lt=last_day)
+        if first_day:
+            rollup = rollup.filter(day__gte=first_day)
+        for row in rollup.values('agent_uuid', 'metric').annotate(total=Sum('value')):
+            totals[row['agent_uuid']][row['metric']] = row['total']
+
+    for agent_uuid in agent_uuids:
+        agent_events = event_counts.setdefault(
+            agent_uuid, {'raw_stages': {}, 'total_conversations': 0, 'total_sales': 0, 'total_followups': 0}
+        )
+        agent_counters = analysis_counters.setdefault(agent_uuid, empty_analysis_counters())
+
+        for metric, total in totals.get(agent_uuid, {}).items():
+            if metric.startswith(STAGE_PREFIX):
+                stage = metric[len(STAGE_PREFIX):]
+                agent_events['raw_stages'][stage] = agent_events['raw_stages'].get(stage, 0) + int(total)
+                if stage == SALE_STAGE:
+                    agent_events['total_sales'] += int(total)
+            elif metric == FOLLOWUPS_METRIC:
+                agent_events['total_followups'] += int(total)
+            elif metric.startswith(ANALYSIS_PREFIX):
+                key = metric[len(ANALYSIS_PREFIX):]
+                if key in ('discount_score_sum', 'sentiment_sum'):
+                    agent_counters[key] += float(total)
+                elif key in agent_counters:
+                    agent_counters[key] += int(total)
+
+        agent_events['total_conversations'] = conversation_counts.get(agent_uuid, 0)
+
+    return event_counts, analysis_counters
+
+
+def update_objection_facts(full=False):
+    """
+    Explode the objections of SALES_PERFORMANCE analyses into ObjectionFact.
+
+    Re-scans from settings.ROLLUP_LOOKBACK seconds before the newest analysis
+    already exploded, so analyses inserted late with an older timestamp are
+    picked up; the stored facts of every re-scanned analysis are replaced,
+    so objections removed from an analysis are dropped too.
+
+    Returns:
+        Number of objection rows read from the analytics database
+    """
+    db_name = 'analytics'
+    if not settings.DATABASES.get(db_name):
+        return 0
+
+    table_name = getattr(settings, 'ANALYTICS_TABLE_NAME', 'analytics')
+    agent_id_col = getattr(settings, 'ANALYTICS_AGENT_ID_COLUMN', 'agent_uuid')
+    timestamp_col = getattr(settings, 'ANALYTICS_TIMESTAMP_COLUMN', 'created_at')
+
+    watermark = None if full else get_watermark(OBJECTION_FACTS_NAME)
+    params = []
+    date_filter = ""
+    if watermark:
+        date_filter = f"AND a.{timestamp_col} >= %s"
+        params.append(watermark - timedelta(seconds=getattr(settings, 'ROLLUP_LOOKBACK', 86400)))
+
+    query = f"""
+        SELECT
+            a.uuid AS analysis_uuid,
+            o.position - 1 AS position,
+            a.{agent_id_col} AS agent_uuid,
+            a.conversation_uuid,
+            a.{timestamp_col} AS created_at,
+            COALESCE(NULLIF(o.value->>'objection_type', ''), 'other') AS objection_type,
+            CASE WHEN jsonb_typeof(o.value->'resolution_quality') = 'number'
+                 THEN (o.value->>'resolution_quality')::numeric ELSE 0 END AS resolution_quality,
+            COALESCE(o.value->>'resolved' = 'true', FALSE) AS resolved,
+            COALESCE(o.value->>'objection_text', '') AS objection_text,
+            COALESCE(o.value->>'seller_response', '') AS seller_response
+        FROM {table_name} a
+        LEFT JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(a.result::jsonb->'objection_details'->'objections_detected') = 'array'
+                 THEN a.result::jsonb->'objection_details'->'objections_detected'
+                 ELSE '[]'::jsonb END
+        ) WITH ORDINALITY AS o(value, position) ON TRUE
+        WHERE a.analysis_type = 'SALES_PERFORMANCE'
+        AND a.{agent_id_col} IS NOT NULL
+        {date_filter}
+        ORDER BY a.{timestamp_col}
+    """
+
+    with get_connection(db_name, statement_timeout=0) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, tuple(params))
+            rows = cursor.fetchall()
+
+    # Analyses without objections come back as one row without a position
+    facts = [row for row in rows if row['position'] is not None]
+
+    with transaction.atomic():
+        if full:
+            ObjectionFact.objects.all().delete()
+        else:
+            scanned = list(dict.fromkeys(str(row['analysis_uuid']) for row in rows))
+            for start in range(0, len(scanned), 1000):
+                ObjectionFact.objects.filter(analysis_uuid__in=scanned[start:start + 1000]).delete()
+
+        ObjectionFact.objects.bulk_create(
+            [
+                ObjectionFact(
+                    analysis_uuid=str(row['analysis_uuid']),
+                    position=row['position'],
+                    agent_uuid=str(row['agent_uuid']),
+                    conversation_uuid=str(row['conversation_uuid']) if row['conversation_uuid'] else None,
+                    objection_type=row['objection_type'],
+                    resolution_quality=float(row['resolution_quality']),
+                    resolved=row['resolved'],
+                    objection_text=row['objection_text'],
+                    seller_response=row['seller_response'],
+                    created_at=as_aware(row['created_at']),
+                )
+                for row in facts
+            ],
+            batch_size=1000
+        )
+
+        if rows:
+            # Never move back: the re-scanned window may end before the watermark
+            high_water_mark = as_aware(rows[-1]['created_at'])
+            if watermark and watermark > high_water_mark:
+                high_water_mark = watermark
+            RollupWatermark.objects.update_or_create(
+                name=OBJECTION_FACTS_NAME,
+                defaults={'high_water_mark': high_water_mark}
+            )
+        elif full or watermark is None:
+            RollupWatermark.objects.update_or_create(
+                name=OBJECTION_FACTS_NAME,
+                defaults={'high_water_mark': timezone.now()}
+            )
+
+    return len(facts)
@@ -0,0 +1,316 @@
+"""
+Full-text search over conversations' client metadata and message content.
+
+The conversations database is external and not managed by this app, so the
+searchable text is mirrored into ConversationSearchDocument (client name,
+email and UUID: tsvector plus trigram index) and MessageSearchDocument
+(message content: tsvector) in the default database. update_search_index()
+(run by the update_search_index management command) brings both up to date
+incrementally from updated_at; rows of deleted conversations and messages
+are dropped by a full rebuild or, less often than the refresh, by
+prune_search_index (--prune).
+"""
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector, TrigramSimilarity,
+)
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Conversation, ConversationSearchDocument, Message, MessageSearchDocument
+from .rollups import as_aware, get_watermark, lock_watermark
+
+CONVERSATIONS_INDEX_NAME = 'search_conversations'
+MESSAGES_INDEX_NAME = 'search_messages'
+
+# Placeholders for ts_headline's match markers; the snippet is HTML-escaped
+# before they are replaced with <mark> tags
+MARK_START = '{{mark}}'
+MARK_STOP = '{{/mark}}'
+
+# tsvector input is capped at 1MB; long messages only need their beginning indexed
+MAX_INDEXED_CONTENT = 20000
+
+
+def _search_config():
+    return getattr(settings, 'SEARCH_TEXT_CONFIG', 'portuguese')
+
+
+def _client_text(name, email, conversation_uuid):
+    return ' '.join(str(part) for part in (name, email, conversation_uuid) if part)
+
+
+def _index_incrementally(name, queryset, upsert, document_model, full=False, chunk_size=2000):
+    """
+    Feed the rows of queryset updated since the watermark to upsert, in
+    chunks (all of them, after emptying document_model, when full is set)
+    """
+    with transaction.atomic():
+        watermark_row, created = lock_watermark(name)
+        full = full or created
+        if full:
+            document_model.objects.all().delete()
+        else:
+            queryset = queryset.filter(updated_at__gte=watermark_row.high_water_mark)
+
+        indexed = 0
+        high_water_mark = None
+        chunk = []
+        for row in queryset.order_by('updated_at').iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                upsert(chunk)
+                indexed += len(chunk)
+                high_water_mark = as_aware(chunk[-1][-1])
+                chunk = []
+
+        if chunk:
+            upsert(chunk)
+            indexed += len(chunk)
+            high_water_mark = as_aware(chunk[-1][-1])
+
+        if high_water_mark or full:
+            watermark_row.high_water_mark = high_water_mark or timezone.now()
+            watermark_row.save()
+
+    return indexed
+
+
+def _upsert_conversations(rows):
+    config = _search_config()
+    ConversationSearchDocument.objects.bulk_create(
+        [
+            ConversationSearchDocument(
+                conversation_uuid=conv_id,
+                organization=organization,
+                client_text=_client_text(name, email, conv_id),
+                updated_at=updated_at,
+            )
+            for conv_id, organization, name, email, updated_at in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['conversation_uuid'],
+        update_fields=['organization', 'client_text', 'updated_at'],
+        batch_size=1000
+    )
+    ConversationSearchDocument.objects.filter(conversation_uuid__in=[row[0] for row in rows]).update(
+        document=SearchVector('client_text', weight='A', config=config)
+    )
+
+
+def _upsert_messages(rows):
+    config = _search_config()
+    MessageSearchDocument.objects.bulk_create(
+        [
+            MessageSearchDocument(
+                message_uuid=message_id,
+                conversation_uuid=conversation_uuid,
+                organization=organization,
+                content=(content or '')[:MAX_INDEXED_CONTENT],
+                created_at=created_at,
+            )
+            for message_id, conversation_uuid, organization, content, created_at, _ in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['message_uuid'],
+        update_fields=['conversation_uuid', 'organization', 'content', 'created_at'],
+        batch_size=1000
+    )
+    MessageSearchDocument.objects.filter(message_uuid__in=[row[0] for row in rows]).update(
+        document=SearchVector('content', weight='B', config=config)
+    )
+
+
+def update_search_index(full=False):
+    """
+    Index the conversations and messages updated since the last run (all of
+    them, rebuilding the tables, when full is set or the index was never
+    built).
+
+    Returns:
+        Dict with the number of conversations and messages indexed
+    """
+    conversations = _index_incrementally(
+        CONVERSATIONS_INDEX_NAME,
+        Conversation.objects.values_list(
+            'id', 'alma_internal_organization', 'metadata__clientName', 'metadata__clientEmail', 'updated_at'
+        ),
+        _upsert_conversations,
+        ConversationSearchDocument,
+        full=full
+    )
+    messages = _index_incrementally(
+        MESSAGES_INDEX_NAME,
+        Message.objects.values_list(
+            'id', 'conversation_uuid', 'alma_internal_organization', 'content', 'created_at', 'updated_at'
+        ),
+        _upsert_messages,
+        MessageSearchDocument,
+        full=full
+    )
+    return {'conversations': conversations, 'messages': messages}
+
+
+def _prune_documents(document_model, key, source_model, chunk_size):
+    """Delete the rows of document_model whose key no longer exists in source_model"""
+    indexed_uuids = document_model.objects.order_by(key).values_list(key, flat=True)
+
+    deleted = []
+    chunk = []
+
+    def collect(uuids):
+        existing = set(source_model.objects.filter(id__in=uuids).values_list('id', flat=True))
+        deleted.extend(uuid for uuid in uuids if uuid not in existing)
+
+    for uuid in indexed_uuids.iterator(chunk_size=chunk_size):
+        chunk.append(uuid)
+        if len(chunk) >= chunk_size:
+            collect(chunk)
+            chunk = []
+    if chunk:
+        collect(chunk)
+
+    for start in range(0, len(deleted), chunk_size):
+        document_model.objects.filter(**{f'{key}__in': deleted[start:start + chunk_size]}).delete()
+
+    return len(deleted)
+
+
+def prune_search_index(chunk_size=2000):
+    """
+    Drop the search documents of conversations and messages that no longer
+    exist. They live in another database, so every indexed UUID is checked
+    against it chunk by chunk: this walks both tables, so it runs on its own
+    schedule rather than with each incremental refresh.
+
+    Returns:
+        Dict with the number of conversations and messages dropped
+    """
+    return {
+        'conversations': _prune_documents(ConversationSearchDocument, 'conversation_uuid', Conversation, chunk_size),
+        'messages': _prune_documents(MessageSearchDocument, 'message_uuid', Message, chunk_size),
+    }
+
+
+def is_search_index_ready():
+    """Whether both search tables have been built"""
+    return get_watermark(CONVERSATIONS_INDEX_NAME) is not None and get_watermark(MESSAGES_INDEX_NAME) is not None
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>').replace(MARK_STOP, '</mark>'))
+
+
+def _matching_documents(text, organization=None, candidates=None):
+    """
+    Search query with the client and message documents matching text,
+    optionally restricted to an organization and to candidates (a queryset
+    of rows with a conversation_uuid in the default database)
+    """
+    query = SearchQuery(text, search_type='websearch', config=_search_config())
+
+    conversations = ConversationSearchDocument.objects.filter(
+        Q(document=query) | Q(client_text__icontains=text) | Q(client_text__trigram_similar=text)
+    )
+    messages = MessageSearchDocument.objects.filter(document=query)
+    if organization is not None:
+        conversations = conversations.filter(organization=organization)
+        messages = messages.filter(organization=organization)
+    if candidates is not None:
+        candidate_uuids = candidates.order_by().values('conversation_uuid')
+        conversations = conversations.filter(conversation_uuid__in=candidate_uuids)
+        messages = messages.filter(conversation_uuid__in=candidate_uuids)
+    return query, conversations, messages
+
+
+def search_matches(text, organization=None):
+    """
+    Every conversation matching a search (same matching as
+    search_conversations, unranked and unlimited).
+
+    Returns:
+        Pair of querysets of conversation_uuid values (client matches and
+        message matches), usable as subqueries in the default database, or
+        None when text is empty
+    """
+    text = (text or '').strip()
+    if not text:
+        return None
+    _, conversations, messages = _matching_documents(text, organization)
+    return (
+        conversations.order_by().values('conversation_uuid'),
+        messages.order_by().values('conversation_uuid'),
+    )
+
+
+def search_conversations(text, organization=None, limit=None, candidates=None):
+    """
+    Conversations matching a search, best first.
+
+    Client name, email and UUID match by words, substring (ILIKE) or
+    similarity (trigrams); message content matches by words (websearch
+    syntax: quotes, OR, -excluded). A conversation's score adds its client
+    and best message ranks.
+
+    Args:
+        text: Search text
+        organization: Only search this organization's conversations (all if None)
+        limit: Maximum number of conversations (settings.SEARCH_MAX_RESULTS if None)
+        candidates: Only rank these conversations (queryset of rows with a
+            conversation_uuid, e.g. filter_conversation_index), applied
+            before the limit
+
+    Returns:
+        List of dicts with conversation_uuid, score and snippet (highlighted
+        HTML excerpt of the best matching message, or None)
+    """
+    text = (text or '').strip()
+    if not text:
+        return []
+    if limit is None:
+        limit = getattr(settings, 'SEARCH_MAX_RESULTS', 200)
+
+    config = _search_config()
+    query, conversations, messages = _matching_documents(text, organization, candidates)
+
+    scores = {}
+    client_hits = conversations.annotate(
+        score=SearchRank(F('document'), query) + TrigramSimilarity('client_text', text)
+    ).order_by('-score').values_list('conversation_uuid', 'score')[:limit]
+    for conversation_uuid, score in client_hits:
+        scores[conversation_uuid] = score
+
+    # Best matching message per conversation, among the top ranked messages
+    best_messages = {}
+    message_hits = messages.annotate(
+        score=SearchRank(F('document'), query)
+    ).order_by('-score').values_list('message_uuid', 'conversation_uuid', 'score')[:limit * 5]
+    for message_uuid, conversation_uuid, score in message_hits:
+        if conversation_uuid not in best_messages:
+            best_messages[conversation_uuid] = message_uuid
+            scores[conversation_uuid] = scores.get(conversation_uuid, 0) + score
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    snippet_messages = [best_messages[conv_id] for conv_id, _ in ranked if conv_id in best_messages]
+    snippets = dict(
+        MessageSearchDocument.objects.filter(message_uuid__in=snippet_messages).annotate(
+            snippet=SearchHeadline(
+                'content', query, config=config,
+                start_sel=MARK_START, stop_sel=MARK_STOP, max_words=25, min_words=10
+            )
+        ).values_list('message_uuid', 'snippet')
+    ) if snippet_messages else {}
+
+    return [
+        {
+            'conversation_uuid': conversation_uuid,
+            'score': score,
+            'snippet': _highlight(snippets[best_messages[conversation_uuid]])
+            if best_messages.get(conversation_uuid) in snippets else None,
+        }
+        for conversation_uuid, score in ranked
+    ]
@@ -0,0 +1,332 @@
+import json
+import operator
+import os
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from .analytics_query import query_dataset, records_to_table
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from . import analytics_utils, exports, facets, rollups, search, views
+
+
+class ListColumnSortTests(SimpleTestCase):
+    """Sorting by a list column, as the analytics tables' sort links do"""
+
+    def _sorted_names(self, records, column):
+        table = records_to_table(records)
+        by_table = [row['name'] for row in query_dataset(table, sort=column, cache_sort=False)['data']]
+        by_records = [row['name'] for row in query_dataset(records, sort=column, cache_sort=False)['data']]
+        self.assertEqual(by_table, by_records)
+        return by_table
+
+    def test_sort_by_empty_lists(self):
+        records = [{'name': 'b', 'topics': []}, {'name': 'a', 'topics': []}]
+        self.assertEqual(self._sorted_names(records, 'topics'), ['b', 'a'])
+
+    def test_sort_by_string_lists(self):
+        records = [{'name': 'b', 'topics': ['Price']}, {'name': 'a', 'topics': ['delivery', 'price']}]
+        self.assertEqual(self._sorted_names(records, 'topics'), ['a', 'b'])
+
+    def test_sort_by_number_lists(self):
+        records = [{'name': 'b', 'scores': [3, 1]}, {'name': 'a', 'scores': [10]}]
+        self.assertEqual(self._sorted_names(records, 'scores'), ['a', 'b'])
+
+
+LOOKUPS = {'lt': operator.lt, 'lte': operator.le, 'gt': operator.gt, 'gte': operator.ge}
+
+
+class FakeQuerySet:
+    """Just enough of a queryset over dicts (with a 'pk') for keyset_page"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def order_by(self, *fields):
+        rows = self.rows
+        for field in reversed(fields):
+            rows = sorted(rows, key=lambda row: row[field.lstrip('-')], reverse=field.startswith('-'))
+        return FakeQuerySet(rows)
+
+    def filter(self, *conditions):
+        return FakeQuerySet([row for row in self.rows if all(self._matches(row, q) for q in conditions)])
+
+    def _matches(self, row, q):
+        results = []
+        for child in q.children:
+            if isinstance(child, tuple):
+                lookup, value = child
+                field, _, op = lookup.partition('__')
+                results.append(LOOKUPS[op](row[field], value) if op else row[field] == value)
+            else:
+                results.append(self._matches(row, child))
+        return any(results) if q.connector == 'OR' else all(results)
+
+    def __getitem__(self, item):
+        return self.rows[item]
+
+
+class KeysetPaginationTests(SimpleTestCase):
+    """Cursor round trips through keyset_page, including rows with equal timestamps"""
+
+    def setUp(self):
+        base = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        # Three rows share each timestamp, so pages split inside a timestamp
+        self.rows = [
+            {'pk': uuid.UUID(int=index + 1), 'updated_at': base + timedelta(hours=index // 3)}
+            for index in range(10)
+        ]
+        self.queryset = FakeQuerySet(self.rows)
+
+    def _walk(self, direction, cursor=None):
+        pages = []
+        while True:
+            page = keyset_page(self.queryset, 'updated_at', cursor=cursor, direction=direction, per_page=4)
+            pages.append([row['pk'] for row in page['items']])
+            cursor = page['next_cursor' if direction == 'next' else 'previous_cursor']
+            if cursor is None:
+                return pages, page
+
+    def test_cursor_round_trip(self):
+        value = datetime(2024, 1, 1, 12, 30, tzinfo=dt_timezone.utc)
+        pk = uuid.uuid4()
+        self.assertEqual(decode_cursor(encode_cursor(value, pk)), (value, pk))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not a cursor')
+
+    def test_forward_walk_lists_every_row_once(self):
+        pages, _ = self._walk('next')
+        expected = [row['pk'] for row in sorted(self.rows, key=lambda row: (row['updated_at'], row['pk']), reverse=True)]
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+
+    def test_backward_walk_returns_the_same_pages(self):
+        forward_pages, last_page = self._walk('next')
+        backward_pages, first_page = self._walk('previous', cursor=last_page['previous_cursor'])
+        self.assertEqual(list(reversed(backward_pages)), forward_pages[:-1])
+        self.assertIsNone(first_page['previous_cursor'])
+        self.assertIsNotNone(first_page['next_cursor'])
+
+
+@override_settings(ROLLUP_LOOKBACK=86400)
+class RollupWatermarkTests(SimpleTestCase):
+    """Where the rollup refresh resumes, and which ranges the rollup reader reads raw"""
+
+    watermark = datetime(2024, 1, 10, 12, 0, tzinfo=dt_timezone.utc)
+
+    def test_refresh_resumes_a_lookback_before_the_watermark(self):
+        self.assertEqual(rollups._lookback_start(self.watermark), datetime(2024, 1, 9, tzinfo=dt_timezone.utc))
+
+    def test_refresh_reads_from_the_lookback_start(self):
+        with mock.patch.object(rollups, 'get_watermark', return_value=self.watermark), \
+                mock.patch('conversations.events_db.get_daily_event_counts', return_value=[]) as daily_counts, \
+                mock.patch.object(rollups, '_daily_analysis_counts', return_value=[]) as analysis_counts, \
+                mock.patch.object(rollups, 'transaction'), \
+                mock.patch.object(rollups, 'AgentDailyMetric') as metrics, \
+                mock.patch.object(rollups, 'RollupWatermark'):
+            result = rollups.update_agent_daily_metrics()
+
+        since = datetime(2024, 1, 9, tzinfo=dt_timezone.utc)
+        daily_counts.assert_called_once_with(since=since)
+        analysis_counts.assert_called_once_with(since=since)
+        # Every recomputed day is replaced, so running it twice writes the same rows
+        metrics.objects.all.return_value.filter.assert_called_once_with(day__gte=since.date())
+        self.assertEqual(result['since'], since.date())
+
+    def _raw_ranges(self, start_date, end_date):
+        with mock.patch.object(rollups, 'get_watermark', return_value=self.watermark), \
+                mock.patch('conversations.events_db.get_event_counts_by_agent', return_value={}) as event_counts, \
+                mock.patch('conversations.analytics_metrics.get_analysis_counters_by_agent', return_value={}), \
+                mock.patch.object(rollups, 'AgentDailyMetric') as metrics:
+            rollups.get_rollup_agent_counts(['agent'], start_date=start_date, end_date=end_date, count_conversations=False)
+        ranges = sorted(
+            (call.kwargs['start_date'], call.kwargs['end_date']) for call in event_counts.call_args_list
+        )
+        return ranges, metrics.objects.filter.call_args_list
+
+    def test_bounded_period_reads_partial_days_raw(self):
+        start = datetime(2024, 1, 3, 6, 0, tzinfo=dt_timezone.utc)
+        end = datetime(2024, 1, 8, 18, 0, tzinfo=dt_timezone.utc)
+        ranges, rollup_filters = self._raw_ranges(start, end)
+        self.assertEqual(ranges, [
+            (start, datetime(2024, 1, 4, tzinfo=dt_timezone.utc)),
+            (datetime(2024, 1, 8, tzinfo=dt_timezone.utc), end),
+        ])
+        self.assertEqual(rollup_filters[0].kwargs['day__lt'], date(2024, 1, 8))
+
+    def test_open_period_reads_from_the_watermark_day_raw(self):
+        start = datetime(2024, 1, 3, tzinfo=dt_timezone.utc)
+        ranges, rollup_filters = self._raw_ranges(start, None)
+        self.assertEqual(ranges, [(datetime(2024, 1, 10, tzinfo=dt_timezone.utc), None)])
+        self.assertEqual(rollup_filters[0].kwargs['day__lt'], date(2024, 1, 10))
+
+    def test_period_after_the_watermark_skips_the_rollup(self):
+        start = datetime(2024, 1, 10, 6, 0, tzinfo=dt_timezone.utc)
+        ranges, rollup_filters = self._raw_ranges(start, None)
+        self.assertEqual(ranges, [(start, None)])
+        self.assertEqual(rollup_filters, [])
+
+
+class SearchTests(SimpleTestCase):
+    """Snippet escaping and the search cap"""
+
+    def test_highlight_escapes_message_html(self):
+        snippet = f'<script>alert(1)</script> a {search.MARK_START}price{search.MARK_STOP} & more'
+        self.assertEqual(
+            search._highlight(snippet),
+            '&lt;script&gt;alert(1)&lt;/script&gt; a <mark>price</mark> &amp; more'
+        )
+
+    def test_empty_search_matches_nothing(self):
+        self.assertEqual(search.search_conversations('  '), [])
+        self.assertIsNone(search.search_matches(''))
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_capped_only_without_a_fresh_filter_index(self):
+        hits = {'a': {}, 'b': {}}
+        with mock.patch.object(views, 'is_conversation_index_fresh', return_value=False):
+            self.assertTrue(views.is_search_capped(hits))
+            self.assertFalse(views.is_search_capped({'a': {}}))
+            self.assertFalse(views.is_search_capped(None))
+        with mock.patch.object(views, 'is_conversation_index_fresh', return_value=True):
+            self.assertFalse(views.is_search_capped(hits))
+
+
+class ExportStreamingTests(SimpleTestCase):
+    """Event exports with text timestamps and records that fail to read"""
+
+    events = [
+        {'id': '1', 'event_type': 'SALES_STAGE_CHANGE', 'datetime': '2024-01-02T03:04:05', 'json': {'a': 1}},
+        {'id': '2', 'event_type': 'FOLLOWUP_DETECTION', 'datetime': 'yesterday', 'json': None},
+    ]
+
+    def _export(self, records, export_format):
+        with mock.patch.object(exports, 'iter_export_records', return_value=records):
+            return list(exports.stream_export(None, export_format, 'events'))
+
+    def _failing(self):
+        yield self.events[0]
+        raise RuntimeError('connection lost')
+
+    def test_csv_exports_text_timestamps(self):
+        lines = ''.join(self._export(iter(self.events), 'csv')).splitlines()
+        self.assertIn('2024-01-02T03:04:05+00:00', lines[1])
+        self.assertIn('yesterday', lines[2])
+
+    def test_parquet_nulls_unparseable_timestamps(self):
+        import io
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(b''.join(self._export(iter(self.events), 'parquet'))))
+        self.assertEqual(table.column('datetime').null_count, 1)
+
+    def test_error_on_the_first_record_fails_before_streaming(self):
+        def failing():
+            raise RuntimeError('connection refused')
+            yield
+
+        with self.assertRaises(RuntimeError):
+            self._export(failing(), 'csv')
+
+    def test_later_error_ends_the_file_cleanly(self):
+        import io
+        import pyarrow.parquet as pq
+
+        with mock.patch('builtins.print'):
+            csv_pieces = self._export(self._failing(), 'csv')
+            parquet_pieces = self._export(self._failing(), 'parquet')
+        self.assertEqual(len(''.join(csv_pieces).splitlines()), 2)
+        table = pq.read_table(io.BytesIO(b''.join(parquet_pieces)))
+        self.assertEqual(table.num_rows, 1)
+
+
+class ConversationFacetTests(SimpleTestCase):
+    """Facet values under the filter index's normalization, and the stale index fallback"""
+
+    def test_facet_values_keep_one_spelling_per_normalized_value(self):
+        values = facets.conversation_facet_values('{seller}', 'Won, won , WON,  ', ' Won ')
+        self.assertEqual(values, [
+            (facets.SELLER_FACET, 'seller'), (facets.TAG_FACET, 'Won'), (facets.SALES_STAGE_FACET, 'Won'),
+        ])
+
+    def test_facet_options_merge_spellings(self):
+        rows = [
+            {'facet': facets.TAG_FACET, 'value': 'WON', 'count': 1},
+            {'facet': facets.TAG_FACET, 'value': 'Won', 'count': 3},
+            {'facet': facets.TAG_FACET, 'value': 'lost', 'count': 2},
+        ]
+        with mock.patch.object(facets, 'cache') as cache, \
+                mock.patch.object(facets, 'is_conversation_index_fresh', return_value=True), \
+                mock.patch.object(facets, 'ConversationFacetValue') as facet_values:
+            cache.get.return_value = None
+            facet_values.objects.all.return_value.values.return_value.annotate.return_value.order_by.return_value = rows
+            options = facets.get_conversation_facets()
+        self.assertEqual(options['tags'], [{'value': 'Won', 'count': 4}, {'value': 'lost', 'count': 2}])
+
+    def _fresh(self, refreshed_at):
+        with mock.patch.object(facets, 'RollupWatermark') as watermarks:
+            watermarks.objects.filter.return_value.values_list.return_value.first.return_value = refreshed_at
+            return facets.is_conversation_index_fresh()
+
+    @override_settings(CONVERSATION_INDEX_MAX_AGE=3600)
+    def test_index_is_bypassed_when_missing_or_stale(self):
+        from django.utils import timezone
+
+        self.assertFalse(self._fresh(None))
+        self.assertTrue(self._fresh(timezone.now() - timedelta(minutes=5)))
+        self.assertFalse(self._fresh(timezone.now() - timedelta(hours=2)))
+        with mock.patch.object(facets, 'is_conversation_index_fresh', return_value=False):
+            self.assertIsNone(facets.filter_conversation_index(tag='won'))
+
+    @override_settings(CONVERSATION_INDEX_MAX_AGE=0)
+    def test_max_age_zero_always_uses_the_index(self):
+        from django.utils import timezone
+
+        self.assertTrue(self._fresh(timezone.now() - timedelta(days=30)))
+
+
+class DatasetCacheTests(SimpleTestCase):
+    """Gold datasets cached per path until the file changes, within the byte budget"""
+
+    def setUp(self):
+        analytics_utils.clear_dataset_cache()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(analytics_utils.clear_dataset_cache)
+
+    def _write(self, name, data, mtime=None):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_unchanged_file_is_parsed_once(self):
+        path = self._write('a.json', [1])
+        loader = mock.Mock(side_effect=analytics_utils._read_json)
+        analytics_utils.load_cached_dataset(path, loader)
+        self.assertEqual(analytics_utils.load_cached_dataset(path, loader), [1])
+        self.assertEqual(loader.call_count, 1)
+
+    def test_changed_file_is_reloaded(self):
+        path = self._write('a.json', [1], mtime=1000)
+        analytics_utils.load_cached_dataset(path)
+        self._write('a.json', [1, 2], mtime=2000)
+        self.assertEqual(analytics_utils.load_cached_dataset(path), [1, 2])
+
+    def test_least_recently_used_files_are_evicted(self):
+        paths = [self._write(f'{name}.json', [name] * 10) for name in 'abc']
+        size = os.path.getsize(paths[0])
+        loader = mock.Mock(side_effect=analytics_utils._read_json)
+        with override_settings(GOLD_DATA_CACHE_MAX_BYTES=size * 2):
+            for path in paths:
+                analytics_utils.load_cached_dataset(path, loader)
+            analytics_utils.load_cached_dataset(paths[2], loader)
+            analytics_utils.load_cached_dataset(paths[0], loader)
+        self.assertEqual(loader.call_count, 4)
@@ -1,17 +1,27 @@
 """
 URL configuration for conversations app
 """
+from django.conf import settings
 from django.urls import path
 from . import views
 from . import views_other
 
+# Under ASGI (settings.ASYNC_VIEWS) the I/O-heavy pages use their async variants
+if settings.ASYNC_VIEWS:
+    from . import views_async as dashboard_views
+else:
+    dashboard_views = views_other
+
 urlpatterns = [
     # Workspace (root)
-    path('', views_other.workspace, name='workspace'),
+    path('', dashboard_views.workspace, name='workspace'),
     
     # Conversations routes
     path('conversations/', views.conversation_list, name='conversation_list'),
+    path('conversations/api/', views.conversation_list_api, name='conversation_list_api'),
+    path('conversations/export/', views.conversation_export, name='conversation_export'),
     path('conversations/conversation/<str:conversation_id>/', views.conversation_detail, name='conversation_detail'),
+    path('conversations/conversation/<str:conversation_id>/messages/', views.conversation_messages_api, name='conversation_messages_api'),
     
     # Other sections
     path('agentes/', views_other.agentes_list, name='agentes_list'),
@@ -26,11 +36,13 @@ urlpatterns = [
     path('analytics/cx-volumetrics/', views_other.analytics_cx_volumetrics, name='analytics_cx_volumetrics'),
     path('analytics/friction-heuristics/', views_other.analytics_friction_heuristics, name='analytics_friction_heuristics'),
     path('analytics/temporal-heat/', views_other.analytics_temporal_heat, name='analytics_temporal_heat'),
+    path('analytics/temporal-heat/data/', views_other.analytics_temporal_heat_data, name='analytics_temporal_heat_data'),
     path('analytics/churn-risk/', views_other.analytics_churn_risk, name='analytics_churn_risk'),
     path('analytics/critical-cases/', views_other.analytics_critical_cases, name='analytics_critical_cases'),
     path('analytics/sales-velocity/', views_other.analytics_sales_velocity, name='analytics_sales_velocity'),
     path('analytics/segmentation-matrix/', views_other.analytics_segmentation_matrix, name='analytics_segmentation_matrix'),
-    path('analytics/team-performance/', views_other.team_performance_detail, name='team_performance_detail'),
+    path('analytics/team-performance/', dashboard_views.team_performance_detail, name='team_performance_detail'),
+    path('analytics/team-performance/windows/', views_other.team_window_metrics, name='team_window_metrics'),
     path('profile/', views_other.profile, name='profile'),
 ]
 
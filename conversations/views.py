@@ -1,18 +1,29 @@
 """
 Views for the conversations app
 """
+import re
 import uuid
 import json
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
-from django.http import JsonResponse, Http404
+from django.http import JsonResponse, Http404, StreamingHttpResponse
+from django.core.exceptions import ValidationError
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Case, When, IntegerField
 from datetime import datetime
-from .models import Conversation, Message
+from urllib.parse import urlencode
+from .models import Conversation, ConversationFilterIndex, Message
 from .events_db import get_events_for_conversation
+from .exports import EXPORT_COLUMNS, EXPORT_FORMATS, stream_export
+from .facets import (
+    filter_conversation_index, get_conversation_facets, is_conversation_index_fresh, normalize_filter_value,
+    parse_agents, parse_tags,
+)
+from .pagination import InvalidCursor, estimate_count, keyset_page
+from .rollups import as_aware
+from .search import is_search_index_ready, search_conversations, search_matches
 
 
 def is_user_admin(user):
@@ -70,99 +81,236 @@ def conversation_to_dict(conv):
     }
 
 
-def message_to_dict(msg):
-    """Convert Message model instance to dictionary for template compatibility"""
-    # Handle datetime - make timezone-aware if needed
-    created_at = msg.created_at
-    if created_at and created_at.tzinfo is None:
-        # If naive datetime, assume it's in UTC
-        created_at = timezone.make_aware(created_at, timezone.utc)
+# Message columns read for display; metadata is narrowed to the two keys shown
+MESSAGE_VALUES = ('pk', 'sender_uuid', 'type', 'content', 'link', 'created_at', 'metadata__content_en', 'metadata__format')
+
+
+def message_values_to_dict(row):
+    """Display dict of a Message.values(*MESSAGE_VALUES) row"""
+    created_at = as_aware(row['created_at'])
+    return {
+        'id': str(row['pk']),
+        'messageSender': str(row['sender_uuid']),
+        'messageType': row['type'] or '',
+        'messageFormat': row['metadata__format'],
+        'messageContent': row['content'] or '',
+        'messageContent_en': row['metadata__content_en'] or '',
+        'link': row['link'],
+        'messageTimestamp': created_at,
+        'messageTimestamp_parsed': timezone.localtime(created_at) if created_at else None,
+    }
+
+
+def get_message_page(conversation_uuid, organization=None, cursor=None, per_page=50):
+    """
+    A page of a conversation's messages, walking back from the latest.
+    
+    Args:
+        conversation_uuid: Conversation UUID
+        organization: Only messages of this organization (None for all)
+        cursor: next_cursor of the previous page (None for the latest messages)
+        per_page: Page size
+        
+    Returns:
+        Dict with 'messages' (display dicts, oldest first) and 'next_cursor'
+        (cursor of the older messages, None when there are none)
+    """
+    messages_qs = Message.objects.filter(conversation_uuid=conversation_uuid)
+    if organization is not None:
+        messages_qs = messages_qs.filter(alma_internal_organization=organization)
+    
+    page = keyset_page(messages_qs.values(*MESSAGE_VALUES), 'created_at', cursor=cursor, per_page=per_page)
+    return {
+        'messages': [message_values_to_dict(row) for row in reversed(page['items'])],
+        'next_cursor': page['next_cursor'],
+    }
+
+
+def get_message_counts(conversation_ids, organization=None):
+    """
+    Number of messages per conversation with a single grouped query.
     
-    message_timestamp_parsed = None
-    if created_at:
-        try:
-            message_timestamp_parsed = timezone.localtime(created_at)
-        except (ValueError, AttributeError):
-            # Fallback to the original datetime if localtime fails
-            message_timestamp_parsed = created_at
+    Args:
+        conversation_ids: Conversation UUIDs
+        organization: Only count messages of this organization (None for all)
+        
+    Returns:
+        Dict mapping conversation UUID to its message count (missing when 0)
+    """
+    if not conversation_ids:
+        return {}
+    
+    message_query = Message.objects.filter(conversation_uuid__in=conversation_ids)
+    if organization is not None:
+        message_query = message_query.filter(alma_internal_organization=organization)
+    
+    # order_by() drops Message's default ordering so it doesn't end up in the GROUP BY
+    grouped = message_query.order_by().values('conversation_uuid').annotate(count=Count('id'))
+    return {row['conversation_uuid']: row['count'] for row in grouped}
+
+
+def sample_conversation_facets(queryset, sample_size=1000):
+    """Filter options from the first conversations of a queryset (counts unknown)"""
+    all_agents_set = set()
+    all_tags_set = set()
+    all_sales_stages_set = set()
     
-    # Get metadata for additional fields
-    metadata = msg.metadata or {}
+    for agents, tags, sales_stage in queryset.values_list(
+        'agents', 'metadata__clientTagsInput', 'metadata__salesStage'
+    )[:sample_size]:
+        all_agents_set.update(parse_agents(agents))
+        all_tags_set.update(parse_tags(tags))
+        if sales_stage:
+            all_sales_stages_set.add(str(sales_stage))
     
     return {
-        'id': str(msg.id),
-        'sender_uuid': str(msg.sender_uuid),
-        'conversation_uuid': str(msg.conversation_uuid),
-        'content': msg.content,
-        'type': msg.type,
-        'link': msg.link,
-        'channel': msg.channel,
-        'subchannel': msg.subchannel,
-        'messageTimestamp': msg.created_at,
-        'messageTimestamp_parsed': message_timestamp_parsed,
-        'created_at': msg.created_at,
-        'updated_at': msg.updated_at,
-        'metadata': metadata,
-        'origin': msg.origin,
-        # Template compatibility fields
-        'messageSender': str(msg.sender_uuid),  # Template expects messageSender
-        'messageType': msg.type or '',  # Template expects messageType
-        'messageContent': msg.content or '',  # Template expects messageContent
-        'messageContent_en': metadata.get('content_en', ''),  # Optional English content
-        'messageFormat': metadata.get('format'),  # Optional format field
+        'sellers': [{'value': value, 'count': None} for value in sorted(all_agents_set)],
+        'tags': [{'value': value, 'count': None} for value in sorted(all_tags_set)],
+        'sales_stages': [{'value': value, 'count': None} for value in sorted(all_sales_stages_set)],
     }
 
 
-@login_required
-def conversation_list(request):
-    """List all conversations with filtering options"""
-    # Check if user is admin
+def get_request_organization(request):
+    """
+    (is_admin, organization) for the requesting user; organization is None for
+    admins (no filter) and for users without one (access denied).
+    """
     is_admin = is_user_admin(request.user)
-    
-    # Get user's organization for filtering (only if not admin)
-    user_org = None
-    if not is_admin:
-        user_org = get_user_organization(request.user)
-        
-        if not user_org:
-            from django.http import HttpResponse
-            return HttpResponse(
-                f"<h1>Access Error</h1>"
-                f"<p>Your user profile does not have an alma_internal_organization set.</p>"
-                f"<p>Please contact an administrator.</p>",
-                status=403
-            )
-    
-    # Get filter parameters from request
-    seller_id = request.GET.get('seller_id', '')
-    sales_stage = request.GET.get('sales_stage', '')
-    tag = request.GET.get('tag', '')
-    search = request.GET.get('search', '')
+    if is_admin:
+        return True, None
+    return False, get_user_organization(request.user)
+
+
+def get_conversation_filters(request):
+    """Conversation list filter parameters from the query string"""
+    return {
+        'seller_id': request.GET.get('seller_id', ''),
+        'sales_stage': request.GET.get('sales_stage', ''),
+        'tag': request.GET.get('tag', ''),
+        'search': request.GET.get('search', ''),
+    }
+
+
+def get_search_hits(filters, organization=None):
+    """
+    Search index hits for the list's search text, keyed by conversation UUID
+    in rank order, or None when there is no search or the index isn't built.
+    
+    Hits are capped at settings.SEARCH_MAX_RESULTS; the seller, sales stage
+    and tag filters are applied before the cap once the filter index is built.
+    """
+    if not filters['search'] or not is_search_index_ready():
+        return None
+    candidates = None
+    if filters['seller_id'] or filters['sales_stage'] or filters['tag']:
+        candidates = filter_conversation_index(
+            organization,
+            seller_id=filters['seller_id'],
+            sales_stage=filters['sales_stage'],
+            tag=filters['tag']
+        )
+    return {
+        hit['conversation_uuid']: hit
+        for hit in search_conversations(filters['search'], organization=organization, candidates=candidates)
+    }
+
+
+def search_rank_ordering(field, search_hits):
+    """Order by expression putting the rows of search_hits' conversations in rank order"""
+    return Case(
+        *[When(**{field: conv_id}, then=rank) for rank, conv_id in enumerate(search_hits)],
+        output_field=IntegerField()
+    )
+
+
+def is_search_capped(search_hits):
+    """
+    Whether a search may have more matches than the ranked hits and they
+    can't be listed, because the filter index is missing or stale
+    """
+    return (
+        search_hits is not None
+        and len(search_hits) >= getattr(settings, 'SEARCH_MAX_RESULTS', 200)
+        and not is_conversation_index_fresh()
+    )
+
+
+def filter_conversations(filters, organization=None, search_hits=None):
+    """
+    Conversations matching the list filters (all organizations if None).
+    
+    With search_hits (from get_search_hits) the result is those ranked hits,
+    best first. Otherwise, once the search and filter indexes are built, it is
+    every conversation matching the search (unranked, unlimited), newest first;
+    with only the search index usable it is the capped ranked hits, and before
+    that the search is a substring match on the client name, email and UUID.
+    
+    Seller, sales stage and tag filters and index searches are answered from
+    the indexed ConversationFilterIndex while it is fresh (see
+    facets.is_conversation_index_fresh): the result is then a
+    queryset of its rows (same ordering, primary key is the conversation UUID),
+    turned into conversations page by page with load_conversations.
+    """
+    filtered = filters['seller_id'] or filters['sales_stage'] or filters['tag']
+    matches = None
+    if filters['search'] and search_hits is None and is_search_index_ready():
+        if is_conversation_index_fresh():
+            matches = search_matches(filters['search'], organization=organization)
+        else:
+            # Unlimited matches are only joined against the filter index;
+            # without it they would be read into an id__in list
+            search_hits = get_search_hits(filters, organization)
+    indexed_search = search_hits is not None or matches is not None
+    if (filtered or indexed_search) and (indexed_search or not filters['search']):
+        index = filter_conversation_index(
+            organization,
+            seller_id=filters['seller_id'],
+            sales_stage=filters['sales_stage'],
+            tag=filters['tag']
+        )
+        if index is not None:
+            if search_hits is not None:
+                return index.filter(conversation_uuid__in=list(search_hits)).order_by(
+                    search_rank_ordering('conversation_uuid', search_hits), '-updated_at'
+                )
+            if matches is not None:
+                client_matches, message_matches = matches
+                return index.filter(
+                    Q(conversation_uuid__in=client_matches) | Q(conversation_uuid__in=message_matches)
+                )
+            return index
     
     # Start with base queryset - filter by organization only if not admin
-    if is_admin:
+    if organization is None:
         queryset = Conversation.objects.all()
     else:
-        queryset = Conversation.objects.filter(alma_internal_organization=user_org)
+        queryset = Conversation.objects.filter(alma_internal_organization=organization)
     
     # Apply filters
-    if seller_id:
+    if filters['seller_id']:
         # Filter conversations where agents list contains seller_id
-        queryset = queryset.filter(agents__contains=[seller_id])
-    
-    if sales_stage:
-        # Filter by sales stage in metadata JSON field
-        queryset = queryset.filter(metadata__salesStage__icontains=sales_stage)
-    
-    if tag:
-        # Filter by tag in metadata JSON field (could be string or array)
-        queryset = queryset.filter(
-            Q(metadata__clientTagsInput__icontains=tag) |
-            Q(metadata__clientTagsInput__contains=tag)
+        queryset = queryset.filter(agents__contains=[filters['seller_id']])
+    
+    # Sales stage and tag match the whole value case-insensitively, like the index
+    if filters['sales_stage']:
+        # Sales stage in metadata JSON field, ignoring surrounding whitespace
+        stage = re.escape(normalize_filter_value(filters['sales_stage']))
+        queryset = queryset.filter(metadata__salesStage__iregex=rf'^\s*{stage}\s*$')
+    
+    if filters['tag']:
+        # One of the tags in metadata JSON field (comma separated string or JSON array)
+        tag = re.escape(normalize_filter_value(filters['tag']))
+        queryset = queryset.filter(metadata__clientTagsInput__iregex=rf'(^|,|\[)\s*"?{tag}"?\s*(,|\]|$)')
+    
+    if search_hits is not None:
+        # Ranked matches from the search index, in rank order
+        return queryset.filter(id__in=list(search_hits)).order_by(
+            search_rank_ordering('id', search_hits), '-updated_at'
         )
     
-    if search:
+    if filters['search']:
         # Search in metadata fields (clientName, clientEmail) or UUID
+        search = filters['search']
         queryset = queryset.filter(
             Q(metadata__clientName__icontains=search) |
             Q(metadata__clientEmail__icontains=search) |
@@ -170,75 +318,114 @@ def conversation_list(request):
         )
     
     # Order by updated_at descending
-    queryset = queryset.order_by('-updated_at')
+    return queryset.order_by('-updated_at')
+
+
+def load_conversations(rows):
+    """Conversations of a page of filter_conversations results, in the same order"""
+    if not rows or not isinstance(rows[0], ConversationFilterIndex):
+        return list(rows)
+    
+    # Conversations deleted since the index was refreshed are skipped
+    conversations = Conversation.objects.in_bulk([row.conversation_uuid for row in rows])
+    return [conversations[row.conversation_uuid] for row in rows if row.conversation_uuid in conversations]
+
+
+def conversations_with_message_counts(conversations, organization=None, search_hits=None):
+    """Template dicts of a page of conversations, with their message counts and search snippets"""
+    # Message counts for the whole page in one query - skip org filter for admins
+    message_counts = get_message_counts([conv.id for conv in conversations], organization=organization)
     
-    # Get filter options from the filtered queryset
-    all_agents_set = set()
-    all_tags_set = set()
-    all_sales_stages_set = set()
+    conversation_dicts = []
+    for conv in conversations:
+        conv_dict = conversation_to_dict(conv)
+        conv_dict['message_count'] = message_counts.get(conv.id, 0)
+        hit = search_hits.get(conv.id) if search_hits else None
+        conv_dict['search_snippet'] = hit['snippet'] if hit else None
+        conversation_dicts.append(conv_dict)
+    return conversation_dicts
+
+
+@login_required
+def conversation_list(request):
+    """List all conversations with filtering options"""
+    # Get user's organization for filtering (only if not admin)
+    is_admin, user_org = get_request_organization(request)
+    
+    if not is_admin and not user_org:
+        from django.http import HttpResponse
+        return HttpResponse(
+            f"<h1>Access Error</h1>"
+            f"<p>Your user profile does not have an alma_internal_organization set.</p>"
+            f"<p>Please contact an administrator.</p>",
+            status=403
+        )
     
-    # Sample conversations to get filter options (limit for performance)
-    sample_convs = queryset[:1000]
-    for conv in sample_convs:
-        # Collect agents - properly handle the array
-        agents = conv.agents
-        if agents:
-            # ArrayField should return a list, but handle edge cases
-            if isinstance(agents, list):
-                # Normal case: it's a list
-                for agent in agents:
-                    if agent and str(agent).strip():  # Only add non-empty agents
-                        all_agents_set.add(str(agent).strip())
-            elif isinstance(agents, (tuple, set)):
-                # Handle other iterable types
-                for agent in agents:
-                    if agent and str(agent).strip():
-                        all_agents_set.add(str(agent).strip())
-            elif isinstance(agents, str):
-                # If it's a string, it might be a PostgreSQL array text representation
-                # Try to parse it or handle as comma-separated
-                if agents.startswith('{') and agents.endswith('}'):
-                    # PostgreSQL array format: {item1,item2}
-                    agents_str = agents[1:-1]  # Remove curly braces
-                    agent_list = [a.strip().strip('"').strip("'") for a in agents_str.split(',') if a.strip()]
-                    for agent in agent_list:
-                        if agent:
-                            all_agents_set.add(agent)
-                else:
-                    # Try JSON parsing
-                    try:
-                        parsed = json.loads(agents)
-                        if isinstance(parsed, list):
-                            for agent in parsed:
-                                if agent:
-                                    all_agents_set.add(str(agent).strip())
-                    except:
-                        # Last resort: treat as single value if not empty
-                        if agents.strip():
-                            all_agents_set.add(agents.strip())
-        
-        # Collect tags from metadata
-        metadata = conv.metadata or {}
-        tags = metadata.get('clientTagsInput')
-        if tags:
-            if isinstance(tags, str):
-                tag_list = [t.strip() for t in tags.split(',') if t.strip()]
-                all_tags_set.update(tag_list)
-            elif isinstance(tags, list):
-                all_tags_set.update([str(t) for t in tags if t])
-        
-        # Collect sales stages
-        sales_stage = metadata.get('salesStage')
-        if sales_stage:
-            all_sales_stages_set.add(str(sales_stage))
+    # Get filter parameters from request
+    filters = get_conversation_filters(request)
+    seller_id = filters['seller_id']
+    sales_stage = filters['sales_stage']
+    tag = filters['tag']
+    search = filters['search']
+    
+    search_hits = get_search_hits(filters, user_org)
+    queryset = filter_conversations(filters, user_org, search_hits=search_hits)
+    
+    # Filter options from the per-organization facet index (exact, cached);
+    # until it has been built, sample the filtered conversations instead
+    facets = get_conversation_facets(user_org)
+    if facets is None:
+        facets = sample_conversation_facets(queryset)
+    
+    all_sellers = [
+        {'uuid': seller['value'], 'display': seller['value'], 'count': seller['count']}
+        for seller in facets['sellers']
+    ]
+    all_tags = facets['tags']
+    all_sales_stages = facets['sales_stages']
+    
+    context = {
+        'all_sellers': all_sellers,
+        'all_tags': all_tags,
+        'all_sales_stages': all_sales_stages,
+        'current_seller_id': seller_id,
+        'current_sales_stage': sales_stage,
+        'current_tag': tag,
+        'current_search': search,
+        'filter_query': urlencode({key: value for key, value in filters.items() if value}),
+    }
+    
+    per_page = 20
+    pagination_mode = request.GET.get('pagination', settings.CONVERSATION_LIST_PAGINATION)
     
-    all_sellers = [{'uuid': agent, 'display': agent} for agent in sorted(all_agents_set)]
-    all_tags = sorted(all_tags_set)
-    all_sales_stages = sorted(all_sales_stages_set)
+    # Ranked search results are bounded by SEARCH_MAX_RESULTS and can't be
+    # paged on updated_at, so they always use numbered pages (the total counts
+    # every match, and the list says when only the best ones are shown)
+    if pagination_mode == 'keyset' and search_hits is None:
+        # Cursor pagination on (updated_at, uuid): constant cost per page, estimated total
+        try:
+            page = keyset_page(
+                queryset, 'updated_at',
+                cursor=request.GET.get('cursor') or None,
+                direction=request.GET.get('direction', 'next'),
+                per_page=per_page
+            )
+        except InvalidCursor:
+            page = keyset_page(queryset, 'updated_at', per_page=per_page)
+        
+        conversations = conversations_with_message_counts(load_conversations(page['items']), organization=user_org)
+        context.update({
+            'conversations': conversations,
+            'pagination_mode': 'keyset',
+            'all_conversations_count': estimate_count(queryset),
+            'next_cursor': page['next_cursor'],
+            'previous_cursor': page['previous_cursor'],
+            'debug_info': None,
+        })
+        return render(request, 'conversations/list.html', context)
     
     # Pagination using Django's Paginator
     page_number = int(request.GET.get('page', 1))
-    per_page = 20
     paginator = Paginator(queryset, per_page)
     
     try:
@@ -248,16 +435,13 @@ def conversation_list(request):
         page_number = 1
     
     # Convert model instances to dictionaries for template compatibility
-    conversations = []
-    for conv in page_obj:
-        conv_dict = conversation_to_dict(conv)
-        # Get message count for this conversation - skip org filter for admins
-        message_query = Message.objects.filter(conversation_uuid=conv.id)
-        if not is_admin:
-            message_query = message_query.filter(alma_internal_organization=user_org)
-        message_count = message_query.count()
-        conv_dict['mensagens'] = [None] * message_count  # Placeholder for count
-        conversations.append(conv_dict)
+    conversations = conversations_with_message_counts(
+        load_conversations(list(page_obj)), organization=user_org, search_hits=search_hits
+    )
+    
+    all_conversations_count = paginator.count
+    if search_hits is not None and is_conversation_index_fresh():
+        all_conversations_count = max(filter_conversations(filters, user_org).count(), paginator.count)
     
     # Debug info (only in DEBUG mode)
     debug_info = None
@@ -271,63 +455,161 @@ def conversation_list(request):
             'user_organization': user_org,
         }
     
-    context = {
+    context.update({
         'conversations': conversations,
-        'all_conversations_count': paginator.count,
+        'pagination_mode': 'offset',
+        'all_conversations_count': all_conversations_count,
+        'search_result_count': paginator.count,
+        'search_truncated': all_conversations_count > paginator.count,
+        'search_capped': is_search_capped(search_hits),
         'total_pages': paginator.num_pages,
         'current_page': page_number,
         'has_previous': page_obj.has_previous(),
         'has_next': page_obj.has_next(),
         'previous_page': page_obj.previous_page_number() if page_obj.has_previous() else None,
         'next_page': page_obj.next_page_number() if page_obj.has_next() else None,
-        'all_sellers': all_sellers,
-        'all_tags': all_tags,
-        'all_sales_stages': all_sales_stages,
-        'current_seller_id': seller_id,
-        'current_sales_stage': sales_stage,
-        'current_tag': tag,
-        'current_search': search,
         'debug_info': debug_info,
-    }
+    })
     
     return render(request, 'conversations/list.html', context)
 
 
 @login_required
-def conversation_detail(request, conversation_id):
-    """View detailed information about a specific conversation"""
-    # Check if user is admin
-    is_admin = is_user_admin(request.user)
+def conversation_list_api(request):
+    """
+    Keyset-paginated conversation list as JSON (same filters as conversation_list).
     
-    # Get user's organization for filtering (only if not admin)
-    user_org = None
-    if not is_admin:
-        user_org = get_user_organization(request.user)
-        
-        if not user_org:
-            raise Http404("Your user profile does not have an alma_internal_organization set.")
+    Query parameters: cursor, direction ('next' or 'previous'), per_page (max 100)
+    and estimate=1 to include the planner's estimate of the total.
+    """
+    is_admin, user_org = get_request_organization(request)
+    if not is_admin and not user_org:
+        return JsonResponse({'error': 'User has no organization'}, status=403)
+    
+    try:
+        per_page = min(max(int(request.GET.get('per_page', 20)), 1), 100)
+    except ValueError:
+        per_page = 20
+    
+    # Every search match is listed in updated_at order so the cursors remain
+    # stable, and the ranked hits only provide the snippets; while the filter
+    # index is missing or stale, only the capped best matches are listed
+    # (see filter_conversations) and search_capped says so
+    filters = get_conversation_filters(request)
+    search_hits = get_search_hits(filters, user_org)
+    queryset = filter_conversations(filters, user_org)
+    
+    try:
+        page = keyset_page(
+            queryset, 'updated_at',
+            cursor=request.GET.get('cursor') or None,
+            direction=request.GET.get('direction', 'next'),
+            per_page=per_page
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    results = []
+    conversations = load_conversations(page['items'])
+    for conv in conversations_with_message_counts(conversations, organization=user_org, search_hits=search_hits):
+        results.append({
+            'uuid': conv['uuid'],
+            'updated_at': conv['updated_at'],
+            'created_at': conv['created_at'],
+            'metadata': conv['metadata'],
+            'agents': conv['agents'],
+            'origin': conv['origin'],
+            'message_count': conv['message_count'],
+            'search_snippet': conv['search_snippet'],
+        })
+    
+    data = {
+        'results': results,
+        'next_cursor': page['next_cursor'],
+        'previous_cursor': page['previous_cursor'],
+        'search_capped': is_search_capped(search_hits),
+    }
+    if request.GET.get('estimate'):
+        data['estimated_total'] = estimate_count(queryset)
+    
+    return JsonResponse(data)
+
+
+@login_required
+def conversation_export(request):
+    """
+    Stream the conversation list filter result (same filters as conversation_list).
+    
+    Query parameters: export ('csv', 'jsonl' or 'parquet') and records
+    ('conversations', or 'messages' / 'events' of the filtered conversations).
+    
+    The stream is a sync generator: under ASGI Django 4.2 buffers it before
+    sending, so large exports are meant for the WSGI (gunicorn) deployment.
+    """
+    is_admin, user_org = get_request_organization(request)
+    if not is_admin and not user_org:
+        return JsonResponse({'error': 'User has no organization'}, status=403)
+    
+    export_format = request.GET.get('export', 'csv')
+    kind = request.GET.get('records', 'conversations')
+    if export_format not in EXPORT_FORMATS or kind not in EXPORT_COLUMNS:
+        return JsonResponse({'error': 'Invalid export or records parameter'}, status=400)
+    
+    # Every search match, unranked, once the filter index is fresh; until
+    # then the capped best matches, like the list (see filter_conversations)
+    filters = get_conversation_filters(request)
+    queryset = filter_conversations(filters, user_org)
+    
+    content_type, extension = EXPORT_FORMATS[export_format]
+    try:
+        pieces = stream_export(queryset, export_format, kind)
+    except Exception as e:
+        print(f"Error starting {kind} export: {e}")
+        return JsonResponse({'error': 'Export failed'}, status=500)
+    response = StreamingHttpResponse(pieces, content_type=content_type)
+    filename = f"{kind}-{timezone.now():%Y%m%d-%H%M%S}.{extension}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def get_request_conversation(request, conversation_id):
+    """
+    Conversation the requesting user may see, with the user's organization
+    (None for admins); raises Http404 otherwise.
+    """
+    is_admin, user_org = get_request_organization(request)
+    if not is_admin and not user_org:
+        raise Http404("Your user profile does not have an alma_internal_organization set.")
     
     try:
         # Try to get conversation by UUID - skip org filter for admins
-        conversation_uuid = conversation_id
         if is_admin:
-            conversation = Conversation.objects.get(id=conversation_uuid)
+            conversation = Conversation.objects.get(id=conversation_id)
         else:
             conversation = Conversation.objects.get(
-                id=conversation_uuid,
+                id=conversation_id,
                 alma_internal_organization=user_org
             )
-    except (Conversation.DoesNotExist, ValueError):
+    except (Conversation.DoesNotExist, ValueError, ValidationError):
         raise Http404("Conversation not found or you don't have access to it")
     
-    # Get messages for this conversation - skip org filter for admins
+    return conversation, user_org
+
+
+@login_required
+def conversation_detail(request, conversation_id):
+    """View detailed information about a specific conversation"""
+    conversation, user_org = get_request_conversation(request, conversation_id)
+    
+    # Latest messages only - older ones are loaded from conversation_messages_api
+    per_page = getattr(settings, 'CONVERSATION_DETAIL_MESSAGES', 50)
+    message_page = get_message_page(conversation.id, organization=user_org, per_page=per_page)
+    messages = message_page['messages']
+    
     messages_qs = Message.objects.filter(conversation_uuid=conversation.id)
-    if not is_admin:
+    if user_org is not None:
         messages_qs = messages_qs.filter(alma_internal_organization=user_org)
-    messages_qs = messages_qs.order_by('created_at')
-    
-    # Convert messages to dictionaries
-    messages = [message_to_dict(msg) for msg in messages_qs]
+    message_count = messages_qs.order_by().count()
     
     # Convert conversation to dictionary
     conv_dict = conversation_to_dict(conversation)
@@ -399,9 +681,43 @@ def conversation_detail(request, conversation_id):
     context = {
         'conversation': conv_dict,
         'messages': messages,
+        'message_count': message_count,
+        'messages_next_cursor': message_page['next_cursor'],
         'metadata': metadata,
         'envolved_sellers': envolved_sellers_display,
         'events': events,
     }
     
     return render(request, 'conversations/detail.html', context)
+
+
+@login_required
+def conversation_messages_api(request, conversation_id):
+    """
+    Older messages of a conversation as JSON, for the detail page's lazy loading.
+    
+    Query parameters: cursor (next_cursor of the previous page, none for the
+    latest messages) and per_page (max 200).
+    """
+    conversation, user_org = get_request_conversation(request, conversation_id)
+    
+    try:
+        per_page = min(max(int(request.GET.get('per_page', 50)), 1), 200)
+    except ValueError:
+        per_page = 50
+    
+    try:
+        page = get_message_page(
+            conversation.id, organization=user_org,
+            cursor=request.GET.get('cursor') or None, per_page=per_page
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'messages': [
+            {key: value for key, value in message.items() if key != 'messageTimestamp_parsed'}
+            for message in page['messages']
+        ],
+        'next_cursor': page['next_cursor'],
+    })
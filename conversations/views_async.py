@@ -0,0 +1,113 @@
+"""
+Async variants of the workspace and team analytics views, used when serving over ASGI
+(settings.ASYNC_VIEWS). They share parameter parsing and context building with
+views_other and only replace the blocking fetches with awaitable ones.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render, redirect
+
+from . import async_fetchers
+from .analytics_metrics import METRIC_WINDOWS
+from .analytics_utils import get_clients_analysis
+from .concurrency import afetch_concurrently
+from .views_other import (
+    _agent_workspace_params,
+    _agent_workspace_context,
+    _supervisor_workspace_params,
+    _needs_team_summary,
+    _supervisor_workspace_context,
+    _team_performance_params,
+    _team_performance_context,
+)
+
+
+def async_login_required(view_func):
+    """login_required for async views (Django 4.2's decorator only wraps sync views)"""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def _get_workspace_profile(request):
+    """Get the user's profile and whether they can see the supervisor workspace"""
+    profile = getattr(request.user, 'profile', None)
+    is_manager_plus = profile and (profile.is_manager() or profile.is_director() or profile.is_admin())
+    return profile, is_manager_plus
+
+
+@async_login_required
+async def workspace(request):
+    """Workspace view (async)"""
+    profile, is_manager_plus = await sync_to_async(_get_workspace_profile)(request)
+
+    mode = request.GET.get('mode', 'agent')
+
+    if mode == 'supervisor' and not is_manager_plus:
+        return redirect('workspace')
+
+    if mode == 'supervisor':
+        return await _workspace_supervisor_view(request, profile)
+    else:
+        return await _workspace_agent_view(request, profile, is_manager_plus)
+
+
+async def _workspace_agent_view(request, user_profile, can_switch_view):
+    days_param, start_date, external_uuid, team_uuids = await sync_to_async(_agent_workspace_params)(request, user_profile)
+
+    results = await afetch_concurrently({
+        'followups': (async_fetchers.aget_followups_for_agent(external_uuid), []),
+        'links': (async_fetchers.aget_link_tracking_from_agent(external_uuid), []),
+        'metrics': (async_fetchers.aget_metrics_for_agent(external_uuid, start_date=start_date), []),
+        'members_metrics': (async_fetchers.aget_metrics_for_team_members(team_uuids, start_date=start_date), []),
+    })
+
+    context = _agent_workspace_context(results, can_switch_view, days_param)
+
+    return await sync_to_async(render)(request, 'conversations/workspace_agent.html', context)
+
+
+async def _workspace_supervisor_view(request, profile):
+    days_param, start_date, team_members, team_uuids = await sync_to_async(_supervisor_workspace_params)(request)
+
+    tasks = {
+        'sales_data': (async_fetchers.aget_sales_stage_metrics(team_uuids, start_date), {}),
+        'clients_analysis': (sync_to_async(get_clients_analysis, thread_sensitive=False)(), (None, None, None)),
+        'critical_objections': (async_fetchers.aget_critical_objections(team_uuids, start_date=start_date), {'items': [], 'count': 0}),
+    }
+    if days_param in METRIC_WINDOWS:
+        tasks['window_metrics'] = (async_fetchers.aget_team_window_metrics(team_members, windows=(days_param,)), {})
+    else:
+        tasks['team_summary'] = (async_fetchers.aget_team_summary_stats(team_members, start_date), {})
+
+    results = await afetch_concurrently(tasks)
+    if _needs_team_summary(results, days_param):
+        # The window metrics failed: compute the selected period directly
+        results.update(await afetch_concurrently({
+            'team_summary': (async_fetchers.aget_team_summary_stats(team_members, start_date), {}),
+        }))
+
+    context = _supervisor_workspace_context(results, team_members, days_param)
+
+    return await sync_to_async(render)(request, 'conversations/workspace_supervisor.html', context)
+
+
+@async_login_required
+async def team_performance_detail(request):
+    """Team performance analytics view (async)"""
+    days_param, start_date, team_members, team_uuids, team_name = await sync_to_async(_team_performance_params)(request)
+
+    results = await afetch_concurrently({
+        'agent_scores': (async_fetchers.aget_team_agent_scores(team_uuids, start_date=start_date), {}),
+        'objection_stats': (async_fetchers.aget_objection_stats(team_uuids, start_date=start_date), []),
+    })
+
+    context = await sync_to_async(_team_performance_context)(results, team_members, team_name, days_param)
+
+    return await sync_to_async(render)(request, 'conversations/analytics_team_performance_detail.html', context)
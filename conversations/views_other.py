@@ -460,15 +460,28 @@ def workspace(request):
 
 def _workspace_agent_view(request, user_profile, can_switch_view):
     """Workspace view"""
-    import json
     from .followups import (get_followups_for_agent, 
-                            get_link_tracking_from_agent,
-                            get_conversation_id,
-                            create_infobip_conversation_link
-                            )
-    from .analytics_metrics import ( get_stage_scores, 
-                                    get_metrics_for_agent,
+                            get_link_tracking_from_agent)
+    from .analytics_metrics import ( get_metrics_for_agent,
                                     get_metrics_for_team_members)
+    from .concurrency import fetch_concurrently
+    from functools import partial
+
+    days_param, start_date, external_uuid, team_uuids = _agent_workspace_params(request, user_profile)
+
+    results = fetch_concurrently({
+        'followups': (partial(get_followups_for_agent, external_uuid), []),
+        'links': (partial(get_link_tracking_from_agent, external_uuid), []),
+        'metrics': (partial(get_metrics_for_agent, external_uuid, start_date=start_date), []),
+        'members_metrics': (partial(get_metrics_for_team_members, team_uuids, start_date=start_date), []),
+    })
+
+    context = _agent_workspace_context(results, can_switch_view, days_param)
+    
+    return render(request, 'conversations/workspace_agent.html', context)
+
+def _agent_workspace_params(request, user_profile):
+    """Resolve the selected period and the agent/team UUIDs for the agent workspace"""
     from datetime import timedelta
     
     if not user_profile:
@@ -485,8 +498,17 @@ def _workspace_agent_view(request, user_profile, can_switch_view):
     team_members = get_user_team_members(request.user)
     team_uuids = [p.external_uuid for p in team_members if p.external_uuid]
 
-    all_followups = get_followups_for_agent(external_uuid)
-    all_links = get_link_tracking_from_agent(external_uuid)
+    return days_param, start_date, external_uuid, team_uuids
+
+def _agent_workspace_context(results, can_switch_view, days_param):
+    """Build the agent workspace context from the fetched follow-ups, links and metrics"""
+    import json
+    from .followups import (get_conversation_id,
+                            create_infobip_conversation_link)
+    from .analytics_metrics import get_stage_scores
+
+    all_followups = results['followups']
+    all_links = results['links']
 
     #print(f"Fetched {len(all_followups)} follow-ups and {len(all_links)} links for agent {external_uuid}")
 
@@ -586,9 +608,7 @@ def _workspace_agent_view(request, user_profile, can_switch_view):
     low_priority_tasks.sort(key=lambda x: (x['follow_up_date'], -x['score']))
     low_priority_tasks = low_priority_tasks[:low_priority_limit]
 
-    metrics_data = get_metrics_for_agent(external_uuid, start_date=start_date)
-    members_data = get_metrics_for_team_members(team_uuids, start_date=start_date)
-    scores_data = get_stage_scores(metrics_data, members_data)
+    scores_data = get_stage_scores(results['metrics'], results['members_metrics'])
 
     context = {
         'title': 'ALMA COSMOS - Agent Workspace',
@@ -600,14 +620,44 @@ def _workspace_agent_view(request, user_profile, can_switch_view):
         'current_days': days_param,
     }
     
-    return render(request, 'conversations/workspace_agent.html', context)
+    return context
 
 def _workspace_supervisor_view(request, profile):
     from .events_db import ( get_sales_stage_metrics )
     from .analytics_utils import ( get_clients_analysis )
     from .analytics_metrics import ( get_team_summary_stats, 
-                                    get_objections_from_database,
-                                    format_objection_data )
+                                    get_team_window_metrics,
+                                    get_critical_objections,
+                                    METRIC_WINDOWS )
+    from .concurrency import fetch_concurrently
+    from functools import partial
+
+    days_param, start_date, team_members, team_uuids = _supervisor_workspace_params(request)
+
+    tasks = {
+        'sales_data': (partial(get_sales_stage_metrics, team_uuids, start_date), {}),
+        'clients_analysis': (get_clients_analysis, (None, None, None)),
+        'critical_objections': (partial(get_critical_objections, team_uuids, start_date=start_date), {'items': [], 'count': 0}),
+    }
+    # The standard periods come from the per-team window cache
+    if days_param in METRIC_WINDOWS:
+        tasks['window_metrics'] = (partial(get_team_window_metrics, team_members, windows=(days_param,)), {})
+    else:
+        tasks['team_summary'] = (partial(get_team_summary_stats, team_members, start_date), {})
+
+    results = fetch_concurrently(tasks)
+    if _needs_team_summary(results, days_param):
+        # The window metrics failed: compute the selected period directly
+        results.update(fetch_concurrently({
+            'team_summary': (partial(get_team_summary_stats, team_members, start_date), {}),
+        }))
+
+    context = _supervisor_workspace_context(results, team_members, days_param)
+    
+    return render(request, 'conversations/workspace_supervisor.html', context)
+
+def _supervisor_workspace_params(request):
+    """Resolve the selected period and the team members for the supervisor workspace"""
     from datetime import timedelta
 
     try:
@@ -617,11 +667,21 @@ def _workspace_supervisor_view(request, profile):
         
     start_date = timezone.now() - timedelta(days=days_param)
     
-    team_members = get_user_team_members(request.user)
+    # Evaluate the queryset here so the worker threads don't query the default database
+    team_members = list(get_user_team_members(request.user))
     team_uuids = [p.external_uuid for p in team_members if p.external_uuid]
-    team_summary = get_team_summary_stats(team_members, start_date)
 
-    sales_data = get_sales_stage_metrics(team_uuids, start_date)
+    return days_param, start_date, team_members, team_uuids
+
+def _needs_team_summary(results, days_param):
+    """Whether neither the window metrics nor a team summary cover the selected period"""
+    return 'team_summary' not in results and days_param not in results.get('window_metrics', {})
+
+def _supervisor_workspace_context(results, team_members, days_param):
+    """Build the supervisor workspace context from the fetched team data"""
+    window = results.get('window_metrics', {}).get(days_param)
+    team_summary = window['current'] if window else results.get('team_summary', {})
+    sales_data = results['sales_data']
     funnel_raw = sales_data.get('stages', {})
     sorted_items = sorted(funnel_raw.items(), key=lambda x: x[1], reverse=True)
 
@@ -630,7 +690,7 @@ def _workspace_supervisor_view(request, profile):
         'data': [item[1] for item in sorted_items]
     }
 
-    clients_data, _, global_analyses = get_clients_analysis()
+    clients_data, _, global_analyses = results['clients_analysis']
     critical_cases = []
     cases = global_analyses.get('critical_cases', []) if global_analyses else []
     
@@ -642,7 +702,9 @@ def _workspace_supervisor_view(request, profile):
         ]
         critical_cases.sort(key=lambda x: x.get('risk_score', 0), reverse=True)
 
-    raw_objections = get_objections_from_database(team_uuids, start_date=start_date)
+    from .analytics_metrics import OBJECTION_TYPE_LABELS
+
+    critical_objections = results['critical_objections']
     
     team_members_dict = {
         str(p.external_uuid): (p.user.first_name or p.user.username) 
@@ -650,49 +712,26 @@ def _workspace_supervisor_view(request, profile):
         if p.external_uuid
     }
     
-    critical_objections_list = []
     INFOBIP_BASE_URL = "https://portal-ny2.infobip.com/conversations/my-work?conversationId="
-    type_map = {
-        'price': 'Preço', 
-        'trust': 'Confiança', 
-        'timing': 'Tempo', 
-        'competitor': 'Concorrente', 
-        'product_fit': 'Adequação', 
-        'other': 'Outro',
-        'hesitation': 'Hesitação',
-        'payment_method': 'Método de Pagamento',
-        'implicit_price': 'Preço Implícito',
-        'implicit_timing': 'Tempo Implícito'
-    }
-
-    for row in raw_objections:
-        result = row.get('result', {})
-        details = result.get('objection_details', {}).get('objections_detected', [])
-        
-        agent_name = team_members_dict.get(row['agent_uuid'], row['agent_uuid'])
-        created_at = row.get('created_at')
 
-        conversation_uuid = row.get('conversation_uuid')
-
-        for item in details:
-            score = item.get('resolution_quality', 0)
-            
-            if score < 60:
-                obj_type = item.get('objection_type', 'other')
-                
-                critical_objections_list.append({
-                    'agent': agent_name,
-                    'type': type_map.get(obj_type, obj_type.capitalize()),
-                    'score': score,
-                    'text': item.get('objection_text', ''),
-                    'response': item.get('seller_response', ''),
-                    'time': created_at,
-                    'conversation_uuid': row.get('conversation_uuid'),
-                    'url': f"{INFOBIP_BASE_URL}{conversation_uuid}" if conversation_uuid else "#"
-                })
-
-    critical_objections_list.sort(key=lambda x: (x['score'], x['time']), reverse=False)
-    top_critical_objections = critical_objections_list[:5]
+    top_critical_objections = []
+    for item in critical_objections['items']:
+        obj_type = item['objection_type']
+        conversation_uuid = item['conversation_uuid']
+        score = item['resolution_quality']
+        if isinstance(score, float) and score.is_integer():
+            score = int(score)
+
+        top_critical_objections.append({
+            'agent': team_members_dict.get(item['agent_uuid'], item['agent_uuid']),
+            'type': OBJECTION_TYPE_LABELS.get(obj_type, obj_type.capitalize()),
+            'score': score,
+            'text': item['objection_text'],
+            'response': item['seller_response'],
+            'time': item['created_at'],
+            'conversation_uuid': conversation_uuid,
+            'url': f"{INFOBIP_BASE_URL}{conversation_uuid}" if conversation_uuid else "#"
+        })
 
     context = {
         'title': 'ALMA COSMOS - Supervisor Workspace',
@@ -701,21 +740,52 @@ def _workspace_supervisor_view(request, profile):
         'funnel_data': funnel_data,
         'critical_count': len(critical_cases),
         'team_summary': team_summary,
+        'team_summary_deltas': window['deltas'] if window else {},
         'top_critical_cases': critical_cases[:5],
         'current_days': days_param,
         'cases_to_verify': top_critical_objections, 
-        'objections_alert_count': len(critical_objections_list)
+        'objections_alert_count': critical_objections['count']
     }
     
-    return render(request, 'conversations/workspace_supervisor.html', context)
+    return context
 
 @login_required
 def team_performance_detail(request):
     from .analytics_metrics import (
-                                    get_metrics_for_agent, 
-                                    calculate_agent_scores,
-                                    get_objections_from_database,
-                                    format_objection_data)
+                                    get_team_agent_scores,
+                                    get_objection_stats)
+    from .concurrency import fetch_concurrently
+    from functools import partial
+
+    days_param, start_date, team_members, team_uuids, team_name = _team_performance_params(request)
+
+    results = fetch_concurrently({
+        'agent_scores': (partial(get_team_agent_scores, team_uuids, start_date=start_date), {}),
+        'objection_stats': (partial(get_objection_stats, team_uuids, start_date=start_date), []),
+    })
+
+    context = _team_performance_context(results, team_members, team_name, days_param)
+    
+    return render(request, 'conversations/analytics_team_performance_detail.html', context)
+
+@login_required
+def team_window_metrics(request):
+    """Team summary for every standard window and the period before it (JSON)"""
+    from django.http import JsonResponse
+    from .analytics_metrics import get_team_window_metrics
+
+    team_members = list(get_user_team_members(request.user))
+
+    try:
+        window_metrics = get_team_window_metrics(team_members)
+    except Exception as e:
+        print(f"Error computing team window metrics: {e}")
+        return JsonResponse({'error': 'Metrics unavailable'}, status=503)
+
+    return JsonResponse({'windows': {str(days): metrics for days, metrics in window_metrics.items()}})
+
+def _team_performance_params(request):
+    """Resolve the selected period, team members and team name for the team performance page"""
     from datetime import timedelta
     
     try:
@@ -725,7 +795,8 @@ def team_performance_detail(request):
         
     start_date = timezone.now() - timedelta(days=days_param)
 
-    team_members = get_user_team_members(request.user)
+    team_members = list(get_user_team_members(request.user))
+    team_uuids = [p.external_uuid for p in team_members if p.external_uuid]
     user, _ = UserProfile.objects.get_or_create(user=request.user)
     team_name = None
 
@@ -733,6 +804,12 @@ def team_performance_detail(request):
         if user.team.name is not None:
             team_name = user.team.name
 
+    return days_param, start_date, team_members, team_uuids, team_name
+
+def _team_performance_context(results, team_members, team_name, days_param):
+    """Build the team performance context from the batched agent scores and objection stats"""
+    from .analytics_metrics import empty_agent_scores, format_objection_stats
+
     team_aggregates = {
         'total_conversations': 0,
         'total_sales': 0,
@@ -753,11 +830,21 @@ def team_performance_detail(request):
 
     sellers_analytics = []
 
+    agent_scores = results['agent_scores']
+    objection_stats = results['objection_stats']
+
     for member in team_members:
-        analysis_list = get_metrics_for_agent(member.external_uuid, start_date=start_date)
-        agent_data = calculate_agent_scores(member, analysis_list, start_date=start_date)
-        
-        if not agent_data: continue
+        agent_uuid = str(member.external_uuid or '').strip()
+        if not agent_uuid: continue
+
+        # Agents without any events or analyses in the period score zero
+        agent_data = agent_scores.get(agent_uuid) or empty_agent_scores(agent_uuid)
+
+        agent_data = {
+            'seller_name': member.user.username,
+            'real_name': member.user.first_name,
+            **agent_data
+        }
 
         sellers_analytics.append(agent_data)
 
@@ -785,14 +872,11 @@ def team_performance_detail(request):
     if team_aggregates['total_conversations'] > 0:
         team_conversion_rate = (team_aggregates['total_sales'] / team_aggregates['total_conversations']) * 100
 
-    team_uuids = [p.external_uuid for p in team_members if p.external_uuid]
-    objection_list = get_objections_from_database(team_uuids, start_date=start_date)
-
     team_members_dict = {}
     for member in team_members:
         team_members_dict[member.external_uuid] = member.get_display_name()
 
-    objection_analysis = format_objection_data(objection_list, team_members_dict)
+    objection_analysis = format_objection_stats(objection_stats, team_members_dict)
 
     team_data = {
         'team_name': team_name,
@@ -824,65 +908,60 @@ def team_performance_detail(request):
         'current_days': days_param,
     }
     
-    return render(request, 'conversations/analytics_team_performance_detail.html', context)
+    return context
 
 @login_required
 def analytics(request):
     """Analytics dashboard - main entry point"""
-    from .analytics_utils import (
-        get_cx_volumetrics, get_friction_heuristics, get_temporal_heat,
-        get_churn_risk_monitor, get_sales_velocity, get_segmentation_matrix,
-        get_summary_stats, get_clients_analysis
-    )
+    from .analytics_utils import get_gold_stats
+    from .gold_store import get_clients_manifest
     
-    # Get critical cases count
-    clients, metadata, global_analyses = get_clients_analysis()
-    critical_cases_count = 0
-    if global_analyses and 'critical_cases' in global_analyses:
-        critical_cases_count = len(global_analyses.get('critical_cases', []))
+    # Get critical cases count (from the clients analysis manifest, without parsing the file)
+    clients_manifest = get_clients_manifest()
+    critical_cases_count = clients_manifest['critical_cases']['row_count'] if clients_manifest else 0
     
-    # Get summary stats for each dataset
+    # Get summary stats for each dataset from the dataset manifests
     datasets = {
         'critical_cases': {
             'name': 'Critical Cases',
             'description': f'High-risk clients requiring immediate attention ({critical_cases_count} cases)',
-            'stats': {'row_count': critical_cases_count, 'column_count': 0, 'columns': []},
+            'stats': clients_manifest['critical_cases'] if clients_manifest else {'row_count': 0, 'column_count': 0, 'columns': []},
             'url': 'analytics_critical_cases'
         },
         'cx_volumetrics': {
             'name': 'CX Volumetrics',
             'description': 'Manager-Client pairs with interaction velocity, neediness ratio, load metrics',
-            'stats': get_summary_stats(get_cx_volumetrics()),
+            'stats': get_gold_stats('cx_volumetrics'),
             'url': 'analytics_cx_volumetrics'
         },
         'friction_heuristics': {
             'name': 'Friction Heuristics',
             'description': 'Individual interactions flagged with urgency/failure/escalation scores',
-            'stats': get_summary_stats(get_friction_heuristics()),
+            'stats': get_gold_stats('friction_heuristics'),
             'url': 'analytics_friction_heuristics'
         },
         'temporal_heat': {
             'name': 'Temporal Heatmap',
             'description': 'Heatmap data (DayOfWeek × Hour) for volume and friction patterns',
-            'stats': get_summary_stats(get_temporal_heat()),
+            'stats': get_gold_stats('temporal_heat'),
             'url': 'analytics_temporal_heat'
         },
         'churn_risk': {
             'name': 'Churn Risk Monitor',
             'description': 'Churn risk scores by client',
-            'stats': get_summary_stats(get_churn_risk_monitor()),
+            'stats': get_gold_stats('churn_risk_monitor'),
             'url': 'analytics_churn_risk'
         },
         'sales_velocity': {
             'name': 'Sales Velocity',
             'description': 'Sales pipeline velocity metrics',
-            'stats': get_summary_stats(get_sales_velocity()),
+            'stats': get_gold_stats('sales_velocity'),
             'url': 'analytics_sales_velocity'
         },
         'segmentation_matrix': {
             'name': 'Segmentation Matrix',
             'description': 'Client segmentation matrix',
-            'stats': get_summary_stats(get_segmentation_matrix()),
+            'stats': get_gold_stats('segmentation_matrix'),
             'url': 'analytics_segmentation_matrix'
         }
     }
@@ -894,74 +973,123 @@ def analytics(request):
     return render(request, 'conversations/analytics_dashboard.html', context)
 
 
-@login_required
-def analytics_cx_volumetrics(request):
-    """CX Volumetrics analytics view"""
-    from .analytics_utils import get_cx_volumetrics, get_data_slice, get_summary_stats
-    
-    data = get_cx_volumetrics()
-    stats = get_summary_stats(data)
-    
-    # Get pagination parameters
+def _analytics_table_params(request):
+    """Page, sort column and sort order of an analytics table page"""
     page = int(request.GET.get('page', 1))
-    per_page = 50
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
+    sort_column = request.GET.get('sort', '')
+    sort_order = request.GET.get('order', 'asc')  # 'asc' or 'desc'
+    return page, sort_column, sort_order
+
+
+def _analytics_table_context(result, page, sort_column, sort_order, filter_params=None, stats=None, filtered=False):
+    """
+    Pagination and sort context of an analytics table page for a
+    query_dataset result; the query strings keep filter_params (and the sort
+    for pagination links). stats (the dataset's manifest statistics) is shown
+    in the header instead of the result's, with the result's row count as
+    matching_count when filtered.
+    """
+    from urllib.parse import urlencode
     
-    # Get data for current page
-    if data is not None and len(data) > 0:
-        paginated_data = data[start_idx:end_idx]
-        total_pages = (len(data) + per_page - 1) // per_page
-    else:
-        paginated_data = []
-        total_pages = 0
+    filter_params = {key: value for key, value in (filter_params or {}).items() if value}
+    query_params = dict(filter_params)
+    if sort_column:
+        query_params.update({'sort': sort_column, 'order': sort_order})
+    total_pages = result['total_pages']
     
-    context = {
-        'title': 'CX Volumetrics',
-        'data': paginated_data,
-        'stats': stats,
+    return {
+        'data': result['data'],
+        'stats': stats or result['stats'],
+        'matching_count': result['stats']['row_count'] if filtered else None,
         'current_page': page,
         'total_pages': total_pages,
         'has_previous': page > 1,
         'has_next': page < total_pages,
         'previous_page': page - 1 if page > 1 else None,
         'next_page': page + 1 if page < total_pages else None,
+        'sort_column': sort_column,
+        'sort_order': sort_order,
+        'query_string': '&' + urlencode(query_params) if query_params else '',
+        'filter_query_string': '&' + urlencode(filter_params) if filter_params else '',
     }
-    return render(request, 'conversations/analytics_detail.html', context)
 
 
 @login_required
-def analytics_friction_heuristics(request):
-    """Friction Heuristics analytics view"""
-    from .analytics_utils import get_friction_heuristics, get_data_slice, get_summary_stats
+def analytics_cx_volumetrics(request):
+    """CX Volumetrics analytics view"""
+    from .analytics_utils import get_gold_page, get_gold_stats
     
-    data = get_friction_heuristics()
-    stats = get_summary_stats(data)
+    page, sort_column, sort_order = _analytics_table_params(request)
+    per_page = 50
     
-    # Get pagination parameters
-    page = int(request.GET.get('page', 1))
+    # Sorted and paged by the query engine; only the rows of the current page are materialized
+    result = get_gold_page('cx_volumetrics', page=page, per_page=per_page, sort=sort_column, order=sort_order)
+    stats = get_gold_stats('cx_volumetrics')
+    
+    context = {
+        'title': 'CX Volumetrics',
+        **_analytics_table_context(result, page, sort_column, sort_order, stats=stats),
+    }
+    return render(request, 'conversations/analytics_detail.html', context)
+
+
+@login_required
+def analytics_friction_heuristics(request):
+    """
+    Friction Heuristics analytics view, filterable by client, date range
+    (client, since, until) and minimum scores (min_urgency, min_failure,
+    min_escalation)
+    """
+    from datetime import datetime, timedelta
+    from .analytics_utils import get_gold_stats
+    from .friction_index import filter_friction
+    
+    client = request.GET.get('client', '').strip()
+    since = request.GET.get('since', '').strip()
+    until = request.GET.get('until', '').strip()
+    
+    # Date bounds; invalid dates are ignored
+    date_bounds = {}
+    for param, value in (('since', since), ('until', until)):
+        if not value:
+            continue
+        try:
+            bound = datetime.fromisoformat(value)
+            if param == 'until':
+                # Inclusive end date
+                bound += timedelta(days=1)
+        except (ValueError, OverflowError):
+            continue
+        date_bounds[param] = bound
+    
+    # Score thresholds; invalid numbers are ignored
+    score_params = {'min_urgency': 'urgency_score', 'min_failure': 'failure_score', 'min_escalation': 'escalation_score'}
+    thresholds = {param: request.GET.get(param, '').strip() for param in score_params}
+    min_scores = {}
+    for param, column in score_params.items():
+        try:
+            min_scores[column] = int(thresholds[param]) if thresholds[param] else None
+        except ValueError:
+            min_scores[column] = None
+    
+    page, sort_column, sort_order = _analytics_table_params(request)
     per_page = 50
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
     
-    # Get data for current page
-    if data is not None and len(data) > 0:
-        paginated_data = data[start_idx:end_idx]
-        total_pages = (len(data) + per_page - 1) // per_page
-    else:
-        paginated_data = []
-        total_pages = 0
+    # Client and date filters are looked up in the friction index, then sorted and paged by the query engine
+    result = filter_friction(
+        client=client or None, since=date_bounds.get('since'), until=date_bounds.get('until'),
+        min_scores=min_scores, sort=sort_column, order=sort_order, page=page, per_page=per_page
+    )
+    gold_filters = {'client': client, 'since': since, 'until': until, **thresholds}
+    filtered = bool(client or date_bounds or any(value is not None for value in min_scores.values()))
     
     context = {
         'title': 'Friction Heuristics',
-        'data': paginated_data,
-        'stats': stats,
-        'current_page': page,
-        'total_pages': total_pages,
-        'has_previous': page > 1,
-        'has_next': page < total_pages,
-        'previous_page': page - 1 if page > 1 else None,
-        'next_page': page + 1 if page < total_pages else None,
+        'gold_filters': gold_filters,
+        **_analytics_table_context(
+            result, page, sort_column, sort_order, filter_params=gold_filters,
+            stats=get_gold_stats('friction_heuristics'), filtered=filtered
+        ),
     }
     return render(request, 'conversations/analytics_detail.html', context)
 
@@ -969,25 +1097,18 @@ def analytics_friction_heuristics(request):
 @login_required
 def analytics_temporal_heat(request):
     """Temporal Heatmap analytics view - displays as visual heatmap"""
-    from .analytics_utils import get_temporal_heat, get_summary_stats
-    
-    data = get_temporal_heat()
-    stats = get_summary_stats(data)
-    
-    # Get available metrics for dropdown (exclude day_of_week, day_name, hour)
-    available_metrics = []
-    available_metrics_display = []
-    if data is not None and len(data) > 0:
-        # Get columns from first record
-        all_columns = list(data[0].keys()) if data else []
-        available_metrics = [col for col in all_columns if col not in ['day_of_week', 'day_name', 'hour']]
-        # Format metric names for display (replace underscores with spaces, title case)
-        for metric in available_metrics:
-            display_name = metric.replace('_', ' ').title()
-            available_metrics_display.append({
-                'value': metric,
-                'display': display_name
-            })
+    from .analytics_utils import get_gold_stats
+    from .heatmap import get_temporal_heatmaps, heatmap_rows, metric_display_name
+    
+    # Row count and columns only
+    stats = get_gold_stats('temporal_heat')
+    
+    # Every numeric metric is pivoted (and cached) at once
+    heatmaps = get_temporal_heatmaps()
+    available_metrics = list(heatmaps.keys())
+    available_metrics_display = [
+        {'value': metric, 'display': metric_display_name(metric)} for metric in available_metrics
+    ]
     
     # Get metric type from query parameter (default to first available or interaction_count)
     requested_metric = request.GET.get('metric', '')
@@ -998,156 +1119,58 @@ def analytics_temporal_heat(request):
     else:
         metric_type = 'interaction_count'
     
-    # Prepare heatmap data as a list of lists for easier template access
-    heatmap_data = []
-    max_value = 0
-    min_value = 0
-    has_heatmap_data = False
-    
-    if data is not None and len(data) > 0:
-        # Build a dictionary keyed by (day_of_week, hour) for quick lookup
-        data_dict = {}
-        for record in data:
-            day = record.get('day_of_week', 0)
-            hour = record.get('hour', 0)
-            value = record.get(metric_type, 0) or 0
-            key = (day, hour)
-            # Sum if multiple records for same day/hour
-            if key in data_dict:
-                data_dict[key] += float(value)
-            else:
-                data_dict[key] = float(value)
-        
-        # Convert to list of lists for template (7 days × 24 hours)
-        day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        for day in range(7):  # 0-6 for Monday-Sunday
-            day_row = {
-                'day_name': day_names[day],
-                'day_num': day,
-                'hours': []
-            }
-            for hour in range(24):  # 0-23
-                key = (day, hour)
-                value = float(data_dict.get(key, 0))
-                day_row['hours'].append({
-                    'hour': hour,
-                    'value': value
-                })
-                max_value = max(max_value, value)
-                min_value = min(min_value, value)
-            heatmap_data.append(day_row)
-        
-        has_heatmap_data = len(heatmap_data) > 0
-    
-    # Get display name for current metric
-    metric_display = metric_type.replace('_', ' ').title()
+    heatmap = heatmaps.get(metric_type)
+    heatmap_data = heatmap_rows(heatmap) if heatmap else []
     
     context = {
         'title': 'Temporal Heatmap',
         'heatmap_data': heatmap_data,
-        'has_heatmap_data': has_heatmap_data,
+        'has_heatmap_data': len(heatmap_data) > 0,
         'stats': stats,
         'metric_type': metric_type,
-        'metric_display': metric_display,
+        'metric_display': metric_display_name(metric_type),
         'available_metrics': available_metrics,
         'available_metrics_display': available_metrics_display,
-        'max_value': max_value,
-        'min_value': min_value,
+        'max_value': heatmap['max'] if heatmap else 0,
+        'min_value': heatmap['min'] if heatmap else 0,
     }
     return render(request, 'conversations/analytics_temporal_heat.html', context)
 
 
+@login_required
+def analytics_temporal_heat_data(request):
+    """Every metric's 7×24 temporal heatmap with its min and max (JSON)"""
+    from django.http import JsonResponse
+    from .heatmap import get_temporal_heatmaps, heatmaps_to_json
+    
+    return JsonResponse(heatmaps_to_json(get_temporal_heatmaps()))
+
+
 @login_required
 def analytics_churn_risk(request):
     """Churn Risk Monitor analytics view with sorting and time window filtering - uses clients_analysis_20251211_055217.json"""
-    from .analytics_utils import get_clients_analysis, get_data_slice, get_summary_stats, transform_clients_for_time_window
+    from .analytics_query import query_dataset
+    from .analytics_utils import CLIENT_TIME_WINDOWS, get_clients_analysis, get_client_window_table
+    from .gold_store import get_clients_manifest
     
     clients, metadata, global_analyses = get_clients_analysis()
+    metadata = metadata or {}
     
     # Get time window filter (default to last_6_months)
     time_window = request.GET.get('time_window', 'last_6_months')
-    available_time_windows = metadata.get('time_windows_available', ['last_week', 'last_month', 'last_3_months', 'last_6_months', 'last_year'])
+    available_time_windows = metadata.get('time_windows_available', CLIENT_TIME_WINDOWS)
     
     # Validate time window
     if time_window not in available_time_windows:
         time_window = 'last_6_months'
     
-    # Transform clients data to show metrics from selected time window
-    data = transform_clients_for_time_window(clients, time_window) if clients else []
-    stats = get_summary_stats(data)
+    # Precomputed projection of the selected time window (built when the file loads)
+    table = get_client_window_table(time_window)
     
-    # Get sorting parameters
-    sort_column = request.GET.get('sort', '')
-    sort_order = request.GET.get('order', 'asc')  # 'asc' or 'desc'
-    
-    # Sort data if sort column is specified
-    if data is not None and len(data) > 0 and sort_column:
-        if sort_column in data[0].keys():
-            # Helper function to determine if value is numeric
-            def is_numeric(value):
-                if value is None:
-                    return False
-                if isinstance(value, list):
-                    return False
-                try:
-                    float(str(value))
-                    return True
-                except (ValueError, TypeError):
-                    return False
-            
-            # Check if all values in column are numeric
-            sample_values = [record.get(sort_column) for record in data[:10] if record.get(sort_column) is not None and not isinstance(record.get(sort_column), list)]
-            all_numeric = all(is_numeric(v) for v in sample_values) if sample_values else False
-            
-            if all_numeric:
-                # Sort as numeric
-                def numeric_key(x):
-                    val = x.get(sort_column)
-                    if val is None or isinstance(val, list):
-                        return float('-inf') if sort_order == 'desc' else float('inf')
-                    try:
-                        return float(val)
-                    except (ValueError, TypeError):
-                        return 0
-                data = sorted(data, key=numeric_key, reverse=(sort_order == 'desc'))
-            else:
-                # Sort as string (handle lists by joining them)
-                def string_key(x):
-                    val = x.get(sort_column)
-                    if val is None:
-                        return '' if sort_order == 'desc' else 'zzz'
-                    if isinstance(val, list):
-                        return ', '.join(str(v) for v in val).lower()
-                    return str(val).lower()
-                data = sorted(data, key=string_key, reverse=(sort_order == 'desc'))
-    
-    # Get pagination parameters
-    page = int(request.GET.get('page', 1))
+    page, sort_column, sort_order = _analytics_table_params(request)
     per_page = 50
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
     
-    # Get data for current page
-    if data is not None and len(data) > 0:
-        paginated_data = data[start_idx:end_idx]
-        total_pages = (len(data) + per_page - 1) // per_page
-    else:
-        paginated_data = []
-        total_pages = 0
-    
-    # Build query string for pagination (preserve sort and time_window parameters)
-    query_params = []
-    if time_window:
-        query_params.append(f'time_window={time_window}')
-    if sort_column:
-        query_params.append(f'sort={sort_column}')
-    if sort_order:
-        query_params.append(f'order={sort_order}')
-    query_string = '&'.join(query_params)
-    if query_string:
-        query_string = '&' + query_string
-    else:
-        query_string = ''
+    result = query_dataset(table if table is not None else [], sort=sort_column, order=sort_order, page=page, per_page=per_page)
     
     # Build query string for time window filter (preserve sort parameters)
     time_window_query_params = []
@@ -1179,19 +1202,13 @@ def analytics_churn_risk(request):
     
     context = {
         'title': 'Client Analysis & Risk Monitor',
-        'data': paginated_data,
-        'stats': stats,
         'metadata': metadata,
         'global_analyses': global_analyses,
-        'current_page': page,
-        'total_pages': total_pages,
-        'has_previous': page > 1,
-        'has_next': page < total_pages,
-        'previous_page': page - 1 if page > 1 else None,
-        'next_page': page + 1 if page < total_pages else None,
-        'sort_column': sort_column,
-        'sort_order': sort_order,
-        'query_string': query_string,
+        **_analytics_table_context(
+            result, page, sort_column, sort_order, filter_params={'time_window': time_window},
+            stats=get_clients_manifest()
+        ),
+        'client_drilldown': True,
         'time_window_query_string': time_window_query_string,
         'time_window': time_window,
         'time_window_options': time_window_options,
@@ -1202,35 +1219,18 @@ def analytics_churn_risk(request):
 @login_required
 def analytics_sales_velocity(request):
     """Sales Velocity analytics view"""
-    from .analytics_utils import get_sales_velocity, get_data_slice, get_summary_stats
+    from .analytics_utils import get_gold_page, get_gold_stats
     
-    data = get_sales_velocity()
-    stats = get_summary_stats(data)
-    
-    # Get pagination parameters
-    page = int(request.GET.get('page', 1))
+    page, sort_column, sort_order = _analytics_table_params(request)
     per_page = 50
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
     
-    # Get data for current page
-    if data is not None and len(data) > 0:
-        paginated_data = data[start_idx:end_idx]
-        total_pages = (len(data) + per_page - 1) // per_page
-    else:
-        paginated_data = []
-        total_pages = 0
+    # Sorted and paged by the query engine; only the rows of the current page are materialized
+    result = get_gold_page('sales_velocity', page=page, per_page=per_page, sort=sort_column, order=sort_order)
+    stats = get_gold_stats('sales_velocity')
     
     context = {
         'title': 'Sales Velocity',
-        'data': paginated_data,
-        'stats': stats,
-        'current_page': page,
-        'total_pages': total_pages,
-        'has_previous': page > 1,
-        'has_next': page < total_pages,
-        'previous_page': page - 1 if page > 1 else None,
-        'next_page': page + 1 if page < total_pages else None,
+        **_analytics_table_context(result, page, sort_column, sort_order, stats=stats),
     }
     return render(request, 'conversations/analytics_detail.html', context)
 
@@ -1238,35 +1238,18 @@ def analytics_sales_velocity(request):
 @login_required
 def analytics_segmentation_matrix(request):
     """Segmentation Matrix analytics view"""
-    from .analytics_utils import get_segmentation_matrix, get_data_slice, get_summary_stats
-    
-    data = get_segmentation_matrix()
-    stats = get_summary_stats(data)
+    from .analytics_utils import get_gold_page, get_gold_stats
     
-    # Get pagination parameters
-    page = int(request.GET.get('page', 1))
+    page, sort_column, sort_order = _analytics_table_params(request)
     per_page = 50
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
     
-    # Get data for current page
-    if data is not None and len(data) > 0:
-        paginated_data = data[start_idx:end_idx]
-        total_pages = (len(data) + per_page - 1) // per_page
-    else:
-        paginated_data = []
-        total_pages = 0
+    # Sorted and paged by the query engine; only the rows of the current page are materialized
+    result = get_gold_page('segmentation_matrix', page=page, per_page=per_page, sort=sort_column, order=sort_order)
+    stats = get_gold_stats('segmentation_matrix')
     
     context = {
         'title': 'Segmentation Matrix',
-        'data': paginated_data,
-        'stats': stats,
-        'current_page': page,
-        'total_pages': total_pages,
-        'has_previous': page > 1,
-        'has_next': page < total_pages,
-        'previous_page': page - 1 if page > 1 else None,
-        'next_page': page + 1 if page < total_pages else None,
+        **_analytics_table_context(result, page, sort_column, sort_order, stats=stats),
     }
     return render(request, 'conversations/analytics_detail.html', context)
 
@@ -1274,109 +1257,28 @@ def analytics_segmentation_matrix(request):
 @login_required
 def analytics_critical_cases(request):
     """Critical Cases analytics view - displays high-risk clients requiring immediate attention"""
-    from .analytics_utils import get_clients_analysis, get_summary_stats
+    from .analytics_query import query_dataset
+    from .analytics_utils import get_clients_analysis
+    from .gold_store import get_clients_manifest
     
     clients, metadata, global_analyses = get_clients_analysis()
     critical_cases = global_analyses.get('critical_cases', []) if global_analyses else []
     
-    # Get sorting parameters
-    sort_column = request.GET.get('sort', '')
-    sort_order = request.GET.get('order', 'asc')  # 'asc' or 'desc'
-    
-    # Sort data if sort column is specified
-    if critical_cases and len(critical_cases) > 0 and sort_column:
-        if sort_column in critical_cases[0].keys():
-            # Helper function to determine if value is numeric
-            def is_numeric(value):
-                if value is None:
-                    return False
-                if isinstance(value, list):
-                    return False
-                if isinstance(value, dict):
-                    return False
-                try:
-                    float(str(value))
-                    return True
-                except (ValueError, TypeError):
-                    return False
-            
-            # Check if all values in column are numeric
-            sample_values = [record.get(sort_column) for record in critical_cases[:10] 
-                           if record.get(sort_column) is not None 
-                           and not isinstance(record.get(sort_column), (list, dict))]
-            all_numeric = all(is_numeric(v) for v in sample_values) if sample_values else False
-            
-            if all_numeric:
-                # Sort as numeric
-                def numeric_key(x):
-                    val = x.get(sort_column)
-                    if val is None or isinstance(val, (list, dict)):
-                        return float('-inf') if sort_order == 'desc' else float('inf')
-                    try:
-                        return float(val)
-                    except (ValueError, TypeError):
-                        return 0
-                critical_cases = sorted(critical_cases, key=numeric_key, reverse=(sort_order == 'desc'))
-            else:
-                # Sort as string (handle lists by joining them)
-                def string_key(x):
-                    val = x.get(sort_column)
-                    if val is None:
-                        return '' if sort_order == 'desc' else 'zzz'
-                    if isinstance(val, list):
-                        return ', '.join(str(v) for v in val).lower()
-                    if isinstance(val, dict):
-                        return str(val).lower()
-                    return str(val).lower()
-                critical_cases = sorted(critical_cases, key=string_key, reverse=(sort_order == 'desc'))
-    
-    # Get pagination parameters
-    page = int(request.GET.get('page', 1))
+    page, sort_column, sort_order = _analytics_table_params(request)
     per_page = 20  # Fewer per page since these are detailed cases
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
     
-    # Get data for current page
-    if critical_cases and len(critical_cases) > 0:
-        paginated_data = critical_cases[start_idx:end_idx]
-        total_pages = (len(critical_cases) + per_page - 1) // per_page
-    else:
-        paginated_data = []
-        total_pages = 0
+    # The cases come from the cached clients analysis, so their sort order is cached too
+    result = query_dataset(critical_cases, sort=sort_column, order=sort_order, page=page, per_page=per_page)
     
-    # Build query string for pagination (preserve sort parameters)
-    query_params = []
-    if sort_column:
-        query_params.append(f'sort={sort_column}')
-    if sort_order:
-        query_params.append(f'order={sort_order}')
-    query_string = '&'.join(query_params)
-    if query_string:
-        query_string = '&' + query_string
-    else:
-        query_string = ''
-    
-    # Get summary stats
-    stats = {
-        'row_count': len(critical_cases) if critical_cases else 0,
-        'column_count': len(critical_cases[0].keys()) if critical_cases and len(critical_cases) > 0 else 0,
-        'columns': list(critical_cases[0].keys()) if critical_cases and len(critical_cases) > 0 else []
-    }
+    clients_manifest = get_clients_manifest()
     
     context = {
         'title': 'Critical Cases',
-        'data': paginated_data,
-        'stats': stats,
         'metadata': metadata,
-        'current_page': page,
-        'total_pages': total_pages,
-        'has_previous': page > 1,
-        'has_next': page < total_pages,
-        'previous_page': page - 1 if page > 1 else None,
-        'next_page': page + 1 if page < total_pages else None,
-        'sort_column': sort_column,
-        'sort_order': sort_order,
-        'query_string': query_string,
+        **_analytics_table_context(
+            result, page, sort_column, sort_order,
+            stats=clients_manifest['critical_cases'] if clients_manifest else None
+        ),
     }
     return render(request, 'conversations/analytics_critical_cases.html', context)
 
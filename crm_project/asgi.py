@@ -3,6 +3,11 @@ ASGI config for crm_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run with uvicorn workers (start.sh with SERVER_MODE=asgi):
+    gunicorn crm_project.asgi:application -k uvicorn.workers.UvicornWorker
+ASYNC_VIEWS=True routes the workspace and team analytics pages to
+conversations.views_async.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
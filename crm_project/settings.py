@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'conversations',
 ]
 
@@ -74,6 +75,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'crm_project.wsgi.application'
+ASGI_APPLICATION = 'crm_project.asgi.application'
+
+# Serve the workspace and team analytics pages with their async views.
+# Only enable when running under ASGI (see start.sh, SERVER_MODE=asgi).
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 
 # Database
@@ -232,6 +238,53 @@ ANALYTICS_TABLE_NAME = config('ANALYTICS_TABLE_NAME', default='analytics')
 ANALYTICS_AGENT_ID_COLUMN = config('ANALYTICS_AGENT_ID_COLUMN', default='agent_uuid')
 ANALYTICS_TIMESTAMP_COLUMN = config('ANALYTICS_TIMESTAMP_COLUMN', default='created_at')
 
+# Connection pools for the events, analytics and followups databases (see conversations/db_pool.py)
+# Sizes are per alias and per worker process
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=1, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+# Milliseconds a request's query on a pooled connection may run before the server cancels it (0 for no limit);
+# the rollup commands run without a limit
+DB_STATEMENT_TIMEOUT = config('DB_STATEMENT_TIMEOUT', default=30000, cast=int)
+
+# Threads (per request) used by the workspace views to run independent fetches in parallel (see conversations/concurrency.py)
+FETCH_POOL_MAX_WORKERS = config('FETCH_POOL_MAX_WORKERS', default=8, cast=int)
+FETCH_TIMEOUT = config('FETCH_TIMEOUT', default=20, cast=float)
+
+# Score teams from the per-agent daily rollup once `manage.py update_agent_rollups` has run (see conversations/rollups.py)
+METRICS_ROLLUP_ENABLED = config('METRICS_ROLLUP_ENABLED', default=True, cast=bool)
+# Seconds before the watermark re-scanned on each rollup and objection facts update, for rows inserted late
+ROLLUP_LOOKBACK = config('ROLLUP_LOOKBACK', default=86400, cast=int)
+
+# Seconds a team's 7/30/90/365-day summaries stay cached (see get_team_window_metrics)
+METRIC_WINDOWS_CACHE_TTL = config('METRIC_WINDOWS_CACHE_TTL', default=300, cast=int)
+
+# Seconds the conversation list filter options stay cached per organization (see conversations/facets.py)
+CONVERSATION_FACETS_CACHE_TTL = config('CONVERSATION_FACETS_CACHE_TTL', default=300, cast=int)
+# Seconds since its last refresh after which the conversation filter index is
+# bypassed for the live tables (0 to always use it); scheduler.sh refreshes it
+CONVERSATION_INDEX_MAX_AGE = config('CONVERSATION_INDEX_MAX_AGE', default=3600, cast=int)
+
+# Conversation list pagination: 'offset' (numbered pages, exact COUNT) or 'keyset'
+# (cursor on updated_at/uuid with an estimated total); ?pagination= overrides it per request
+CONVERSATION_LIST_PAGINATION = config('CONVERSATION_LIST_PAGINATION', default='offset')
+
+# Messages rendered on the conversation detail page; older ones load on demand
+CONVERSATION_DETAIL_MESSAGES = config('CONVERSATION_DETAIL_MESSAGES', default=50, cast=int)
+
+# Bytes of gold data files (size on disk) kept parsed in each worker's memory
+# (see conversations/analytics_utils.py)
+GOLD_DATA_CACHE_MAX_BYTES = config('GOLD_DATA_CACHE_MAX_BYTES', default=256 * 1024 * 1024, cast=int)
+
+# Directory of the memory-mapped Arrow copies of the gold datasets, shared by
+# all workers (see conversations/gold_store.py)
+GOLD_ARROW_CACHE_DIR = config('GOLD_ARROW_CACHE_DIR', default=str(BASE_DIR / '.gold_arrow'))
+
+# Conversation search (see conversations/search.py): PostgreSQL text search
+# configuration and maximum number of matching conversations
+SEARCH_TEXT_CONFIG = config('SEARCH_TEXT_CONFIG', default='portuguese')
+SEARCH_MAX_RESULTS = config('SEARCH_MAX_RESULTS', default=200, cast=int)
+
 # MongoDB Configuration
 # Support both MONGO_URL (Railway) and MONGODB_URL (legacy)
 # Check for MONGO_URL first, then fall back to MONGODB_URL
@@ -241,6 +294,8 @@ else:
     MONGODB_URL = config('MONGODB_URL', default='mongodb://localhost:27017/')
 MONGODB_DB_NAME = config('MONGODB_DB_NAME', default='crm_db')
 MONGODB_COLLECTION_NAME = config('MONGODB_COLLECTION_NAME', default='conversations')
+# Connections kept by the shared per-process MongoClient (see conversations/mongodb.py)
+MONGODB_MAX_POOL_SIZE = config('MONGODB_MAX_POOL_SIZE', default=20, cast=int)
 
 
 # Password validation
@@ -0,0 +1,20 @@
+#!/bin/bash
+# Keep the indexes read by the web process up to date. Runs as its own
+# process (see Procfile); each refresh is incremental, and the prune passes,
+# which walk a whole index, run at most once per PRUNE_INTERVAL.
+REFRESH_INTERVAL=${REFRESH_INTERVAL:-300}
+PRUNE_INTERVAL=${PRUNE_INTERVAL:-86400}
+
+last_prune=$(date +%s)
+while true; do
+    prune=""
+    if [ $(( $(date +%s) - last_prune )) -ge "$PRUNE_INTERVAL" ]; then
+        prune="--prune"
+        last_prune=$(date +%s)
+    fi
+
+    python manage.py update_agent_rollups || echo "Agent rollups refresh failed"
+    python manage.py update_conversation_facets $prune || echo "Conversation facets refresh failed"
+
+    sleep "$REFRESH_INTERVAL"
+done
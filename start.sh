@@ -5,6 +5,17 @@ set -e  # Exit on error
 echo "Running database migrations..."
 python manage.py migrate --noinput
 
+# SERVER_MODE selects how the app is served:
+#   wsgi (default) - gunicorn sync workers, one request per worker at a time
+#   asgi           - gunicorn managing uvicorn workers; each worker keeps many
+#                    I/O-bound dashboard requests in flight. Sets ASYNC_VIEWS so
+#                    the workspace/team pages use the async views.
+# WEB_CONCURRENCY sets the number of worker processes in both modes.
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    echo "Starting gunicorn with uvicorn workers (ASGI)..."
+    export ASYNC_VIEWS=True
+    exec gunicorn crm_project.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT --log-file -
+fi
+
 echo "Starting gunicorn server..."
 exec gunicorn crm_project.wsgi --bind 0.0.0.0:$PORT --log-file -
-